@@ -1,16 +1,22 @@
 import os
-import json
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from groq import Groq
 from dotenv import load_dotenv
+from backend.engine import engine_for, build_router
+from backend.metrics import render_metrics
+from backend.static import StaticAsset
 
 load_dotenv()
 
-app = FastAPI(title="AI Ad Copy Generator")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compress the UI before serving, so the first visitor per encoding does not wait on it
+    ui_asset.prepare()
+    yield
+
+app = FastAPI(title="AI Ad Copy Generator", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,260 +24,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "Retry-After"],
 )
 
-# --- MODELS ---
-class AdRequest(BaseModel):
-    product_name: str
-    description: str
-    target_audience: str
-    platform: str
-    campaign_goal: str
-    tone: str
-    framework: str
-
-class AdVariation(BaseModel):
-    headline: str
-    primary_text: str
-    cta: str
-    angle: str
-    strength_score: float = Field(ge=0, le=10)
-    score_explanation: str
-
-class AudienceInsight(BaseModel):
-    pain_points: List[str]
-    emotional_triggers: List[str]
-    objections: List[str]
-    targeting_interests: List[str] = Field(description="Pages, Topics, Influencers, Skills")
-    audience_match_score: int = Field(description="Estimated % match with target audience, 0-100")
-    match_score_explanation: str = Field(description="Short reason for the score")
-    demographics: str = Field(description="Age range and Career stage")
-    behaviors: List[str] = Field(description="Key online behaviors or habits")
-
-class ComplianceCheck(BaseModel):
-    risk_level: str
-    risk_score: int = Field(description="Risk probability percentage, 0-100")
-    risk_score_explanation: str = Field(description="Short reason for the score")
-    issues: List[str]
-    suggestions: List[str]
-
-class ChannelOptimization(BaseModel):
-    whatsapp: str
-    sms: str
-
-class AdResponse(BaseModel):
-    insights: AudienceInsight
-    variations: List[AdVariation]
-    compliance: ComplianceCheck
-    channel_opt: ChannelOptimization
-
-# --- LOGIC ---
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
-PROMPT_TEMPLATE = """
-You are an expert digital marketing strategist with 10+ years of experience in audience targeting and ad copywriting. Analyze the following product and create comprehensive marketing intelligence.
-
-**PRODUCT DESCRIPTION:**
-Product: {product_name}
-Description: {description}
-Target Audience: {target_audience}
-
-**CAMPAIGN PARAMETERS:**
-- Goal: {campaign_goal}
-- Framework: {framework}
-- Platform: {platform}
-- Tone: {tone}
+engine = engine_for(os.getenv("SCHEMA_VERSION", "v3"))
 
----
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
-## PART 1: DEEP AUDIENCE ANALYSIS
-
-First, think deeply about who would genuinely benefit from this product. Then provide:
-
-**Demographics:**
-- Age Range: Be specific (e.g., "23-34" not just "18-35")
-- Career Stage: What point are they at professionally?
-
-**Psychographic Profile:**
-- Pain Points (3): What keeps them up at night? What frustrates them daily? Be specific and visceral.
-- Emotional Triggers (3): What emotions drive their purchase decisions? (Fear of missing out, desire for status, need for security, etc.)
-- Common Objections (3): What makes them hesitate before buying? What doubts do they have?
-
-**Behavioral Patterns (3):**
-Consider their actual daily habits:
-- What platforms do they use and when?
-- How do they consume content? (scrolling, searching, binge-watching)
-- What device do they primarily use?
-
-**Targeting Interests (5):**
-Be specific and actionable. Instead of "fitness," say "CrossFit, Joe Rogan podcast, Whoop fitness tracker, intermittent fasting, David Goggins."
-
-**Audience Match Score:**
-Analyze how well this product aligns with the audience's needs. Consider:
-- How urgent is their pain point?
-- How aware are they of solutions like this?
-- How competitive is the market?
-- How unique is this product's value proposition?
-
-Based on this analysis, assign a precise match score (e.g., 67, 73, 91). Avoid round numbers like 80, 85, 90. Then explain in 2-3 sentences why you gave this specific score.
-
----
-
-## PART 2: CAMPAIGN STRATEGY
-
-Based on the goal "{campaign_goal}", adjust your approach:
-- If Awareness: Use curiosity-driven hooks that make them want to learn more
-- If Traffic: Lead with value and information, make clicking feel like a smart decision
-- If Sales: Use urgency, social proof, and direct CTAs that demand action NOW
-
-Apply the {framework} framework, but make it feel natural - don't just fill in a template.
-Use a {tone} tone throughout.
-
----
-
-## PART 3: AD VARIATIONS
-
-Create 3 distinct ad copy variations. Each should feel genuinely different in approach:
-
-**Variation 1: Emotional Appeal**
-Lead with feelings, aspirations, or fears. Make them *feel* something before they think.
-
-**Variation 2: Logical Appeal**  
-Lead with facts, benefits, and rational reasons. Appeal to their smart, analytical side.
-
-**Variation 3: Scarcity/Urgency**
-Create FOMO. Make them feel they'll miss out if they don't act now.
-
-For each variation:
-- Headline (attention-grabbing, max 40 chars)
-- Body copy (2-3 sentences, compelling and specific)
-- Call-to-action (specific and action-oriented)
-
-**SELF-CRITIQUE EACH VARIATION:**
-Rate each ad honestly (0-10 scale). Calculate an overall strength_score as the average of these 4 dimensions:
-- Clarity: Is the message instantly understandable?
-- Emotional Pull: Does it make you *feel* something?
-- Urgency: Does it create a reason to act now?
-- CTA Strength: Is the call-to-action specific and compelling?
-
-For the overall score, briefly explain your reasoning (1-2 sentences).
-
----
-
-## PART 4: CHANNEL-SPECIFIC OPTIMIZATION
-
-**WhatsApp Broadcast Message:**
-Create a personal, conversational message (max 300 chars including emoji). Should feel like a message from a friend, not a brand.
-
-**SMS Version:**
-Ultra-concise version (max 160 chars). Every word counts.
-
----
-
-## PART 5: COMPLIANCE & RISK ANALYSIS
-
-Review your ad copy against {platform} policies. Look for:
-- Exaggerated claims or misleading statements
-- Prohibited content
-- Missing disclosures
-- Targeting violations
-- Trademark or copyright concerns
-
-**Risk Score:**
-Calculate a specific risk percentage (e.g., 8, 23, 47). Avoid round numbers like 20, 25, 30. Consider:
-- How aggressive is the language?
-- Are there any gray-area claims?
-- Could any targeting be seen as discriminatory?
-- Does it comply with advertising standards?
-
-Assign a precise risk score and explain in 2-3 sentences what specific elements contribute to this score.
-
-**Risk Level:** Based on your risk_score, assign: "Low" (0-30), "Medium" (31-60), or "High" (61-100).
-
----
-
-**OUTPUT FORMAT (STRICT JSON ONLY):**
-
-{{
-  "insights": {{
-    "demographics": "Age XX-XX, [Career Stage]",
-    "pain_points": ["...", "...", "..."],
-    "emotional_triggers": ["...", "...", "..."],
-    "objections": ["...", "...", "..."],
-    "behaviors": ["...", "...", "..."],
-    "targeting_interests": ["...", "...", "...", "...", "..."],
-    "audience_match_score": 67,
-    "match_score_explanation": "..."
-  }},
-  "variations": [
-    {{
-      "headline": "...",
-      "primary_text": "...",
-      "cta": "...",
-      "angle": "Emotional",
-      "strength_score": 7.5,
-      "score_explanation": "..."
-    }},
-    {{
-      "headline": "...",
-      "primary_text": "...",
-      "cta": "...",
-      "angle": "Logical",
-      "strength_score": 8.2,
-      "score_explanation": "..."
-    }},
-    {{
-      "headline": "...",
-      "primary_text": "...",
-      "cta": "...",
-      "angle": "Scarcity",
-      "strength_score": 9.1,
-      "score_explanation": "..."
-    }}
-  ],
-  "compliance": {{
-    "risk_level": "Low",
-    "risk_score": 23,
-    "risk_score_explanation": "...",
-    "issues": ["...", "..."],
-    "suggestions": ["...", "..."]
-  }},
-  "channel_opt": {{
-    "whatsapp": "...",
-    "sms": "..."
-  }}
-}}
-
-CRITICAL: Respond ONLY with valid JSON. No markdown, no backticks, no preamble. Just pure JSON.
-"""
-
-@app.post("/api/generate", response_model=AdResponse)
-async def generate_ad(request: AdRequest):
-    try:
-        prompt = PROMPT_TEMPLATE.format(
-            product_name=request.product_name,
-            description=request.description,
-            target_audience=request.target_audience,
-            platform=request.platform,
-            campaign_goal=request.campaign_goal,
-            tone=request.tone,
-            framework=request.framework
-        )
-        
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a world-class marketing engine. Return ONLY JSON. For all numeric scores, use precise specific numbers based on your analysis - never use common round numbers like 80, 85, 90, 20, 25."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.8
-        )
-        
-        data = json.loads(completion.choices[0].message.content)
-        return AdResponse(**data)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+app.include_router(build_router(engine), prefix="/api")
 
 # --- UI TEMPLATE ---
 HTML_CONTENT = """
@@ -552,14 +314,14 @@ HTML_CONTENT = """
             };
 
             try {
-                const res = await fetch('/api/generate', {
+                const res = await fetch('/api/generate/stream', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify(payload)
                 });
                 
-                if (!res.ok) throw new Error('Synthesis failure. Engine offline.');
-                const data = await res.json();
+                if (!res.ok || !res.body) throw new Error('Synthesis failure. Engine offline.');
+                const data = await readCampaignStream(res, renderDashboard);
                 renderDashboard(data);
                 scrollToResults();
             } catch (err) {
@@ -571,6 +333,44 @@ HTML_CONTENT = """
             }
         };
 
+        // Placeholders for sections that have not streamed in yet
+        const PENDING = {
+            insights: { demographics: '...', pain_points: [], emotional_triggers: [], objections: [], behaviors: [], targeting_interests: [], audience_match_score: 0, match_score_explanation: 'Analyzing audience...' },
+            variations: [],
+            compliance: { risk_level: 'Pending', risk_score: 0, risk_score_explanation: 'Auditing copy...', issues: [], suggestions: [] },
+            channel_opt: { whatsapp: 'Generating...', sms: 'Generating...' }
+        };
+
+        // Reads the server-sent events from /api/generate/stream, re-rendering as each section lands
+        async function readCampaignStream(res, onPartial) {
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            const partial = { ...PENDING, variations: [] };
+            let buffer = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf('\\n\\n')) !== -1) {
+                    const raw = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    let event = 'message', body = '';
+                    raw.split('\\n').forEach(line => {
+                        if (line.startsWith('event: ')) event = line.slice(7);
+                        else if (line.startsWith('data: ')) body += line.slice(6);
+                    });
+                    const parsed = JSON.parse(body);
+                    if (event === 'done') return parsed;
+                    if (event === 'error') throw new Error(parsed.detail || 'Synthesis failure.');
+                    if (event === 'variation') partial.variations[parsed.index] = parsed.variation;
+                    else partial[event] = parsed;
+                    onPartial(partial);
+                }
+            }
+            throw new Error('Synthesis stream interrupted.');
+        }
+
         function renderDashboard(data) {
             console.log("Received Data:", data);
             console.log("Scores - Match:", data.insights.audience_match_score, "Risk:", data.compliance.risk_score);
@@ -773,12 +573,12 @@ HTML_CONTENT = """
                 }, 100);
             }
         }
-        }
     </script>
 </body>
 </html>
 """
+ui_asset = StaticAsset(HTML_CONTENT, "text/html; charset=utf-8")
 
 @app.get("/", response_class=HTMLResponse)
-async def get_ui():
-    return HTML_CONTENT
+async def get_ui(request: Request):
+    return ui_asset.response(request)
@@ -0,0 +1,141 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from .metrics import Counter, Gauge, QUEUE_WAIT_SECONDS
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "128"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+
+# Lower value is served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+REJECTIONS = Counter("adgen_admission_rejected_total", "Requests turned away by admission control", ("priority", "reason"))
+
+
+class Overloaded(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Caps concurrent generations; excess requests wait in a bounded priority queue or are rejected fast."""
+
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, max_queue: int = ADMISSION_MAX_QUEUE, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = []  # heap of (priority, seq, future, priority name)
+        self._seq = itertools.count()
+        self._service_time = 5.0  # EWMA of seconds a slot is held, for Retry-After
+
+    def queue_depth(self, priority: str = None) -> int:
+        return sum(1 for _, _, fut, name in self._waiters if not fut.done() and (priority is None or name == priority))
+
+    def retry_after(self) -> int:
+        backlog = self.queue_depth() + 1
+        return max(1, math.ceil(self._service_time * backlog / self.max_in_flight))
+
+    async def acquire(self, priority: str = "interactive"):
+        if self.in_flight < self.max_in_flight and self.queue_depth() == 0:
+            self.in_flight += 1
+            QUEUE_WAIT_SECONDS.observe(0.0, queue=f"admission_{priority}")
+            return
+        if self.queue_depth() >= self.max_queue:
+            REJECTIONS.inc(priority=priority, reason="queue_full")
+            raise Overloaded("Server is at capacity, please retry shortly", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES.get(priority, 1), next(self._seq), future, priority))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted at the same moment the wait timed out; hand the slot back
+                self.release()
+            future.cancel()
+            REJECTIONS.inc(priority=priority, reason="queue_timeout")
+            raise Overloaded("Timed out waiting for a generation slot", self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            future.cancel()
+            raise
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start, queue=f"admission_{priority}")
+
+    def release(self, held_for: float = None):
+        if held_for is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * held_for
+        while self._waiters:
+            _, _, future, _ = heapq.heappop(self._waiters)
+            if not future.done():
+                # Slot passes straight to the next waiter; in_flight is unchanged
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def run(self, fn, priority: str = "interactive"):
+        await self.acquire(priority)
+        start = time.perf_counter()
+        try:
+            return await fn()
+        finally:
+            self.release(time.perf_counter() - start)
+
+
+class HeldStreamingResponse(StreamingResponse):
+    """A StreamingResponse (e.g. an SSE stream) that releases an already acquired slot once it is sent or abandoned.
+
+    The release wraps the whole ASGI call rather than the body generator, whose finally never runs
+    when the client is gone before the body is first iterated.
+    """
+
+    def __init__(self, content, controller: AdmissionController, **kwargs):
+        super().__init__(content, **kwargs)
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        start = time.perf_counter()
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - start)
+
+
+def overloaded_error(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+
+
+def provider_rate_limit(exc: BaseException):
+    """Return the provider's Retry-After (seconds) if exc was caused by an upstream 429, else None."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if getattr(exc, "status_code", None) == 429:
+            response = getattr(exc, "response", None)
+            value = response.headers.get("retry-after") if response is not None else None
+            try:
+                return max(1, math.ceil(float(value)))
+            except (TypeError, ValueError):
+                return 1
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+admission = AdmissionController()
+
+Gauge("adgen_admission_in_flight", "Generations currently holding an admission slot", lambda: {(): admission.in_flight})
+Gauge(
+    "adgen_admission_queue_depth",
+    "Requests waiting for an admission slot",
+    lambda: {(name,): admission.queue_depth(name) for name in PRIORITIES},
+    ("priority",),
+)
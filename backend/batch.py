@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import asyncio
+from .cache import response_cache, cache_key
+from .metrics import QUEUE_WAIT_SECONDS
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+
+def parse_batch(text: str, request_model) -> list:
+    """Parse a JSON array or JSONL of requests into (item_id, request-or-error) pairs.
+
+    Items may carry an "id" or "request_id" that is echoed back in the results; lines that
+    are not valid JSON or do not validate become per-item errors instead of failing the batch.
+    """
+    text = text.strip()
+    if text.startswith("["):
+        raw_items = [json.dumps(item) for item in json.loads(text)]
+    else:
+        raw_items = [line for line in text.splitlines() if line.strip()]
+
+    items = []
+    for index, raw in enumerate(raw_items):
+        item_id = index
+        try:
+            data = json.loads(raw)
+            if isinstance(data, dict):
+                item_id = data.get("request_id", data.get("id", index))
+            items.append((item_id, request_model.model_validate(data)))
+        except Exception as e:
+            items.append((item_id, e))
+    return items
+
+
+def cached_generator(generate, model_name: str, prompt_version: str, response_model, priority: str = "batch"):
+    """Wrap a generate(request, priority=...) coroutine with the response cache; provider pacing happens per LLM call."""
+
+    async def run(request):
+        async def miss():
+            return await generate(request, priority=priority)
+
+        key = cache_key(request, model_name, prompt_version)
+        result, _ = await response_cache.get_or_generate(key, miss, response_model)
+        return result
+
+    return run
+
+
+async def _run_one(item_id, request, generate) -> dict:
+    if isinstance(request, Exception):
+        return {"id": item_id, "status": "error", "error": f"Invalid request: {request}"}
+    start = time.perf_counter()
+    try:
+        response = await generate(request)
+        return {"id": item_id, "status": "ok", "seconds": round(time.perf_counter() - start, 3), "response": response.model_dump()}
+    except Exception as e:
+        return {"id": item_id, "status": "error", "seconds": round(time.perf_counter() - start, 3), "error": str(e)}
+
+
+async def run_batch(items: list, generate, concurrency: int = BATCH_CONCURRENCY):
+    """Yield one result dict per item, in completion order, with at most `concurrency` in flight."""
+    results = asyncio.Queue()
+    pending = iter(items)
+    submitted = time.perf_counter()
+
+    async def worker():
+        for item_id, request in pending:
+            QUEUE_WAIT_SECONDS.observe(time.perf_counter() - submitted, queue="batch")
+            await results.put(await _run_one(item_id, request, generate))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(items))))]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def jsonl_lines(results):
+    async for result in results:
+        yield json.dumps(result) + "\n"
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from .metrics import CACHE_REQUESTS
+from .similarity import build_brief_index
+
+
+def normalize_text(value: str) -> str:
+    return " ".join(str(value).split()).casefold()
+
+
+# The audience analysis depends only on these; platform, tone, framework and goal only shape the copy
+INSIGHT_FIELDS = ("product_name", "description", "target_audience")
+
+
+def cache_key(request, model: str, prompt_version: str, fields: tuple = None) -> str:
+    """Canonical hash of a normalized AdRequest (or just the given fields of it) plus the model and prompt template version."""
+    fields = {name: normalize_text(value) for name, value in request.model_dump().items() if fields is None or name in fields}
+    payload = json.dumps({"request": fields, "model": model, "prompt": prompt_version}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def template_version(template: str) -> str:
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+class MemoryCache:
+    """In-process LRU with per-entry TTL, bounded by entry count and total value bytes."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + self.ttl, value)
+            self.size += len(value)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, value = self._entries.pop(key)
+        self.size -= len(value)
+
+
+class SQLiteCache:
+    """Disk-backed cache that survives restarts. Expired rows are skipped on read and purged by a write
+    at most every purge_interval seconds. Calls block on disk; ResponseCache runs them with asyncio.to_thread.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = ".cache/responses.sqlite3", ttl: float = 7 * 24 * 3600, purge_interval: float = 600):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + self.ttl))
+            if now >= self._next_purge:
+                self._next_purge = now + self.purge_interval
+                self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+
+
+class ResponseCache:
+    def __init__(self, backend=None, name: str = "response"):
+        self.backend = backend
+        self.name = name
+
+    def get(self, key: str, model_cls):
+        if self.backend is None:
+            return None
+        cached = self.backend.get(key)
+        CACHE_REQUESTS.inc(cache=self.name, outcome="hit" if cached is not None else "miss")
+        return model_cls.model_validate_json(cached) if cached is not None else None
+
+    def set(self, key: str, response):
+        if self.backend is not None:
+            self.backend.set(key, response.model_dump_json().encode("utf-8"))
+
+    async def aget(self, key: str, model_cls):
+        """get for async callers; a blocking backend (SQLite) is read in a worker thread."""
+        if getattr(self.backend, "blocking", False):
+            return await asyncio.to_thread(self.get, key, model_cls)
+        return self.get(key, model_cls)
+
+    async def aset(self, key: str, response):
+        if getattr(self.backend, "blocking", False):
+            await asyncio.to_thread(self.set, key, response)
+        else:
+            self.set(key, response)
+
+    async def get_or_generate(self, key: str, generate, model_cls):
+        """Return (response, hit). On a miss the awaited result of generate() is stored."""
+        cached = await self.aget(key, model_cls)
+        if cached is not None:
+            return cached, True
+        result = await generate()
+        await self.aset(key, result)
+        return result, False
+
+
+class InsightCache:
+    """AudienceInsight per product and audience, shared by every platform/tone/framework/goal combination.
+
+    Concurrent misses for the same key are coalesced: the first caller generates the full campaign
+    and the others wait for its insights, then only generate their copy. With a BriefIndex
+    (SIMILAR_BRIEFS), a key that misses falls back to the insights of a near-duplicate brief.
+    """
+
+    def __init__(self, cache: ResponseCache, similar=None):
+        self.cache = cache
+        self.similar = similar
+        self._pending = {}  # key -> future of the leader's insights dict (None if it failed)
+        self.hits = 0
+        self.waits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    async def reuse(self, key: str, insight_model, generate, generate_copy, brief: dict = None, namespace: str = ""):
+        """generate_copy(insights dict) when insights for key exist or are being generated, else generate().
+
+        generate() must return a response with an .insights field, which is stored under key.
+        brief holds the fields the key was made from, for the near-duplicate lookup; namespace
+        (the model and insight prompt) keeps briefs whose keys are not interchangeable apart.
+        """
+        cached = await self.cache.aget(key, insight_model)
+        if cached is not None:
+            self.hits += 1
+            return await generate_copy(cached.model_dump())
+        pending = self._pending.get(key)
+        if pending is not None:
+            insights = await asyncio.shield(pending)
+            if insights is not None:
+                self.waits += 1
+                return await generate_copy(insights)
+            return await generate()
+        # Registered before anything is awaited, so concurrent misses for key wait on this one
+        pending = self._pending[key] = asyncio.get_running_loop().create_future()
+        insights = None
+        try:
+            similar = self.similar if brief is not None else None
+            if similar is not None:
+                for neighbor in similar.neighbors(namespace, brief):
+                    cached = await self.cache.aget(neighbor, insight_model)
+                    if cached is not None:
+                        self.similar_hits += 1
+                        CACHE_REQUESTS.inc(cache="similar_briefs", outcome="hit")
+                        # Stored under this key too, so the next identical brief is an exact hit
+                        await self.cache.aset(key, cached)
+                        insights = cached.model_dump()
+                        pending.set_result(insights)
+                        return await generate_copy(insights)
+                CACHE_REQUESTS.inc(cache="similar_briefs", outcome="miss")
+            self.misses += 1
+            response = await generate()
+            insights = response.insights.model_dump()
+            await self.cache.aset(key, response.insights)
+            if similar is not None:
+                similar.add(namespace, key, brief)
+            return response
+        finally:
+            del self._pending[key]
+            if not pending.done():
+                pending.set_result(insights)
+
+    def stats(self) -> dict:
+        reused = self.hits + self.waits + self.similar_hits
+        total = reused + self.misses
+        stats = {
+            "hits": self.hits,
+            "coalesced_waits": self.waits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "in_flight": len(self._pending),
+            "reuse_ratio": round(reused / total, 4) if total else 0.0,
+        }
+        if self.similar is not None:
+            stats["similar_briefs"] = self.similar.stats()
+        return stats
+
+
+def build_cache_backend():
+    kind = os.getenv("RESPONSE_CACHE", "memory").lower()
+    if kind in ("", "off", "none", "0"):
+        return None
+    if kind == "sqlite":
+        return SQLiteCache(
+            path=os.getenv("RESPONSE_CACHE_PATH", ".cache/responses.sqlite3"),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600))),
+        )
+    if kind == "memory":
+        return MemoryCache(
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        )
+    raise ValueError(f"Unknown RESPONSE_CACHE backend: {kind!r} (expected 'memory', 'sqlite' or 'off')")
+
+
+response_cache = ResponseCache(build_cache_backend())
+insight_cache = InsightCache(ResponseCache(build_cache_backend(), name="insights"), similar=build_brief_index())
@@ -0,0 +1,286 @@
+"""Local WhatsApp and SMS copy: GSM-7 transliteration, exact segment counts and fitting to a budget.
+
+An SMS is sent in GSM-7 when every character is in the GSM 03.38 alphabet (160 septets, 153 per
+part once concatenated, the extension characters ^{}\\[~]|€ costing two) and in UCS-2 otherwise
+(70 code units, 67 per part). One emoji or curly quote in model copy is enough to turn a
+one-part message into two or three, so the SMS is transliterated to GSM-7 (quotes, dashes and
+accents mapped, emoji and symbols dropped) unless that would drop letters, e.g. for Hindi or
+Arabic copy, which stays UCS-2. It is then shortened until it fits SMS_MAX_SEGMENTS parts:
+whitespace and repeated punctuation, a few abbreviations, trailing sentences, then words, with
+the call to action and SMS_SUFFIX kept whole. WhatsApp copy keeps its emoji and is fitted to
+WHATSAPP_MAX_CHARS the same way.
+
+CHANNEL_MODE decides what the LLM still does:
+    llm    the model's channel copy as written
+    fit    the model's channel copy, transliterated and fitted (default)
+    local  copy derived from the best-scored variation; the model is not asked for, or repaired on, it
+
+Everything here is str methods and precompiled patterns, tens of microseconds per campaign on
+one core, so python -m backend.cli channels can redo the channel copy of exports of millions.
+
+    python -m bench.channels
+
+measures SMS parts before and after, and the time per campaign of each mode.
+"""
+import os
+import re
+import unicodedata
+
+CHANNEL_MODE = os.getenv("CHANNEL_MODE", "fit")
+if CHANNEL_MODE not in ("llm", "fit", "local"):
+    raise ValueError(f"CHANNEL_MODE must be llm, fit or local, not {CHANNEL_MODE!r}")
+# Whether the model writes the channel_opt section at all
+LLM_CHANNEL = CHANNEL_MODE != "local"
+
+SMS_MAX_SEGMENTS = int(os.getenv("SMS_MAX_SEGMENTS", "1"))
+# Appended to every SMS and never shortened, e.g. " Reply STOP to opt out"
+SMS_SUFFIX = os.getenv("SMS_SUFFIX", "")
+WHATSAPP_MAX_CHARS = int(os.getenv("WHATSAPP_MAX_CHARS", "300"))
+
+# GSM 03.38 default alphabet (without the escape code) and the extension table reached through it
+GSM_BASIC = (
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM_EXTENDED = "\f^{}\\[~]|€"
+# (single message, per part of a concatenated one) in septets or UTF-16 code units
+GSM_LIMITS = (160, 153)
+UCS2_LIMITS = (70, 67)
+
+# Characters outside the GSM alphabet with a GSM spelling; everything else decomposes to one or is dropped
+REPLACEMENTS = {
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'", "´": "'", "`": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"', "«": '"', "»": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-", "−": "-", "⁄": "/",
+    "…": "...", "•": "-", "·": "-", "‣": "-", "©": "(c)", "™": "", "®": "",
+    "₹": "Rs", "¢": "c", "₩": "W", "₽": "RUB", "×": "x", "÷": "/",
+    "ç": "c", "ã": "a", "õ": "o", "Ã": "A", "Õ": "O", "ı": "i", "ł": "l", "Ł": "L", "đ": "d", "Đ": "D",
+    "œ": "oe", "Œ": "OE", "ð": "d", "þ": "th", "Þ": "Th",
+}
+# Stands in for a letter or digit with no GSM spelling: the text cannot become GSM-7 without losing words
+UNMAPPABLE = "\x00"
+
+ABBREVIATIONS = {
+    "and": "&", "with": "w/", "without": "w/o", "percent": "%", "minutes": "mins", "hours": "hrs",
+    "information": "info", "approximately": "approx", "including": "incl",
+}
+
+NON_GSM = re.compile("[^" + re.escape(GSM_BASIC + GSM_EXTENDED) + "]")
+NON_GSM_BASIC = re.compile("[^" + re.escape(GSM_BASIC) + "]")
+# Patterns start with a literal or a character class so re can skip ahead to where they may match
+REPEATED = re.compile(r"([!?])\1+")
+ABBREVIATION = re.compile(r" (?:" + "|".join(ABBREVIATIONS) + "|" + "|".join(word.title() for word in ABBREVIATIONS) + r")\b")
+HASHTAG = re.compile(r" ?#\w+")
+SENTENCE_END = re.compile(r"[.!?]\s+")
+
+CHANNEL_VERSION = f"channels:{CHANNEL_MODE}:{SMS_MAX_SEGMENTS}:{SMS_SUFFIX}:{WHATSAPP_MAX_CHARS}:{len(REPLACEMENTS)}"
+# Stands in for the model's channel_opt section in local mode until the adapter fills it
+PENDING_CHANNEL = {} if LLM_CHANNEL else {"channel_opt": {"whatsapp": "", "sms": ""}}
+
+
+class _Transliteration(dict):
+    """str.translate table from code point to GSM spelling, filled in the first time a character is seen."""
+
+    def __missing__(self, code: int) -> str:
+        char = chr(code)
+        self[code] = value = _transliterate(char)
+        return value
+
+
+def _transliterate(char: str) -> str:
+    if char in GSM_BASIC or char in GSM_EXTENDED:
+        return char
+    if char in REPLACEMENTS:
+        return REPLACEMENTS[char]
+    category = unicodedata.category(char)
+    if category.startswith("Z") or char in "\t\v":
+        return " "
+    # Accented Latin letters and compatibility forms (ﬁ, ½, full-width) decompose to GSM ones
+    base = "".join(c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c))
+    if base and base != char:
+        base = "".join(_transliterate(c) for c in base)
+        if UNMAPPABLE not in base:
+            return base
+    if category[0] in "LN":
+        return UNMAPPABLE
+    # Emoji, symbols, combining marks, joiners and controls
+    return ""
+
+
+_TRANSLITERATION = _Transliteration()
+
+
+def to_gsm7(text: str):
+    """text in the GSM 7-bit alphabet (plus extension table), or None if that would drop letters or digits."""
+    if NON_GSM.search(text) is None:
+        return text
+    converted = text.translate(_TRANSLITERATION)
+    return None if UNMAPPABLE in converted else converted
+
+
+def sms_segments(text: str) -> tuple:
+    """("GSM-7" or "UCS-2", number of SMS parts) text is sent as.
+
+    A concatenated message never splits an escaped extension character or a surrogate pair
+    across parts, so when either is present the parts are counted character by character.
+    """
+    gsm = NON_GSM.search(text) is None
+    if gsm:
+        (single, part), encoding = GSM_LIMITS, "GSM-7"
+        units = len(text) + len(NON_GSM_BASIC.findall(text))
+    else:
+        (single, part), encoding = UCS2_LIMITS, "UCS-2"
+        units = len(text.encode("utf-16-le")) // 2
+    if units <= single:
+        return encoding, 1
+    if units == len(text):
+        return encoding, -(-units // part)
+    segments, used = 1, 0
+    for char in text:
+        cost = 2 if (char in GSM_EXTENDED if gsm else ord(char) > 0xFFFF) else 1
+        if used + cost > part:
+            segments, used = segments + 1, 0
+        used += cost
+    return encoding, segments
+
+
+def _collapse(text: str) -> str:
+    """text on one line with single spaces, and none left before punctuation where an emoji was dropped."""
+    text = " ".join(text.split())
+    for mark in ",.!?;:":
+        if " " + mark in text:
+            text = text.replace(" " + mark, mark)
+    return text
+
+
+def _tidy_lines(text: str) -> str:
+    """text with single spaces and at most one blank line in a row, keeping its line breaks."""
+    text = "\n".join(" ".join(line.split()) for line in text.split("\n"))
+    while "\n\n\n" in text:
+        text = text.replace("\n\n\n", "\n\n")
+    return text
+
+
+def _squeeze(text: str) -> str:
+    if "#" in text:
+        text = HASHTAG.sub("", text)
+    return REPEATED.sub(r"\1", text)
+
+
+def _abbreviate(text: str) -> str:
+    return ABBREVIATION.sub(lambda match: " " + ABBREVIATIONS[match.group()[1:].lower()], text)
+
+
+def _drop_symbols(text: str) -> str:
+    # Only reached for UCS-2 copy, where an emoji costs two code units; marks and joiners below U+2000
+    # belong to scripts (Devanagari, Arabic), above it to emoji sequences (ZWJ, variation selectors)
+    kept = _collapse("".join(char for char in text if ord(char) < 0x2000 or unicodedata.category(char) not in ("So", "Sk", "Cf", "Mn")))
+    # A tail keeps the space that separates it from the body
+    return " " + kept if kept and text.startswith(" ") else kept
+
+
+def _fit(head: str, body: str, tail: str, fits, steps) -> str:
+    """head + body + tail, shortened until fits(text): steps applied in turn, then trailing sentences
+    of body dropped, then words of body, then (only if head and tail alone are too long) the rest."""
+    text = head + body + tail
+    if fits(text):
+        return text
+    for step in steps:
+        head, body, tail = step(head), step(body), step(tail)
+        text = head + body + tail
+        if fits(text):
+            return text
+    ends = [match.start() + 1 for match in SENTENCE_END.finditer(body)]
+    for end in reversed(ends):
+        text = head + body[:end] + tail
+        if fits(text):
+            return text
+    words = body[:ends[0] if ends else len(body)].split(" ")
+    while len(words) > 1:
+        words.pop()
+        text = head + " ".join(words).rstrip(",;:-") + "..." + tail
+        if fits(text):
+            return text
+    words = (head + tail).split(" ")
+    while len(words) > 1:
+        words.pop()
+        text = " ".join(words).rstrip(",;:-") + "..."
+        if fits(text):
+            return text
+    text = words[0]
+    while text and not fits(text):
+        text = text[:-1]
+    return text
+
+
+def _sms_fits(text: str) -> bool:
+    return sms_segments(text)[1] <= SMS_MAX_SEGMENTS
+
+
+def fit_sms(body: str, tail: str = "") -> str:
+    """SMS of body then tail (the call to action, kept whole) plus SMS_SUFFIX, in GSM-7 unless that
+    would drop letters, in at most SMS_MAX_SEGMENTS parts."""
+    tail = f"{tail} {SMS_SUFFIX}"
+    gsm_body, gsm_tail = to_gsm7(body), to_gsm7(tail)
+    if gsm_body is not None and gsm_tail is not None:
+        body, tail, steps = gsm_body, gsm_tail, (_squeeze, _abbreviate)
+    else:
+        steps = (_squeeze, _abbreviate, _drop_symbols)
+    body, tail = _collapse(body), _collapse(tail)
+    if body and tail:
+        tail = " " + tail
+    return _fit("", body, tail, _sms_fits, steps)
+
+
+def fit_whatsapp(head: str, body: str, tail: str = "") -> str:
+    """head + body + tail within WHATSAPP_MAX_CHARS, shortening body first; emoji and line breaks are kept."""
+    return _fit(_tidy_lines(head), _tidy_lines(body).strip(), _tidy_lines(tail), lambda text: len(text) <= WHATSAPP_MAX_CHARS, (_squeeze,))
+
+
+def _sentence(text: str) -> str:
+    text = text.strip()
+    return text if not text or text[-1] in ".!?:" else text + "."
+
+
+def chosen_variation(variations):
+    """The variation with the highest strength_score, or the first when none is scored."""
+    variations = [v for v in variations if isinstance(v, dict)] if isinstance(variations, list) else []
+    if not variations:
+        return None
+    return max(variations, key=lambda v: v.get("strength_score") if isinstance(v.get("strength_score"), (int, float)) else float("-inf"))
+
+
+def variation_channels(variation: dict) -> dict:
+    """ChannelOptimization fields derived from one AdVariation dict."""
+    headline, text, cta = (str(variation.get(key) or "").strip() for key in ("headline", "primary_text", "cta"))
+    return {
+        "whatsapp": fit_whatsapp(f"*{headline}*\n\n" if headline else "", text, f"\n\n👉 {cta}" if cta else ""),
+        "sms": fit_sms(f"{_sentence(headline)} {text}", _sentence(cta)),
+    }
+
+
+def fit_channels(channel_opt: dict) -> dict:
+    """The model's ChannelOptimization fields, fitted; the last sentence of the SMS is kept as its call to action."""
+    sms = _collapse(channel_opt["sms"])
+    last = None
+    for last in SENTENCE_END.finditer(sms):
+        pass
+    body, tail = (sms[:last.start() + 1], sms[last.end():]) if last else (sms, "")
+    return {"whatsapp": fit_whatsapp("", channel_opt["whatsapp"]), "sms": fit_sms(body, tail)}
+
+
+def adapt_channels(data: dict, mode: str = CHANNEL_MODE) -> dict:
+    """data with its channel_opt fitted (fit) or derived from the chosen variation (local) per mode.
+
+    A missing or malformed model channel_opt is derived rather than fitted; without any
+    variation to derive from, data is returned unchanged.
+    """
+    if mode == "llm":
+        return data
+    model = data.get("channel_opt")
+    if mode == "fit" and isinstance(model, dict) and all(isinstance(model.get(key), str) and model[key].strip() for key in ("whatsapp", "sms")):
+        return {**data, "channel_opt": fit_channels(model)}
+    variation = chosen_variation(data.get("variations"))
+    if variation is None:
+        return data
+    return {**data, "channel_opt": variation_channels(variation)}
@@ -0,0 +1,122 @@
+"""Command line entry point for bulk generation.
+
+    python -m backend.cli batch catalog.jsonl -o results.jsonl --concurrency 8
+    python -m backend.cli channels results.jsonl -o channels.jsonl --mode local
+
+batch input is a JSONL file (or JSON array) of AdRequests; "-" reads stdin. Results are written
+as JSONL in completion order, one line per item, with per-item errors.
+
+channels redoes the WhatsApp and SMS copy of an export without the LLM (see backend.channels):
+each line is a batch result, a response or a single variation, and each output line holds its
+channel_opt with the SMS encoding and segment count. Lines are streamed, so exports of millions
+of messages never need to fit in memory.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from .engine import AdRequest, engine_for
+from .llm import MODEL_NAME
+from .batch import parse_batch, cached_generator, run_batch, BATCH_CONCURRENCY
+from .channels import adapt_channels, sms_segments
+
+
+async def run_batch_command(args) -> int:
+    text = sys.stdin.read() if args.input == "-" else open(args.input, encoding="utf-8").read()
+    items = parse_batch(text, AdRequest)
+    engine = engine_for(os.getenv("SCHEMA_VERSION", "v2"))
+    generate = cached_generator(engine.generate, MODEL_NAME, engine.prompt_version, engine.response_model)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    ok = failed = 0
+    start = time.perf_counter()
+    try:
+        async for result in run_batch(items, generate, args.concurrency):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            if result["status"] == "ok":
+                ok += 1
+            else:
+                failed += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"{ok} ok, {failed} failed in {elapsed:.1f}s ({len(items) / elapsed if elapsed else 0:.2f} items/s)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def channel_copy(item, mode: str) -> dict:
+    """channel_opt fields for one export line, or None when it holds no variation to work from."""
+    # Batch results carry the response under "response"; a bare variation stands in for a response of one
+    data = item.get("response", item) if isinstance(item, dict) else None
+    if isinstance(data, dict) and "headline" in data:
+        data = {"variations": [data]}
+    if not isinstance(data, dict):
+        return None
+    return adapt_channels(data, mode).get("channel_opt")
+
+
+def run_channels_command(args) -> int:
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    ok = failed = 0
+    segments = {}
+    start = time.perf_counter()
+    try:
+        for number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = None
+            item_id = item.get("id", number) if isinstance(item, dict) else number
+            channel = channel_copy(item, args.mode)
+            if channel is None:
+                failed += 1
+                out.write(json.dumps({"id": item_id, "status": "error", "error": "No variation to write channel copy from"}) + "\n")
+                continue
+            encoding, count = sms_segments(channel["sms"])
+            segments[count] = segments.get(count, 0) + 1
+            ok += 1
+            out.write(json.dumps({"id": item_id, "status": "ok", "channel_opt": channel, "sms_encoding": encoding, "sms_segments": count}, ensure_ascii=False) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    parts = ", ".join(f"{count} part(s): {n}" for count, n in sorted(segments.items()))
+    print(f"{ok} ok, {failed} failed in {elapsed:.1f}s ({(ok + failed) / elapsed if elapsed else 0:,.0f} lines/s); SMS {parts or '-'}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Generate ad copy for every request in a JSONL file")
+    batch.add_argument("input", help="JSONL or JSON array of AdRequests ('-' for stdin)")
+    batch.add_argument("-o", "--output", default="-", help="Where to write JSONL results (default stdout)")
+    batch.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+
+    channels = commands.add_parser("channels", help="Redo the WhatsApp and SMS copy of exported responses without the LLM")
+    channels.add_argument("input", help="JSONL of batch results, responses or variations ('-' for stdin)")
+    channels.add_argument("-o", "--output", default="-", help="Where to write JSONL results (default stdout)")
+    channels.add_argument("--mode", default="fit", choices=["fit", "local"],
+                          help="fit the existing channel copy, or derive it from the best-scored variation (default fit)")
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        return asyncio.run(run_batch_command(args))
+    if args.command == "channels":
+        return run_channels_command(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
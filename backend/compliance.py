@@ -0,0 +1,318 @@
+"""Local rule-based compliance screen for generated copy.
+
+Rule packs (health claims, financial promises, superlatives, platform-specific phrases) are
+compiled into one matcher per platform: every phrase goes into a trie, and the trie becomes a
+single regular expression, so a scan is one left-to-right pass in re's C engine with shared
+prefixes (Aho-Corasick style) rather than one search per phrase. Scanning a campaign's
+headlines, body text, WhatsApp and SMS copy takes microseconds and yields the same
+ComplianceCheck for the same copy every time.
+
+COMPLIANCE_MODE decides what the LLM still does:
+    llm    the model's compliance section only (the screen is not consulted)
+    merge  the model's section with the screen's findings added in front (default)
+    local  the screen only; the model is not asked for, or repaired on, compliance
+
+COMPLIANCE_RULES names a JSON file of extra packs in the DEFAULT_RULE_PACKS shape; a pack with
+the same name replaces the built-in one, so {"superlatives": {"phrases": []}} disables it.
+"""
+import os
+import re
+import json
+import bisect
+import itertools
+import hashlib
+from .metrics import Counter
+
+COMPLIANCE_MODE = os.getenv("COMPLIANCE_MODE", "merge")
+if COMPLIANCE_MODE not in ("llm", "merge", "local"):
+    raise ValueError(f"COMPLIANCE_MODE must be llm, merge or local, not {COMPLIANCE_MODE!r}")
+# Whether the model writes the compliance section at all
+LLM_COMPLIANCE = COMPLIANCE_MODE != "local"
+
+COMPLIANCE_FINDINGS = Counter("adgen_compliance_findings_total", "Phrases matched by the local compliance screen", ("pack",))
+
+# severity: risk points per distinct phrase found; platforms: only applies there (all when absent)
+DEFAULT_RULE_PACKS = {
+    "health_claims": {
+        "severity": 30,
+        "issue": "Unsubstantiated health claim",
+        "suggestion": "Remove claims that the product cures, treats or prevents a condition unless they are substantiated and approved.",
+        "phrases": [
+            "cure", "cures", "cured", "heals", "treats", "prevents disease", "clinically proven", "scientifically proven",
+            "doctor recommended", "doctor approved", "fda approved", "miracle", "no side effects", "boosts immunity",
+            "lose weight fast", "guaranteed weight loss", "burn fat", "fat burning", "detox", "reverses aging",
+            "anti-aging", "pain free", "pain-free",
+        ],
+    },
+    "financial_promises": {
+        "severity": 35,
+        "issue": "Financial promise or guaranteed outcome",
+        "suggestion": "Do not promise returns, income or approval; describe the offer and add the required risk disclosures.",
+        "phrases": [
+            "guaranteed returns", "guaranteed income", "guaranteed profit", "guaranteed approval", "instant approval",
+            "risk-free", "risk free", "no risk", "zero risk", "double your money", "get rich", "get rich quick",
+            "make money fast", "quick cash", "easy money", "passive income", "financial freedom", "debt free", "debt-free",
+        ],
+    },
+    "superlatives": {
+        "severity": 10,
+        "issue": "Unverifiable superlative",
+        "suggestion": "Back superlatives with a cited source or soften them (e.g. 'one of the most loved').",
+        "phrases": [
+            "#1", "number one", "the best", "world's best", "best in the world", "best ever", "cheapest", "lowest price",
+            "unbeatable", "guaranteed", "100% guaranteed", "never fails", "best-selling", "best selling",
+        ],
+    },
+    "personal_attributes": {
+        "severity": 25,
+        "issue": "Asserts or implies a personal attribute of the viewer",
+        "suggestion": "Describe the product rather than the reader's health, finances, identity or circumstances.",
+        "platforms": ["Facebook", "Instagram", "Meta"],
+        "phrases": [
+            "are you overweight", "are you fat", "are you depressed", "are you anxious", "are you diabetic",
+            "are you in debt", "are you broke", "are you single", "are you pregnant", "your disability",
+            "your religion", "your sexual orientation", "your bankruptcy", "your criminal record",
+        ],
+    },
+    "engagement_bait": {
+        "severity": 15,
+        "issue": "Engagement bait",
+        "suggestion": "Ask for a meaningful action instead of likes, shares, tags or comments.",
+        "platforms": ["Facebook", "Instagram", "Meta", "TikTok"],
+        "phrases": ["tag a friend", "tag your friends", "like and share", "share this post", "comment yes", "like if you agree"],
+    },
+    "editorial": {
+        "severity": 10,
+        "issue": "Editorial policy issue",
+        "suggestion": "Use a specific call to action and standard punctuation and capitalisation.",
+        "platforms": ["Google Ads", "Google"],
+        "phrases": ["click here", "click now", "!!", "free!!!"],
+    },
+}
+
+LEVELS = ("Low", "Medium", "High")
+
+
+class Rule:
+    """One pack as the screen uses it; phrases are matched case-insensitively on word boundaries."""
+
+    def __init__(self, name: str, severity: int, issue: str, suggestion: str, phrases: list, platforms: list = None):
+        self.name = name
+        self.severity = severity
+        self.issue = issue
+        self.suggestion = suggestion
+        self.phrases = [_normalize(phrase) for phrase in phrases if phrase.strip()]
+        self.platforms = {platform.lower() for platform in platforms} if platforms else None
+
+    def applies_to(self, platform: str) -> bool:
+        return self.platforms is None or (platform or "").lower() in self.platforms
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def load_rule_packs(path: str = None) -> dict:
+    packs = dict(DEFAULT_RULE_PACKS)
+    path = path or os.getenv("COMPLIANCE_RULES")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for name, pack in json.load(f).items():
+                packs[name] = {**DEFAULT_RULE_PACKS.get(name, {}), **pack}
+    return packs
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _trie_pattern(phrases) -> str:
+    """One regex matching any of phrases, longest first at each position, with prefixes shared as in a trie.
+
+    A phrase that ends in a word character must not run on into another one ("cure" vs "cured").
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict, last: str) -> str:
+        branches = [(r"\s+" if char == " " else re.escape(char)) + build(child, char) for char, child in sorted(node.items()) if char]
+        ending = r"(?!\w)" if _is_word(last) else ""
+        if not branches:
+            return ending
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A phrase ending here is also a prefix of longer ones: try those first, greedily
+        return f"(?:{body}|{ending})" if "" in node else body
+
+    return build(trie, "")
+
+
+class Matcher:
+    """All phrases of the rules that apply to one platform, compiled into two patterns.
+
+    Phrases starting with a word character must start a word ("cure" not in "secure"); that
+    pattern begins by consuming the \\W before the phrase rather than with a lookbehind, which
+    lets re skip ahead to non-word characters instead of attempting a match at every position.
+    Phrases starting with anything else ("#1", "!!") need no boundary and get their own pattern.
+    """
+
+    def __init__(self, rules: list):
+        self.rules = {}
+        for rule in rules:
+            for phrase in rule.phrases:
+                self.rules.setdefault(phrase, []).append(rule)
+        words = [phrase for phrase in self.rules if _is_word(phrase[0])]
+        symbols = [phrase for phrase in self.rules if not _is_word(phrase[0])]
+        self.words = re.compile(r"\W(" + _trie_pattern(words) + ")") if words else None
+        self.symbols = re.compile(_trie_pattern(symbols)) if symbols else None
+
+    def finditer(self, text: str):
+        """(phrase, start) for every match in lowercased text, the phrase normalized as in the rule pack.
+
+        Text is lowercased once up front: re.IGNORECASE costs about twice as much per character.
+        """
+        if self.words is not None:
+            for match in self.words.finditer("\n" + text):
+                yield _normalize(match.group(1)), match.start(1) - 1
+        if self.symbols is not None:
+            for match in self.symbols.finditer(text):
+                yield _normalize(match.group()), match.start()
+
+
+VARIATION_FIELDS = (("headline", "headline"), ("primary_text", "text"), ("cta", "CTA"))
+CHANNEL_FIELDS = (("whatsapp", "WhatsApp"), ("sms", "SMS"))
+
+
+def _copy_fields(data: dict) -> tuple:
+    """(texts, labels) of every piece of customer-facing copy in a campaign dict, skipping anything malformed.
+
+    A label is (variation number, field), 0 for channel copy; _label formats it only for fields with findings.
+    """
+    texts, labels = [], []
+    variations = data.get("variations")
+    for i, variation in enumerate(variations if isinstance(variations, list) else [], start=1):
+        if isinstance(variation, dict):
+            for key, label in VARIATION_FIELDS:
+                text = variation.get(key)
+                if isinstance(text, str):
+                    texts.append(text)
+                    labels.append((i, label))
+    channel_opt = data.get("channel_opt")
+    if isinstance(channel_opt, dict):
+        for key, label in CHANNEL_FIELDS:
+            text = channel_opt.get(key)
+            if isinstance(text, str):
+                texts.append(text)
+                labels.append((0, label))
+    return texts, labels
+
+
+def _label(field: tuple) -> str:
+    i, label = field
+    return f"variation {i} {label}" if i else label
+
+
+class RuleScreen:
+    def __init__(self, packs: dict):
+        self.rules = [
+            Rule(name, pack.get("severity", 10), pack.get("issue", name), pack.get("suggestion", ""), pack.get("phrases", []), pack.get("platforms"))
+            for name, pack in packs.items()
+        ]
+        self.version = hashlib.sha256(json.dumps(packs, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self._matchers = {}
+
+    def matcher(self, platform: str) -> Matcher:
+        key = (platform or "").lower()
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            matcher = self._matchers[key] = Matcher([rule for rule in self.rules if rule.applies_to(platform)])
+        return matcher
+
+    def scan(self, texts: list, labels: list, platform: str) -> dict:
+        """{(rule, phrase): [labels of the fields it appears in]} for texts and their labels from _copy_fields."""
+        # One pass over all fields joined by newlines; match offsets map back to fields by bisect
+        joined = "\n".join(texts)
+        text = joined.lower()
+        if len(text) != len(joined):
+            # A few characters lowercase to two; keep offsets per field exact
+            texts = [text.lower() for text in texts]
+            text = "\n".join(texts)
+        matcher = self.matcher(platform)
+        findings, starts = {}, None
+        for phrase, start in matcher.finditer(text):
+            if starts is None:
+                starts = list(itertools.accumulate((len(text) + 1 for text in texts[:-1]), initial=0))
+            label = _label(labels[bisect.bisect_right(starts, start) - 1])
+            for rule in matcher.rules[phrase]:
+                found_in = findings.setdefault((rule, phrase), [])
+                if label not in found_in:
+                    found_in.append(label)
+        return findings
+
+    def check(self, data: dict, platform: str) -> dict:
+        """ComplianceCheck fields for a campaign dict (variations and channel_opt), from the rules alone."""
+        findings = self.scan(*_copy_fields(data), platform)
+        score = min(100, sum(rule.severity for rule, _ in findings))
+        issues, suggestions = [], []
+        for (rule, phrase), labels in findings.items():
+            COMPLIANCE_FINDINGS.inc(pack=rule.name)
+            issues.append(f'{rule.issue}: "{phrase}" in {", ".join(labels)}')
+            if rule.suggestion and rule.suggestion not in suggestions:
+                suggestions.append(rule.suggestion)
+        if findings:
+            packs = sorted({rule.name.replace("_", " ") for rule, _ in findings})
+            explanation = f"Rule screen matched {len(findings)} phrase(s) from: {', '.join(packs)}."
+        else:
+            explanation = "Rule screen found no flagged phrases."
+        return {
+            "risk_level": risk_level(score),
+            "risk_score": score,
+            "risk_score_explanation": explanation,
+            "issues": issues,
+            "suggestions": suggestions,
+        }
+
+
+def risk_level(score: int) -> str:
+    return "Low" if score <= 30 else "Medium" if score <= 60 else "High"
+
+
+def merge_compliance(model: dict, local: dict) -> dict:
+    """The model's compliance section with the screen's findings first and the higher of the two risks."""
+    merged = dict(model)
+    for key in ("issues", "suggestions"):
+        theirs = model.get(key) if isinstance(model.get(key), list) else []
+        merged[key] = local[key] + [item for item in theirs if item not in local[key]]
+    if LEVELS.index(local["risk_level"]) > (LEVELS.index(model["risk_level"]) if model.get("risk_level") in LEVELS else -1):
+        merged["risk_level"] = local["risk_level"]
+    score = model.get("risk_score")
+    if isinstance(score, (int, float)) and local["risk_score"] > score:
+        merged["risk_score"] = local["risk_score"]
+        merged["risk_score_explanation"] = f"{model.get('risk_score_explanation', '')} {local['risk_score_explanation']}".strip()
+    return merged
+
+
+def screen_campaign(data: dict, platform: str, screen: "RuleScreen" = None) -> dict:
+    """data with its compliance section filled (local) or pre-filled (merge) by the rule screen per COMPLIANCE_MODE.
+
+    A missing or malformed model compliance section is replaced rather than merged.
+    """
+    if COMPLIANCE_MODE == "llm":
+        return data
+    local = (screen or rule_screen).check(data, platform)
+    model = data.get("compliance")
+    if COMPLIANCE_MODE == "merge" and isinstance(model, dict):
+        local = merge_compliance(model, local)
+    return {**data, "compliance": local}
+
+
+rule_screen = RuleScreen(load_rule_packs())
+# Part of the prompt versions, so cached responses are not served across rule or mode changes
+COMPLIANCE_VERSION = f"compliance:{COMPLIANCE_MODE}:{rule_screen.version}"
+# Stands in for the model's compliance section in local mode until the screen fills it
+PENDING_COMPLIANCE = {} if LLM_COMPLIANCE else {
+    "compliance": {"risk_level": "Low", "risk_score": 0, "risk_score_explanation": "", "issues": [], "suggestions": []}
+}
@@ -0,0 +1,214 @@
+"""Decoding of model output into a response model, tolerant of the usual LLM JSON defects.
+
+Output that parses is taken as-is (orjson when installed). Otherwise repair_json fixes code
+fences and preamble, smart quotes used as string delimiters, raw control characters inside
+strings, trailing commas and truncation, and the result is validated section by section so only
+the sections that are still broken have to be generated again.
+"""
+import json
+from functools import lru_cache
+from pydantic import TypeAdapter, ValidationError
+from .metrics import Counter, stage
+from .sections import generate_sections
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DECODES = Counter("adgen_decode_total", "Model outputs by decode outcome (clean, repaired, failed)", ("outcome",))
+SECTION_REGENERATIONS = Counter("adgen_section_regenerations_total", "Sections generated again because their output did not validate", ("section",))
+
+SMART_QUOTES = "“”„‟"
+STRING_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+class PartialResponse(ValueError):
+    """Model output in which only some sections validated; valid holds those, broken names the rest."""
+
+    def __init__(self, valid: dict, broken: list):
+        super().__init__(f"Sections failed to decode or validate: {', '.join(broken)}")
+        self.valid = valid
+        self.broken = broken
+
+
+def loads(text: str):
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def repair_json(text: str) -> str:
+    """Best-effort rewrite of an LLM's JSON object into valid JSON; the result may still not parse.
+
+    Text outside the outermost object is dropped. Straight and smart quotes both delimit strings,
+    but inside a string a quote only ends it when structure follows (see _ends_string), so
+    unescaped quotes in copy survive. On truncation everything after the last complete value is
+    cut and the open brackets are closed, so a half-written value is lost rather than guessed.
+    """
+    start = text.find("{")
+    if start < 0:
+        return text
+    out = []
+    stack = []  # closing bracket of every open container
+    key_pending = False  # inside an object, before the ":" of the current member
+    in_string = False
+    escape = False
+    safe = (0, ())  # (len(out), stack) after the last complete value
+
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+                out.append(c)
+            elif c == "\\":
+                escape = True
+                out.append(c)
+            elif (c == '"' or c in SMART_QUOTES) and _ends_string(text, i + 1):
+                in_string = False
+                out.append('"')
+                if not (stack[-1] == "}" and key_pending):
+                    safe = (len(out), tuple(stack))
+            elif c == '"':
+                out.append('\\"')
+            else:
+                out.append(STRING_ESCAPES.get(c, c))
+            continue
+        if c == '"' or c in SMART_QUOTES:
+            in_string = True
+            out.append('"')
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+            key_pending = c == "{"
+            out.append(c)
+            safe = (len(out), tuple(stack))
+        elif c in "}]":
+            if not stack or stack[-1] != c:
+                continue
+            _strip_trailing_comma(out)
+            out.append(stack.pop())
+            if not stack:
+                return "".join(out)
+            key_pending = False
+            safe = (len(out), tuple(stack))
+        elif c == ",":
+            safe = (len(out), tuple(stack))
+            key_pending = stack[-1] == "}"
+            out.append(c)
+        elif c == ":":
+            key_pending = False
+            out.append(c)
+        else:
+            out.append(c)
+
+    # Truncated: keep what was complete and close whatever is still open
+    length, open_brackets = safe
+    del out[length:]
+    _strip_trailing_comma(out)
+    out.extend(reversed(open_brackets))
+    return "".join(out)
+
+
+def _next_char(text: str, i: int) -> tuple:
+    while i < len(text) and text[i].isspace():
+        i += 1
+    return i, text[i] if i < len(text) else ""
+
+
+def _ends_string(text: str, i: int) -> bool:
+    """Whether a quote just before text[i] closes its string: a ":", "}", "]" or end of text follows,
+    or a "," followed by something that can start the next value or key."""
+    i, c = _next_char(text, i)
+    if c in ("", ":", "}", "]"):
+        return True
+    if c != ",":
+        return False
+    i, c = _next_char(text, i + 1)
+    return c == "" or c in '"{[-' or c in SMART_QUOTES or c.isdigit() or text.startswith(("true", "false", "null"), i)
+
+
+def _strip_trailing_comma(out: list):
+    end = len(out)
+    while end and out[end - 1].isspace():
+        end -= 1
+    if end and out[end - 1] == ",":
+        del out[end - 1:]
+
+
+def decode_json(text: str) -> dict:
+    """Parse a completion's JSON object, repairing it if needed; raises ValueError when nothing usable is left."""
+    try:
+        data = loads(text)
+        outcome = "clean"
+    except ValueError:
+        try:
+            data = loads(repair_json(text))
+        except ValueError:
+            DECODES.inc(outcome="failed")
+            raise
+        outcome = "repaired"
+    if not isinstance(data, dict):
+        DECODES.inc(outcome="failed")
+        raise ValueError(f"Expected a JSON object from the model, got {type(data).__name__}")
+    DECODES.inc(outcome=outcome)
+    return data
+
+
+@lru_cache(maxsize=None)
+def _field_adapters(response_model) -> dict:
+    return {name: TypeAdapter(field.annotation) for name, field in response_model.model_fields.items()}
+
+
+def build_response(data: dict, response_model, prepare=None):
+    """response_model from the top-level sections in data, or PartialResponse with the ones that validated.
+
+    The whole response goes through the model's prebuilt validator in one call; only when that
+    fails is each section checked on its own (by its field's TypeAdapter) to tell which are broken.
+    """
+    if prepare is not None:
+        data = {key: value if value is None else prepare(key, value) for key, value in data.items()}
+    try:
+        return response_model.model_validate(data)
+    except ValidationError as e:
+        error = e
+    valid, broken = {}, []
+    for key, adapter in _field_adapters(response_model).items():
+        value = data.get(key)
+        try:
+            adapter.validate_python(value)
+        except Exception:
+            broken.append(key)
+            continue
+        valid[key] = value
+    if not broken:
+        raise error
+    raise PartialResponse(valid, broken)
+
+
+def replace_section(response, key: str, value):
+    """Copy of response with section key set to value; only that section is validated."""
+    return response.model_copy(update={key: _field_adapters(type(response))[key].validate_python(value)})
+
+
+def decode_campaign(text: str, response_model, prepare=None, done: dict = None):
+    """response_model for a completion, or PartialResponse with the sections that did validate.
+
+    done holds sections produced elsewhere (e.g. cached insights); they take precedence over the completion's.
+    """
+    done = done or {}
+    try:
+        with stage("json_parse"):
+            data = {**decode_json(text), **done}
+    except ValueError:
+        raise PartialResponse(dict(done), [key for key in response_model.model_fields if key not in done])
+    with stage("validation"):
+        return build_response(data, response_model, prepare)
+
+
+async def regenerate_sections(sections: list, fields: dict, complete, partial: PartialResponse) -> dict:
+    """Generate the broken sections of partial again, plus any section that depends on one, and merge with the rest."""
+    broken = set(partial.broken)
+    redo = [section for section in sections if section.key in broken or broken.intersection(section.depends_on)]
+    for section in redo:
+        SECTION_REGENERATIONS.inc(section=section.key)
+    keep = {key: value for key, value in partial.valid.items() if key not in {section.key for section in redo}}
+    return await generate_sections(redo, fields, complete, done=keep)
@@ -0,0 +1,9 @@
+"""The generation engine shared by backend/main.py and api/index.py.
+
+Each app picks a schema version with SCHEMA_VERSION ("v2" for the FastAPI backend, "v3" for
+the Vercel app by default) and mounts build_router(engine_for(version)). A schema (see v2.py and
+v3.py) is the response model and the prompts that produce it; the Engine runs them.
+"""
+from .schema import AdRequest, ChannelOptimization, MatrixRequest, RegenerateRequest, Schema
+from .core import Engine, engine_for, SCHEMAS, GENERATION_MODE
+from .routes import build_router
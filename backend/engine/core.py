@@ -0,0 +1,306 @@
+import os
+import json
+import asyncio
+from functools import lru_cache
+from ..llm import create_chat_completion, stream_chat_completion, MODEL_NAME
+from ..cache import cache_key, template_version, insight_cache, INSIGHT_FIELDS
+from ..streaming import stream_sections, section_events, response_events
+from ..singleflight import SingleFlight
+from ..sections import Section, generate_sections, with_context
+from ..regenerate import regenerate_piece
+from ..matrix import run_matrix, expand, format_combinations, MATRIX_COMBINATIONS_PER_CALL, MATRIX_TOKENS_PER_COMBINATION
+from ..decoding import decode_json, decode_campaign, build_response, replace_section, regenerate_sections, PartialResponse
+from ..metrics import stage, record_usage, GENERATIONS
+from ..admission import admission
+from ..ranking import rank_variations, RANKING, RANKING_VERSION
+from ..compliance import screen_campaign, COMPLIANCE_MODE, COMPLIANCE_VERSION, LLM_COMPLIANCE, PENDING_COMPLIANCE
+from ..channels import adapt_channels, CHANNEL_MODE, CHANNEL_VERSION, LLM_CHANNEL, PENDING_CHANNEL
+from .schema import AdRequest, MatrixRequest
+from . import v2, v3
+
+# "single" asks one completion for the whole campaign; "parallel" runs the schema's sections concurrently
+GENERATION_MODE = os.getenv("GENERATION_MODE", "single")
+
+SCHEMAS = {schema.version: schema for schema in (v2.SCHEMA, v3.SCHEMA)}
+
+# Sections the local screens write in place of the model, per COMPLIANCE_MODE and CHANNEL_MODE
+PENDING = {**PENDING_COMPLIANCE, **PENDING_CHANNEL}
+LOCAL_VERSIONS = COMPLIANCE_VERSION + CHANNEL_VERSION + RANKING_VERSION
+
+
+class Engine:
+    """Generation, regeneration, streaming and matrix runs for one Schema.
+
+    Both apps mount an Engine through backend.engine.routes; the schema decides the response
+    model and prompts, everything else (caching, coalescing, admission, repair, ranking and the
+    compliance screen) is the same for every version.
+    """
+
+    def __init__(self, schema, mode: str = GENERATION_MODE):
+        self.schema = schema
+        self.mode = mode
+        self.response_model = schema.response_model
+        self.sections = list(schema.sections)
+        # Over-generate-and-rank: the model writes unscored candidates per angle and the local ranker
+        # keeps the best of each, before compliance reviews them; the copy is then always generated per section
+        candidates = Section("variations", schema.candidates_prompt, depends_on=("insights",), finish=self._rank)
+        if RANKING:
+            self.sections = [candidates if section.key == "variations" else section for section in self.sections]
+        # When insights for the product and audience are cached, only the copy is generated, grounded
+        # in them: in one completion in single mode, one per section in parallel mode (which also repairs either)
+        self.copy_sections = [
+            section if section.key == "compliance" or section is candidates
+            else with_context(section, "insights", schema.insight_context, after=schema.section_brief)
+            for section in self.sections if section.key != "insights"
+        ]
+        copy_prompts = schema.copy_prompt + "".join(section.prompt for section in self.copy_sections)
+        self.prompt_versions = {
+            "single": template_version(schema.prompt + copy_prompts + LOCAL_VERSIONS),
+            "parallel": template_version("".join(section.prompt for section in self.sections) + copy_prompts + LOCAL_VERSIONS),
+        }
+        # Insights from either mode are interchangeable, so both prompts that can produce them key the insight cache
+        self.insight_prompt_version = template_version(
+            schema.prompt + next(section.prompt for section in self.sections if section.key == "insights")
+        )
+        self.prompt_version = self.prompt_versions[mode]
+        # Identical concurrent requests share one completion
+        self.flight = SingleFlight()
+
+    def _rank(self, candidates, fields: dict, dependencies: dict) -> list:
+        insights = dependencies["insights"]
+        keywords = insights.get(self.schema.ranking_keywords, []) if isinstance(insights, dict) else []
+        return rank_variations(candidates, fields["platform"], keywords)
+
+    def build_messages(self, request: AdRequest) -> list:
+        return self._messages(self.schema.prompt.format(**request.model_dump()))
+
+    def _messages(self, prompt: str) -> list:
+        return [{"role": "system", "content": self.schema.system_prompt}, {"role": "user", "content": prompt}]
+
+    def _parse_json(self, completion) -> dict:
+        record_usage(completion)
+        with stage("json_parse"):
+            return decode_json(completion.choices[0].message.content)
+
+    async def complete_json(self, prompt: str) -> dict:
+        with stage("llm_call"):
+            return await create_chat_completion(
+                messages=self._messages(prompt),
+                response_format={"type": "json_object"},
+                parse=self._parse_json,
+                **self.schema.completion_options
+            )
+
+    def _campaign_parser(self, done: dict):
+        # Runs inside the LLM call so a hedged duplicate only wins with output that validates;
+        # otherwise PartialResponse carries the sections that did
+        def parse(completion):
+            record_usage(completion)
+            return decode_campaign(completion.choices[0].message.content, self.response_model, done=done)
+        return parse
+
+    def adapt_channels(self, response):
+        # Channel copy is fitted or derived per CHANNEL_MODE before the screen sees it; only that section is revalidated
+        if CHANNEL_MODE == "llm":
+            return response
+        with stage("channel_adapt"):
+            adapted = adapt_channels(response.model_dump(include={"variations", "channel_opt"}))
+            return replace_section(response, "channel_opt", adapted["channel_opt"])
+
+    def screen(self, response, platform: str):
+        # Local rule screen fills or pre-fills compliance per COMPLIANCE_MODE; only that section is revalidated
+        if COMPLIANCE_MODE == "llm":
+            return response
+        with stage("compliance_screen"):
+            screened = screen_campaign(response.model_dump(), platform)
+            return replace_section(response, "compliance", screened["compliance"])
+
+    async def generate(self, request: AdRequest, mode: str = None, priority: str = "interactive"):
+        """Raises admission.Overloaded when no generation slot frees up in time."""
+        mode = mode or self.mode
+        key = cache_key(request, MODEL_NAME, self.prompt_versions[mode])
+        return await self.flight.do(key, lambda: admission.run(lambda: self._generate(request, mode), priority))
+
+    async def _generate(self, request: AdRequest, mode: str, progress=None):
+        # progress(event, payload), when set, gets each section as it is generated (see stream)
+        try:
+            response = self.screen(self.adapt_channels(await self._stages(request, mode, progress)), request.platform)
+            GENERATIONS.inc(status="ok")
+            return response
+        except Exception:
+            GENERATIONS.inc(status="error")
+            raise
+
+    async def _stages(self, request: AdRequest, mode: str, progress=None):
+        key = cache_key(request, MODEL_NAME, self.insight_prompt_version, fields=INSIGHT_FIELDS)
+        return await insight_cache.reuse(
+            key,
+            self.schema.insight_model,
+            lambda: self._campaign(request, mode, progress),
+            lambda insights: self._copy(request, mode, insights, progress),
+            brief=request.model_dump(include=set(INSIGHT_FIELDS)),
+            namespace=f"{MODEL_NAME}:{self.insight_prompt_version}",
+        )
+
+    async def _campaign(self, request: AdRequest, mode: str, progress=None):
+        if mode == "parallel" or RANKING:
+            return await self._sections(self.sections, request, progress=progress)
+        try:
+            with stage("prompt_format"):
+                messages = self.build_messages(request)
+            return await self._complete_campaign(messages, PENDING, progress)
+        except PartialResponse as partial:
+            return await self._repair(self.sections, request, partial)
+
+    async def _copy(self, request: AdRequest, mode: str, insights: dict, progress=None):
+        done = {"insights": insights, **PENDING}
+        if progress is not None:
+            for event in section_events("insights", insights, self.schema.section_models):
+                progress(*event)
+        if mode == "parallel" or RANKING:
+            return await self._sections(self.copy_sections, request, done=done, progress=progress)
+        with stage("prompt_format"):
+            prompt = self.schema.copy_prompt.format(**request.model_dump(), insights=json.dumps(insights, ensure_ascii=False))
+        try:
+            return await self._complete_campaign(self._messages(prompt), done, progress)
+        except PartialResponse as partial:
+            return await self._repair(self.copy_sections, request, partial)
+
+    async def _complete_campaign(self, messages: list, done: dict, progress=None):
+        # One completion for every section not in done; streamed, and passed on section by section, for progress
+        with stage("llm_call"):
+            if progress is None:
+                return await create_chat_completion(
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    parse=self._campaign_parser(done),
+                    **self.schema.completion_options
+                )
+            deltas = stream_chat_completion(messages=messages, **self.schema.completion_options)
+            async for event, payload in stream_sections(deltas, self.schema.section_models, self.response_model, done=done):
+                if event == "done":
+                    return payload
+                progress(event, payload)
+
+    async def _sections(self, sections: list, request: AdRequest, done: dict = None, progress=None):
+        done = {**PENDING, **(done or {})}
+        on_section = None
+        if progress is not None:
+            def on_section(key, value):
+                for event in section_events(key, value, self.schema.section_models):
+                    progress(*event)
+        data = await generate_sections(
+            [s for s in sections if s.key not in done], request.model_dump(), self.complete_json, done=done, on_section=on_section
+        )
+        try:
+            with stage("validation"):
+                return build_response(data, self.response_model)
+        except PartialResponse as partial:
+            return await self._repair(sections, request, partial)
+
+    async def _repair(self, sections: list, request: AdRequest, partial: PartialResponse):
+        # Keep the sections that validated and only pay for the broken ones again
+        with stage("section_repair"):
+            sections = [section for section in sections if section.key not in PENDING]
+            data = await regenerate_sections(sections, request.model_dump(), self.complete_json, partial)
+        with stage("validation"):
+            return build_response(data, self.response_model)
+
+    async def regenerate(self, body, priority: str = "interactive"):
+        """body.previous with only body.target generated again. Raises admission.Overloaded like generate."""
+        return await admission.run(lambda: self._regenerate(body), priority)
+
+    async def _regenerate(self, body):
+        with stage("regenerate"):
+            if body.target == "compliance" and not LLM_COMPLIANCE or body.target == "channel_opt" and not LLM_CHANNEL:
+                response = body.previous
+            else:
+                response = await regenerate_piece(
+                    self.schema.regen_sections, body.request, body.previous, body.target, body.index, self.complete_json
+                )
+        # Channel copy derived from the variations follows a re-rolled one
+        response = self.adapt_channels(response)
+        # Without the model's compliance section the screen is free to rerun on whatever copy changed
+        if body.target == "compliance" or not LLM_COMPLIANCE:
+            response = self.screen(response, body.request.platform)
+        return response
+
+    async def _complete_matrix_chunk(self, brief: dict, insights: dict, chunk: list) -> dict:
+        prompt = self.schema.matrix_prompt.format(
+            **brief, insights=json.dumps(insights, ensure_ascii=False), combinations=format_combinations(chunk)
+        )
+
+        async def call():
+            with stage("llm_call"):
+                return await create_chat_completion(
+                    messages=self._messages(prompt),
+                    response_format={"type": "json_object"},
+                    max_tokens=len(chunk) * MATRIX_TOKENS_PER_COMBINATION,
+                    parse=self._parse_json,
+                    **self.schema.completion_options
+                )
+
+        return await admission.run(call, "batch")
+
+    def matrix(self, body: MatrixRequest, generate, cached=None, store=None):
+        """Async iterator of per-combination results for every platform x framework x tone in body, then a cost report.
+
+        generate(request) runs a full generation, for the first combination and for any the matrix prompt got wrong;
+        cached(request) and store(request, response) read and write the response cache for the others.
+        """
+        brief = body.model_dump(include={"product_name", "description", "target_audience", "campaign_goal"})
+        return run_matrix(
+            brief,
+            expand(body.platforms, body.frameworks, body.tones),
+            AdRequest,
+            self.response_model,
+            generate,
+            self._complete_matrix_chunk,
+            self.build_messages,
+            cached=cached,
+            store=store,
+            finish=lambda request, data: screen_campaign(adapt_channels(data), request.platform),
+            per_call=body.combinations_per_call or MATRIX_COMBINATIONS_PER_CALL,
+        )
+
+    async def stream(self, request: AdRequest):
+        """Yield (event, payload) for each section as soon as it is ready, ending with ("done", response).
+
+        Runs generate's pipeline (insight cache, ranking, repair and the local passes) under the
+        same single-flight key, without a second admission slot: the caller holds one. On cached
+        insights only the copy is generated. Sections the local passes rewrite are held back, and
+        they and any repaired or ranked differently from what was sent go out once the response is
+        final; a stream that joins an in-flight generation gets them all then.
+        """
+        local = {key for key, mode in (("compliance", COMPLIANCE_MODE), ("channel_opt", CHANNEL_MODE)) if mode != "llm"}
+        events, finished = asyncio.Queue(), object()
+
+        def progress(event, payload):
+            if event not in local:
+                events.put_nowait((event, payload))
+
+        key = cache_key(request, MODEL_NAME, self.prompt_version)
+        task = asyncio.ensure_future(self.flight.do(key, lambda: self._generate(request, self.mode, progress)))
+        task.add_done_callback(lambda _: events.put_nowait(finished))
+        sent = {}
+        try:
+            while (item := await events.get()) is not finished:
+                event, payload = item
+                sent[event, payload.get("index")] = payload
+                yield event, payload
+            response = task.result()
+        finally:
+            # Only this stream's wait; the shared generation is shielded and finishes for the cache
+            task.cancel()
+        for event, payload in response_events(response):
+            if sent.get((event, payload.get("index"))) != payload:
+                yield event, payload
+        yield "done", response
+
+
+@lru_cache(maxsize=None)
+def engine_for(version: str) -> Engine:
+    """The Engine for a SCHEMA_VERSION ("v2" or "v3"), one per process."""
+    if version not in SCHEMAS:
+        raise ValueError(f"Unknown schema version {version!r}; expected one of {', '.join(SCHEMAS)}")
+    return Engine(SCHEMAS[version])
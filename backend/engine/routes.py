@@ -0,0 +1,89 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from ..llm import llm_stats, MODEL_NAME
+from ..cache import response_cache, cache_key, insight_cache
+from ..streaming import sse_stream
+from ..batch import parse_batch, cached_generator, run_batch, jsonl_lines, BATCH_CONCURRENCY
+from ..admission import admission, Overloaded, HeldStreamingResponse, overloaded_error, provider_rate_limit
+from ..static import json_response
+from .schema import AdRequest, MatrixRequest
+
+
+def _generation_error(e: Exception) -> HTTPException:
+    if isinstance(e, Overloaded):
+        return overloaded_error(e)
+    retry_after = provider_rate_limit(e)
+    if retry_after is not None:
+        return HTTPException(status_code=429, detail="Upstream model rate limit reached", headers={"Retry-After": str(retry_after)})
+    return HTTPException(status_code=500, detail=str(e))
+
+
+def build_router(engine) -> APIRouter:
+    """The generation endpoints for engine; each app includes it under its own prefix."""
+    router = APIRouter()
+    response_model = engine.response_model
+    regenerate_model = engine.schema.regenerate_model
+
+    async def cached(request):
+        return await response_cache.aget(cache_key(request, MODEL_NAME, engine.prompt_version), response_model)
+
+    async def store(request, response):
+        await response_cache.aset(cache_key(request, MODEL_NAME, engine.prompt_version), response)
+
+    @router.get("/llm/stats")
+    async def get_llm_stats():
+        return {**llm_stats(), "coalescing": engine.flight.stats(), "insight_cache": insight_cache.stats()}
+
+    @router.post("/generate", response_model=response_model)
+    async def generate_ad(request: AdRequest, http: Request):
+        try:
+            key = cache_key(request, MODEL_NAME, engine.prompt_version)
+            result, hit = await response_cache.get_or_generate(key, lambda: engine.generate(request), response_model)
+        except Exception as e:
+            raise _generation_error(e)
+        # Serialized here so a large campaign can go out compressed; response_model still documents it
+        return json_response(http, result.model_dump_json().encode("utf-8"), headers={"X-Cache": "HIT" if hit else "MISS"})
+
+    @router.post("/regenerate", response_model=response_model)
+    async def regenerate(body: regenerate_model):
+        """Re-roll one variation, the compliance check or the channel copy of a previous response."""
+        try:
+            return await engine.regenerate(body)
+        except Exception as e:
+            raise _generation_error(e)
+
+    @router.post("/generate/stream")
+    async def generate_ad_stream(request: AdRequest):
+        key = cache_key(request, MODEL_NAME, engine.prompt_version)
+        hit = await cached(request)
+        events = sse_stream(key, hit, engine.stream(request), response_cache)
+        options = {"media_type": "text/event-stream", "headers": {"X-Cache": "HIT" if hit is not None else "MISS", "Cache-Control": "no-cache"}}
+        if hit is not None:
+            return StreamingResponse(events, **options)
+        try:
+            await admission.acquire("interactive")
+        except Overloaded as e:
+            raise overloaded_error(e)
+        return HeldStreamingResponse(events, admission, **options)
+
+    @router.post("/generate/batch")
+    async def generate_batch(request: Request, concurrency: int = BATCH_CONCURRENCY):
+        """Body is a JSON array or JSONL of AdRequests; results stream back as JSONL in completion order."""
+        try:
+            items = parse_batch((await request.body()).decode("utf-8"), AdRequest)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+        generate = cached_generator(engine.generate, MODEL_NAME, engine.prompt_version, response_model)
+        return StreamingResponse(jsonl_lines(run_batch(items, generate, concurrency)), media_type="application/x-ndjson")
+
+    @router.post("/generate/matrix")
+    async def generate_matrix(body: MatrixRequest):
+        """Every platform x framework x tone for one product, streamed back as JSONL per combination.
+
+        Combinations share one audience analysis and are written several per completion; the last
+        line is a report of tokens and wall-clock against one generation per combination.
+        """
+        generate = cached_generator(engine.generate, MODEL_NAME, engine.prompt_version, response_model)
+        return StreamingResponse(jsonl_lines(engine.matrix(body, generate, cached, store)), media_type="application/x-ndjson")
+
+    return router
@@ -0,0 +1,87 @@
+from typing import Generic, List, Optional, TypeVar, get_args, get_origin
+from pydantic import BaseModel, Field, model_validator
+from ..regenerate import check_target
+from ..matrix import check_matrix
+
+
+class AdRequest(BaseModel):
+    product_name: str = Field(..., example="Silk Aura")
+    description: str = Field(..., example="Hand-woven silk sarees for weddings")
+    target_audience: str = Field(..., example="Women aged 25-45, wedding shoppers")
+    platform: str = Field(..., example="Instagram")
+    campaign_goal: str = Field(..., example="Sales")
+    tone: str = Field(..., example="Emotional")
+    framework: str = Field(default="AIDA", example="PAS") # AIDA, PAS, Problem-Solution, Urgency-Scarcity
+
+
+class ChannelOptimization(BaseModel):
+    whatsapp: str
+    sms: str
+
+
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+
+class RegenerateRequest(BaseModel, Generic[ResponseT]):
+    """Parametrized with a schema's AdResponse, e.g. RegenerateRequest[AdResponse]."""
+
+    request: AdRequest
+    previous: ResponseT
+    target: str = Field(..., example="variation") # variation, compliance, channel_opt
+    index: Optional[int] = Field(default=None, example=2) # which variation, for target "variation"
+
+    @model_validator(mode="after")
+    def validate_target(self):
+        check_target(self.target, self.index, self.previous.variations)
+        return self
+
+
+class MatrixRequest(BaseModel):
+    product_name: str = Field(..., example="Silk Aura")
+    description: str = Field(..., example="Hand-woven silk sarees for weddings")
+    target_audience: str = Field(..., example="Women aged 25-45, wedding shoppers")
+    campaign_goal: str = Field(..., example="Sales")
+    platforms: List[str] = Field(..., example=["Instagram", "Facebook", "Google Ads"])
+    frameworks: List[str] = Field(default=["AIDA", "PAS", "Problem-Solution", "Urgency-Scarcity"])
+    tones: List[str] = Field(..., example=["Emotional", "Professional", "Playful"])
+    combinations_per_call: Optional[int] = Field(default=None, ge=1, example=4)
+
+    @model_validator(mode="after")
+    def validate_matrix(self):
+        check_matrix(self.platforms, self.frameworks, self.tones)
+        return self
+
+
+class Schema:
+    """One response model and the prompts that produce it, selected by SCHEMA_VERSION.
+
+    prompt is the single-completion campaign prompt and sections the per-section ones (see
+    backend.sections); copy_prompt, insight_context and section_brief build the copy-only
+    prompts used on cached insights, candidates_prompt the over-generation prompt for ranking,
+    matrix_prompt the batched matrix prompt. ranking_keywords names the insights field whose terms
+    the ranker scores coverage of; completion_options are passed to every completion.
+    """
+
+    def __init__(self, version: str, response_model, prompt: str, system_prompt: str, section_brief: str,
+                 sections: list, regen_sections: dict, insight_context: str, copy_prompt: str,
+                 candidates_prompt: str, matrix_prompt: str, ranking_keywords: str, completion_options: dict = None):
+        self.version = version
+        self.response_model = response_model
+        self.regenerate_model = RegenerateRequest[response_model]
+        self.insight_model = response_model.model_fields["insights"].annotation
+        # Array sections validate per element when streamed
+        self.section_models = {
+            key: get_args(field.annotation)[0] if get_origin(field.annotation) is list else field.annotation
+            for key, field in response_model.model_fields.items()
+        }
+        self.prompt = prompt
+        self.system_prompt = system_prompt
+        self.section_brief = section_brief
+        self.sections = sections
+        self.regen_sections = regen_sections
+        self.insight_context = insight_context
+        self.copy_prompt = copy_prompt
+        self.candidates_prompt = candidates_prompt
+        self.matrix_prompt = matrix_prompt
+        self.ranking_keywords = ranking_keywords
+        self.completion_options = completion_options or {}
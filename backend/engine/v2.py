@@ -0,0 +1,370 @@
+"""Schema v2: the campaign the FastAPI backend has always returned.
+
+Insights carry a competitive angle, ranked selling points and recommended keywords (filled with
+generic values when the model leaves them out); variations are unscored unless the local ranker
+scores them.
+"""
+from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator, model_serializer
+from ..sections import Section
+from ..ranking import RANK_CANDIDATES_PER_ANGLE
+from .schema import ChannelOptimization, Schema
+
+# Generic values for insight fields the model sometimes omits or leaves empty
+INSIGHT_FALLBACKS = {
+    "competitive_angle": "This product offers unique value through its distinctive features and benefits.",
+    "key_selling_points": ["Core benefit 1", "Core benefit 2", "Core benefit 3"],
+    "recommended_keywords": ["keyword1", "keyword2", "keyword3"],
+    "demographics": "25-45, All genders",
+    "targeting_interests": ["Online shopping", "Fashion", "Lifestyle"],
+    "behaviors": ["Frequent online shoppers", "Engages with brand content"],
+}
+
+
+class AudienceInsight(BaseModel):
+    pain_points: List[str]
+    emotional_triggers: List[str]
+    objections: List[str]
+    competitive_angle: str = Field(..., description="How your product differs from alternatives")
+    key_selling_points: List[str] = Field(..., description="Key selling points ranked by importance")
+    recommended_keywords: List[str] = Field(..., description="Recommended keywords for this campaign")
+    demographics: str = Field(..., description="Age range, gender, and location if applicable")
+    targeting_interests: List[str] = Field(..., description="Specific interests for Meta and Google Ads targeting (e.g., 'Sustainable fashion', 'Vegan lifestyle', 'Ethical shopping')")
+    behaviors: List[str] = Field(..., description="Online behaviors and purchase behaviors for ad targeting")
+
+    @model_validator(mode="before")
+    @classmethod
+    def fill_fallbacks(cls, data):
+        # Part of validation, so every path (single, sections, stream, matrix, cache) gets the same patching
+        if isinstance(data, dict):
+            missing = {key: value for key, value in INSIGHT_FALLBACKS.items() if not data.get(key)}
+            if missing:
+                data = {**data, **missing}
+        return data
+
+
+class AdVariation(BaseModel):
+    headline: str
+    primary_text: str
+    cta: str
+    angle: str # Emotional, Logical, Scarcity
+    strength_score: Optional[float] = None # 0-10, set when variations are ranked locally
+    score_explanation: Optional[str] = None
+
+    @model_serializer(mode="wrap")
+    def drop_unset_scores(self, handler):
+        # Unranked variations serialize as they always have, without the two keys
+        data = handler(self)
+        for key in ("strength_score", "score_explanation"):
+            if data.get(key) is None:
+                data.pop(key, None)
+        return data
+
+
+class ComplianceCheck(BaseModel):
+    risk_level: str # Low, Medium, High
+    issues: List[str]
+    suggestions: List[str]
+
+
+class AdResponse(BaseModel):
+    insights: AudienceInsight
+    variations: List[AdVariation]
+    compliance: ComplianceCheck
+    channel_opt: ChannelOptimization
+
+PROMPT_TEMPLATE = """
+You are an expert Marketing Strategist and Ad Copywriter. Your goal is to generate a comprehensive ad campaign suite.
+
+### INPUT DATA:
+- **Product:** {product_name}
+- **Description:** {description}
+- **Audience:** {target_audience}
+- **Platform:** {platform}
+- **Goal:** {campaign_goal}
+- **Tone:** {tone}
+- **Framework:** {framework}
+
+### YOUR TASK:
+Follow these steps to generate the output:
+
+1. **Audience Analysis**: identify 3 key pain points, 3 emotional triggers, and 3 common objections for this specific audience and product.
+2. **Target Audience Targeting**: Create detailed targeting information for Meta (Facebook/Instagram) and Google Ads:
+   - Demographics: Provide specific age range, gender, and location (if applicable). Be specific (e.g., "25-45, Female, Urban areas").
+   - Targeting Interests: Generate 8-12 specific interests that can be used in Meta and Google Ads. These should be actual interest categories available in ad platforms (e.g., "Sustainable fashion", "Vegan lifestyle", "Ethical shopping", "Eco-friendly products", "Fashion accessories", "Online shopping", "Luxury brands", "Wedding planning").
+   - Behaviors: List 5-7 online behaviors and purchase behaviors (e.g., "Frequent online shoppers", "Engages with fashion content", "Purchases luxury items", "Follows sustainable brands").
+3. **Competitive Analysis**: Analyze how this product differs from alternatives in the market. What makes it unique? What's the competitive angle?
+4. **Key Selling Points**: Identify and rank 5-7 key selling points by importance (most important first). These should be the core benefits that drive purchase decisions.
+5. **Keyword Research**: Generate 8-12 recommended keywords for this campaign. Include a mix of broad, specific, and long-tail keywords relevant to the product and audience.
+6. **Apply Framework**: Use the {framework} framework to structure the ad copies.
+   - AIDA (Attention, Interest, Desire, Action)
+   - PAS (Problem, Agitation, Solution)
+   - Problem-Solution
+   - Urgency-Scarcity
+7. **A/B Testing Variants**: Generate 3 distinct variations with different hooks (Emotional, Logical, Scarcity).
+8. **Channel Optimization**: Convert the primary copy into a highly engaging WhatsApp broadcast message (with emojis) and a concise SMS (max 160 chars).
+9. **Compliance Audit**: Perform a safety check for overpromising claims or sensitive language based on {platform} policies.
+
+### OUTPUT FORMAT (STRICT JSON ONLY):
+{{
+    "insights": {{
+        "pain_points": ["...", "...", "..."],
+        "emotional_triggers": ["...", "...", "..."],
+        "objections": ["...", "...", "..."],
+        "competitive_angle": "A clear explanation of how this product differs from alternatives (2-3 sentences)",
+        "key_selling_points": ["Most important benefit first", "Second most important", "...", "..."],
+        "recommended_keywords": ["keyword1", "keyword2", "...", "..."],
+        "demographics": "Age range, gender, location (e.g., '25-45, Female, Urban areas')",
+        "targeting_interests": ["Interest 1 (for Meta/Google Ads)", "Interest 2", "...", "..."],
+        "behaviors": ["Behavior 1", "Behavior 2", "...", "..."]
+    }},
+    "variations": [
+        {{
+            "headline": "...",
+            "primary_text": "...",
+            "cta": "...",
+            "angle": "Emotional"
+        }},
+        {{
+            "headline": "...",
+            "primary_text": "...",
+            "cta": "...",
+            "angle": "Logical"
+        }},
+        {{
+            "headline": "...",
+            "primary_text": "...",
+            "cta": "...",
+            "angle": "Scarcity"
+        }}
+    ],
+    "compliance": {{
+        "risk_level": "Low/Medium/High",
+        "issues": ["..."],
+        "suggestions": ["..."]
+    }},
+    "channel_opt": {{
+        "whatsapp": "...",
+        "sms": "..."
+    }}
+}}
+"""
+
+SECTION_BRIEF = """
+You are an expert Marketing Strategist and Ad Copywriter.
+
+### INPUT DATA:
+- **Product:** {product_name}
+- **Description:** {description}
+- **Audience:** {target_audience}
+- **Platform:** {platform}
+- **Goal:** {campaign_goal}
+- **Tone:** {tone}
+- **Framework:** {framework}
+"""
+
+SECTIONS = [
+    Section("insights", SECTION_BRIEF + """
+### YOUR TASK:
+1. Identify 3 key pain points, 3 emotional triggers, and 3 common objections for this audience and product.
+2. Targeting for Meta and Google Ads: specific demographics (age range, gender, location), 8-12 targeting interests that exist as ad-platform interest categories, and 5-7 online/purchase behaviors.
+3. Competitive angle: how this product differs from alternatives (2-3 sentences).
+4. Rank 5-7 key selling points by importance (most important first).
+5. 8-12 recommended keywords mixing broad, specific and long-tail terms.
+
+### OUTPUT FORMAT (STRICT JSON ONLY):
+{{
+    "insights": {{
+        "pain_points": ["...", "...", "..."],
+        "emotional_triggers": ["...", "...", "..."],
+        "objections": ["...", "...", "..."],
+        "competitive_angle": "...",
+        "key_selling_points": ["...", "..."],
+        "recommended_keywords": ["...", "..."],
+        "demographics": "...",
+        "targeting_interests": ["...", "..."],
+        "behaviors": ["...", "..."]
+    }}
+}}
+"""),
+    Section("variations", SECTION_BRIEF + """
+### YOUR TASK:
+Use the {framework} framework to write 3 distinct ad variations with different hooks: Emotional, Logical, Scarcity.
+
+### OUTPUT FORMAT (STRICT JSON ONLY):
+{{
+    "variations": [
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Emotional"}},
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Logical"}},
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Scarcity"}}
+    ]
+}}
+"""),
+    Section("compliance", SECTION_BRIEF + """
+### AD COPY TO AUDIT:
+{variations}
+
+### YOUR TASK:
+Perform a safety check of the ad copy above for overpromising claims or sensitive language based on {platform} policies.
+
+### OUTPUT FORMAT (STRICT JSON ONLY):
+{{
+    "compliance": {{
+        "risk_level": "Low/Medium/High",
+        "issues": ["..."],
+        "suggestions": ["..."]
+    }}
+}}
+""", depends_on=("variations",)),
+    Section("channel_opt", SECTION_BRIEF + """
+### YOUR TASK:
+Write a highly engaging WhatsApp broadcast message (with emojis) and a concise SMS (max 160 chars) for this product.
+
+### OUTPUT FORMAT (STRICT JSON ONLY):
+{{
+    "channel_opt": {{
+        "whatsapp": "...",
+        "sms": "..."
+    }}
+}}
+"""),
+]
+
+# Re-rolling one piece reuses the existing insights instead of the full campaign prompt
+REGEN_SECTIONS = {
+    "variation": Section("variation", SECTION_BRIEF + """
+### AUDIENCE INSIGHTS:
+{insights}
+
+### VARIATIONS BEING KEPT:
+{variations}
+
+### YOUR TASK:
+Use the {framework} framework to write 1 new ad variation with the {angle} hook. It must take a clearly different approach from the variations being kept.
+
+### OUTPUT FORMAT (STRICT JSON ONLY):
+{{
+    "variation": {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "{angle}"}}
+}}
+"""),
+    "compliance": next(section for section in SECTIONS if section.key == "compliance"),
+    "channel_opt": Section("channel_opt", SECTION_BRIEF + """
+### AUDIENCE INSIGHTS:
+{insights}
+
+### AD COPY:
+{variations}
+
+### YOUR TASK:
+Convert the ad copy above into a highly engaging WhatsApp broadcast message (with emojis) and a concise SMS (max 160 chars).
+
+### OUTPUT FORMAT (STRICT JSON ONLY):
+{{
+    "channel_opt": {{
+        "whatsapp": "...",
+        "sms": "..."
+    }}
+}}
+"""),
+}
+
+INSIGHT_CONTEXT = """
+### AUDIENCE INSIGHTS (already researched, build on them):
+{insights}
+"""
+
+# When insights for the product and audience are cached, only the copy is generated, grounded in them:
+# in one completion in single mode, one per section in parallel mode (which also repairs either)
+COPY_PROMPT_TEMPLATE = SECTION_BRIEF + INSIGHT_CONTEXT + """
+### YOUR TASK:
+1. Use the {framework} framework to write 3 distinct ad variations with different hooks: Emotional, Logical, Scarcity.
+2. Convert the primary copy into a highly engaging WhatsApp broadcast message (with emojis) and a concise SMS (max 160 chars).
+3. Perform a safety check for overpromising claims or sensitive language based on {platform} policies.
+
+### OUTPUT FORMAT (STRICT JSON ONLY):
+{{
+    "variations": [
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Emotional"}},
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Logical"}},
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Scarcity"}}
+    ],
+    "compliance": {{
+        "risk_level": "Low/Medium/High",
+        "issues": ["..."],
+        "suggestions": ["..."]
+    }},
+    "channel_opt": {{
+        "whatsapp": "...",
+        "sms": "..."
+    }}
+}}
+"""
+
+# Over-generate-and-rank: the model writes unscored candidates per hook and the local ranker keeps
+# the best of each, before compliance reviews them; the copy is then always generated per section
+CANDIDATES_PROMPT = SECTION_BRIEF + INSIGHT_CONTEXT + """
+### YOUR TASK:
+Use the {framework} framework to write {candidates} candidate ad variations for EACH hook: Emotional, Logical, Scarcity. Candidates for the same hook must take clearly different approaches, not reword each other.
+
+### OUTPUT FORMAT (STRICT JSON ONLY), {candidates} entries per hook:
+{{
+    "variations": [
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Emotional"}},
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Logical"}},
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Scarcity"}}
+    ]
+}}
+""".replace("{candidates}", str(RANK_CANDIDATES_PER_ANGLE))
+
+# Matrix runs write several platform/framework/tone combinations per completion on shared insights
+MATRIX_PROMPT_TEMPLATE = """
+You are an expert Marketing Strategist and Ad Copywriter.
+
+### INPUT DATA:
+- **Product:** {product_name}
+- **Description:** {description}
+- **Audience:** {target_audience}
+- **Goal:** {campaign_goal}
+""" + INSIGHT_CONTEXT + """
+### COMBINATIONS:
+{combinations}
+
+### YOUR TASK:
+Write a separate campaign for EACH combination above, in its tone, using its framework and following its platform's policies:
+1. 3 distinct ad variations with different hooks: Emotional, Logical, Scarcity.
+2. A highly engaging WhatsApp broadcast message (with emojis) and a concise SMS (max 160 chars).
+3. A safety check for overpromising claims or sensitive language based on the platform's policies.
+
+### OUTPUT FORMAT (STRICT JSON ONLY), one entry per combination, in order:
+{{
+    "campaigns": [
+        {{
+            "combination": 1,
+            "variations": [
+                {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Emotional"}},
+                {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Logical"}},
+                {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Scarcity"}}
+            ],
+            "compliance": {{"risk_level": "Low/Medium/High", "issues": ["..."], "suggestions": ["..."]}},
+            "channel_opt": {{"whatsapp": "...", "sms": "..."}}
+        }}
+    ]
+}}
+"""
+
+SYSTEM_PROMPT = "You are a world-class marketing engine. Return ONLY JSON. Make sure to include ALL required fields in the insights object: pain_points, emotional_triggers, objections, competitive_angle, key_selling_points, recommended_keywords, demographics, targeting_interests, and behaviors."
+
+SCHEMA = Schema(
+    "v2",
+    AdResponse,
+    prompt=PROMPT_TEMPLATE,
+    system_prompt=SYSTEM_PROMPT,
+    section_brief=SECTION_BRIEF,
+    sections=SECTIONS,
+    regen_sections=REGEN_SECTIONS,
+    insight_context=INSIGHT_CONTEXT,
+    copy_prompt=COPY_PROMPT_TEMPLATE,
+    candidates_prompt=CANDIDATES_PROMPT,
+    matrix_prompt=MATRIX_PROMPT_TEMPLATE,
+    ranking_keywords="recommended_keywords",
+)
@@ -0,0 +1,444 @@
+"""Schema v3: the campaign the Vercel app returns.
+
+Every variation carries a 0-10 strength score, and insights and compliance carry their own
+scores with a short explanation each. Completions run at temperature 0.8.
+"""
+from typing import List
+from pydantic import BaseModel, Field
+from ..sections import Section
+from ..ranking import RANK_CANDIDATES_PER_ANGLE
+from .schema import ChannelOptimization, Schema
+
+
+class AudienceInsight(BaseModel):
+    pain_points: List[str]
+    emotional_triggers: List[str]
+    objections: List[str]
+    targeting_interests: List[str] = Field(description="Pages, Topics, Influencers, Skills")
+    audience_match_score: int = Field(description="Estimated % match with target audience, 0-100")
+    match_score_explanation: str = Field(description="Short reason for the score")
+    demographics: str = Field(description="Age range and Career stage")
+    behaviors: List[str] = Field(description="Key online behaviors or habits")
+
+
+class AdVariation(BaseModel):
+    headline: str
+    primary_text: str
+    cta: str
+    angle: str
+    strength_score: float = Field(ge=0, le=10)
+    score_explanation: str
+
+
+class ComplianceCheck(BaseModel):
+    risk_level: str
+    risk_score: int = Field(description="Risk probability percentage, 0-100")
+    risk_score_explanation: str = Field(description="Short reason for the score")
+    issues: List[str]
+    suggestions: List[str]
+
+
+class AdResponse(BaseModel):
+    insights: AudienceInsight
+    variations: List[AdVariation]
+    compliance: ComplianceCheck
+    channel_opt: ChannelOptimization
+
+
+PROMPT_TEMPLATE = """
+You are an expert digital marketing strategist with 10+ years of experience in audience targeting and ad copywriting. Analyze the following product and create comprehensive marketing intelligence.
+
+**PRODUCT DESCRIPTION:**
+Product: {product_name}
+Description: {description}
+Target Audience: {target_audience}
+
+**CAMPAIGN PARAMETERS:**
+- Goal: {campaign_goal}
+- Framework: {framework}
+- Platform: {platform}
+- Tone: {tone}
+
+---
+
+## PART 1: DEEP AUDIENCE ANALYSIS
+
+First, think deeply about who would genuinely benefit from this product. Then provide:
+
+**Demographics:**
+- Age Range: Be specific (e.g., "23-34" not just "18-35")
+- Career Stage: What point are they at professionally?
+
+**Psychographic Profile:**
+- Pain Points (3): What keeps them up at night? What frustrates them daily? Be specific and visceral.
+- Emotional Triggers (3): What emotions drive their purchase decisions? (Fear of missing out, desire for status, need for security, etc.)
+- Common Objections (3): What makes them hesitate before buying? What doubts do they have?
+
+**Behavioral Patterns (3):**
+Consider their actual daily habits:
+- What platforms do they use and when?
+- How do they consume content? (scrolling, searching, binge-watching)
+- What device do they primarily use?
+
+**Targeting Interests (5):**
+Be specific and actionable. Instead of "fitness," say "CrossFit, Joe Rogan podcast, Whoop fitness tracker, intermittent fasting, David Goggins."
+
+**Audience Match Score:**
+Analyze how well this product aligns with the audience's needs. Consider:
+- How urgent is their pain point?
+- How aware are they of solutions like this?
+- How competitive is the market?
+- How unique is this product's value proposition?
+
+Based on this analysis, assign a precise match score (e.g., 67, 73, 91). Avoid round numbers like 80, 85, 90. Then explain in 2-3 sentences why you gave this specific score.
+
+---
+
+## PART 2: CAMPAIGN STRATEGY
+
+Based on the goal "{campaign_goal}", adjust your approach:
+- If Awareness: Use curiosity-driven hooks that make them want to learn more
+- If Traffic: Lead with value and information, make clicking feel like a smart decision
+- If Sales: Use urgency, social proof, and direct CTAs that demand action NOW
+
+Apply the {framework} framework, but make it feel natural - don't just fill in a template.
+Use a {tone} tone throughout.
+
+---
+
+## PART 3: AD VARIATIONS
+
+Create 3 distinct ad copy variations. Each should feel genuinely different in approach:
+
+**Variation 1: Emotional Appeal**
+Lead with feelings, aspirations, or fears. Make them *feel* something before they think.
+
+**Variation 2: Logical Appeal**  
+Lead with facts, benefits, and rational reasons. Appeal to their smart, analytical side.
+
+**Variation 3: Scarcity/Urgency**
+Create FOMO. Make them feel they'll miss out if they don't act now.
+
+For each variation:
+- Headline (attention-grabbing, max 40 chars)
+- Body copy (2-3 sentences, compelling and specific)
+- Call-to-action (specific and action-oriented)
+
+**SELF-CRITIQUE EACH VARIATION:**
+Rate each ad honestly (0-10 scale). Calculate an overall strength_score as the average of these 4 dimensions:
+- Clarity: Is the message instantly understandable?
+- Emotional Pull: Does it make you *feel* something?
+- Urgency: Does it create a reason to act now?
+- CTA Strength: Is the call-to-action specific and compelling?
+
+For the overall score, briefly explain your reasoning (1-2 sentences).
+
+---
+
+## PART 4: CHANNEL-SPECIFIC OPTIMIZATION
+
+**WhatsApp Broadcast Message:**
+Create a personal, conversational message (max 300 chars including emoji). Should feel like a message from a friend, not a brand.
+
+**SMS Version:**
+Ultra-concise version (max 160 chars). Every word counts.
+
+---
+
+## PART 5: COMPLIANCE & RISK ANALYSIS
+
+Review your ad copy against {platform} policies. Look for:
+- Exaggerated claims or misleading statements
+- Prohibited content
+- Missing disclosures
+- Targeting violations
+- Trademark or copyright concerns
+
+**Risk Score:**
+Calculate a specific risk percentage (e.g., 8, 23, 47). Avoid round numbers like 20, 25, 30. Consider:
+- How aggressive is the language?
+- Are there any gray-area claims?
+- Could any targeting be seen as discriminatory?
+- Does it comply with advertising standards?
+
+Assign a precise risk score and explain in 2-3 sentences what specific elements contribute to this score.
+
+**Risk Level:** Based on your risk_score, assign: "Low" (0-30), "Medium" (31-60), or "High" (61-100).
+
+---
+
+**OUTPUT FORMAT (STRICT JSON ONLY):**
+
+{{
+  "insights": {{
+    "demographics": "Age XX-XX, [Career Stage]",
+    "pain_points": ["...", "...", "..."],
+    "emotional_triggers": ["...", "...", "..."],
+    "objections": ["...", "...", "..."],
+    "behaviors": ["...", "...", "..."],
+    "targeting_interests": ["...", "...", "...", "...", "..."],
+    "audience_match_score": 67,
+    "match_score_explanation": "..."
+  }},
+  "variations": [
+    {{
+      "headline": "...",
+      "primary_text": "...",
+      "cta": "...",
+      "angle": "Emotional",
+      "strength_score": 7.5,
+      "score_explanation": "..."
+    }},
+    {{
+      "headline": "...",
+      "primary_text": "...",
+      "cta": "...",
+      "angle": "Logical",
+      "strength_score": 8.2,
+      "score_explanation": "..."
+    }},
+    {{
+      "headline": "...",
+      "primary_text": "...",
+      "cta": "...",
+      "angle": "Scarcity",
+      "strength_score": 9.1,
+      "score_explanation": "..."
+    }}
+  ],
+  "compliance": {{
+    "risk_level": "Low",
+    "risk_score": 23,
+    "risk_score_explanation": "...",
+    "issues": ["...", "..."],
+    "suggestions": ["...", "..."]
+  }},
+  "channel_opt": {{
+    "whatsapp": "...",
+    "sms": "..."
+  }}
+}}
+
+CRITICAL: Respond ONLY with valid JSON. No markdown, no backticks, no preamble. Just pure JSON.
+"""
+
+SECTION_BRIEF = """
+You are an expert digital marketing strategist with 10+ years of experience in audience targeting and ad copywriting.
+
+**PRODUCT DESCRIPTION:**
+Product: {product_name}
+Description: {description}
+Target Audience: {target_audience}
+
+**CAMPAIGN PARAMETERS:**
+- Goal: {campaign_goal}
+- Framework: {framework}
+- Platform: {platform}
+- Tone: {tone}
+"""
+
+SECTIONS = [
+    Section("insights", SECTION_BRIEF + """
+Analyze who would genuinely benefit from this product: specific age range and career stage, 3 visceral pain points, 3 emotional triggers, 3 objections, 3 behavioral patterns, and 5 specific targeting interests (pages, topics, influencers, skills).
+Assign a precise audience match score (avoid round numbers) and explain it in 2-3 sentences.
+
+**OUTPUT FORMAT (STRICT JSON ONLY):**
+{{
+  "insights": {{
+    "demographics": "Age XX-XX, [Career Stage]",
+    "pain_points": ["...", "...", "..."],
+    "emotional_triggers": ["...", "...", "..."],
+    "objections": ["...", "...", "..."],
+    "behaviors": ["...", "...", "..."],
+    "targeting_interests": ["...", "...", "...", "...", "..."],
+    "audience_match_score": 67,
+    "match_score_explanation": "..."
+  }}
+}}
+"""),
+    Section("variations", SECTION_BRIEF + """
+Apply the {framework} framework naturally in a {tone} tone, adjusted for the "{campaign_goal}" goal. Create 3 distinct variations: Emotional, Logical, and Scarcity/Urgency.
+Each has a headline (max 40 chars), 2-3 sentence body and a specific CTA. Rate each honestly 0-10 as the average of clarity, emotional pull, urgency and CTA strength, with a 1-2 sentence explanation.
+
+**OUTPUT FORMAT (STRICT JSON ONLY):**
+{{
+  "variations": [
+    {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Emotional", "strength_score": 7.5, "score_explanation": "..."}},
+    {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Logical", "strength_score": 8.2, "score_explanation": "..."}},
+    {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Scarcity", "strength_score": 9.1, "score_explanation": "..."}}
+  ]
+}}
+"""),
+    Section("compliance", SECTION_BRIEF + """
+**AD COPY TO REVIEW:**
+{variations}
+
+Review the ad copy above against {platform} policies: exaggerated or misleading claims, prohibited content, missing disclosures, targeting violations, trademark concerns.
+Assign a precise risk score (avoid round numbers), explain it in 2-3 sentences, and set risk_level "Low" (0-30), "Medium" (31-60) or "High" (61-100).
+
+**OUTPUT FORMAT (STRICT JSON ONLY):**
+{{
+  "compliance": {{
+    "risk_level": "Low",
+    "risk_score": 23,
+    "risk_score_explanation": "...",
+    "issues": ["...", "..."],
+    "suggestions": ["...", "..."]
+  }}
+}}
+""", depends_on=("variations",)),
+    Section("channel_opt", SECTION_BRIEF + """
+Write a personal, conversational WhatsApp broadcast message (max 300 chars including emoji) that feels like a message from a friend, and an ultra-concise SMS (max 160 chars).
+
+**OUTPUT FORMAT (STRICT JSON ONLY):**
+{{
+  "channel_opt": {{
+    "whatsapp": "...",
+    "sms": "..."
+  }}
+}}
+"""),
+]
+
+# Re-rolling one piece reuses the existing insights instead of the full campaign prompt
+REGEN_SECTIONS = {
+    "variation": Section("variation", SECTION_BRIEF + """
+**AUDIENCE INSIGHTS:**
+{insights}
+
+**VARIATIONS BEING KEPT:**
+{variations}
+
+Apply the {framework} framework naturally in a {tone} tone and write 1 new variation with the {angle} hook, taking a clearly different approach from the variations being kept.
+Headline max 40 chars, 2-3 sentence body and a specific CTA. Rate it honestly 0-10 as the average of clarity, emotional pull, urgency and CTA strength, with a 1-2 sentence explanation.
+
+**OUTPUT FORMAT (STRICT JSON ONLY):**
+{{
+  "variation": {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "{angle}", "strength_score": 7.8, "score_explanation": "..."}}
+}}
+"""),
+    "compliance": next(section for section in SECTIONS if section.key == "compliance"),
+    "channel_opt": Section("channel_opt", SECTION_BRIEF + """
+**AUDIENCE INSIGHTS:**
+{insights}
+
+**AD COPY:**
+{variations}
+
+Turn the ad copy above into a personal, conversational WhatsApp broadcast message (max 300 chars including emoji) that feels like a message from a friend, and an ultra-concise SMS (max 160 chars).
+
+**OUTPUT FORMAT (STRICT JSON ONLY):**
+{{
+  "channel_opt": {{
+    "whatsapp": "...",
+    "sms": "..."
+  }}
+}}
+"""),
+}
+
+INSIGHT_CONTEXT = """
+**AUDIENCE INSIGHTS (already researched, build on them):**
+{insights}
+"""
+
+# When insights for the product and audience are cached, only the copy is generated, grounded in them:
+# in one completion in single mode, one per section in parallel mode (which also repairs either)
+COPY_PROMPT_TEMPLATE = SECTION_BRIEF + INSIGHT_CONTEXT + """
+Apply the {framework} framework naturally in a {tone} tone, adjusted for the "{campaign_goal}" goal, and build on the insights above.
+
+1. Create 3 distinct variations: Emotional, Logical, and Scarcity/Urgency. Each has a headline (max 40 chars), 2-3 sentence body and a specific CTA. Rate each honestly 0-10 as the average of clarity, emotional pull, urgency and CTA strength, with a 1-2 sentence explanation.
+2. Write a personal, conversational WhatsApp broadcast message (max 300 chars including emoji) that feels like a message from a friend, and an ultra-concise SMS (max 160 chars).
+3. Review your ad copy against {platform} policies: exaggerated or misleading claims, prohibited content, missing disclosures, targeting violations, trademark concerns. Assign a precise risk score (avoid round numbers), explain it in 2-3 sentences, and set risk_level "Low" (0-30), "Medium" (31-60) or "High" (61-100).
+
+**OUTPUT FORMAT (STRICT JSON ONLY):**
+{{
+  "variations": [
+    {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Emotional", "strength_score": 7.5, "score_explanation": "..."}},
+    {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Logical", "strength_score": 8.2, "score_explanation": "..."}},
+    {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Scarcity", "strength_score": 9.1, "score_explanation": "..."}}
+  ],
+  "compliance": {{
+    "risk_level": "Low",
+    "risk_score": 23,
+    "risk_score_explanation": "...",
+    "issues": ["...", "..."],
+    "suggestions": ["...", "..."]
+  }},
+  "channel_opt": {{
+    "whatsapp": "...",
+    "sms": "..."
+  }}
+}}
+"""
+
+# Over-generate-and-rank: the model writes unscored candidates per angle and the local ranker keeps
+# the best of each (and sets strength_score), before compliance reviews them
+CANDIDATES_PROMPT = SECTION_BRIEF + INSIGHT_CONTEXT + """
+Apply the {framework} framework naturally in a {tone} tone, adjusted for the "{campaign_goal}" goal. Create {candidates} candidate variations for EACH angle: Emotional, Logical, and Scarcity/Urgency.
+Each has a headline (max 40 chars), 2-3 sentence body and a specific CTA. Candidates for the same angle must take clearly different approaches, not reword each other. Do not score them.
+
+**OUTPUT FORMAT (STRICT JSON ONLY), {candidates} entries per angle:**
+{{
+  "variations": [
+    {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Emotional"}},
+    {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Logical"}},
+    {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Scarcity"}}
+  ]
+}}
+""".replace("{candidates}", str(RANK_CANDIDATES_PER_ANGLE))
+
+# Matrix runs write several platform/framework/tone combinations per completion on shared insights
+MATRIX_PROMPT_TEMPLATE = """
+You are an expert digital marketing strategist with 10+ years of experience in audience targeting and ad copywriting.
+
+**PRODUCT DESCRIPTION:**
+Product: {product_name}
+Description: {description}
+Target Audience: {target_audience}
+Goal: {campaign_goal}
+""" + INSIGHT_CONTEXT + """
+**COMBINATIONS:**
+{combinations}
+
+Write a separate campaign for EACH combination above, applying its framework naturally in its tone and reviewing it against its platform's policies:
+
+1. Create 3 distinct variations: Emotional, Logical, and Scarcity/Urgency. Each has a headline (max 40 chars), 2-3 sentence body and a specific CTA. Rate each honestly 0-10 as the average of clarity, emotional pull, urgency and CTA strength, with a 1-2 sentence explanation.
+2. Write a personal, conversational WhatsApp broadcast message (max 300 chars including emoji) and an ultra-concise SMS (max 160 chars).
+3. Assign a precise compliance risk score (avoid round numbers), explain it in 2-3 sentences, and set risk_level "Low" (0-30), "Medium" (31-60) or "High" (61-100).
+
+**OUTPUT FORMAT (STRICT JSON ONLY), one entry per combination, in order:**
+{{
+  "campaigns": [
+    {{
+      "combination": 1,
+      "variations": [
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Emotional", "strength_score": 7.5, "score_explanation": "..."}},
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Logical", "strength_score": 8.2, "score_explanation": "..."}},
+        {{"headline": "...", "primary_text": "...", "cta": "...", "angle": "Scarcity", "strength_score": 9.1, "score_explanation": "..."}}
+      ],
+      "compliance": {{"risk_level": "Low", "risk_score": 23, "risk_score_explanation": "...", "issues": ["..."], "suggestions": ["..."]}},
+      "channel_opt": {{"whatsapp": "...", "sms": "..."}}
+    }}
+  ]
+}}
+"""
+
+SYSTEM_PROMPT = "You are a world-class marketing engine. Return ONLY JSON. For all numeric scores, use precise specific numbers based on your analysis - never use common round numbers like 80, 85, 90, 20, 25."
+
+SCHEMA = Schema(
+    "v3",
+    AdResponse,
+    prompt=PROMPT_TEMPLATE,
+    system_prompt=SYSTEM_PROMPT,
+    section_brief=SECTION_BRIEF,
+    sections=SECTIONS,
+    regen_sections=REGEN_SECTIONS,
+    insight_context=INSIGHT_CONTEXT,
+    copy_prompt=COPY_PROMPT_TEMPLATE,
+    candidates_prompt=CANDIDATES_PROMPT,
+    matrix_prompt=MATRIX_PROMPT_TEMPLATE,
+    # These insights have no recommended_keywords; targeting interests are the closest terms to cover
+    ranking_keywords="targeting_interests",
+    completion_options={"temperature": 0.8},
+)
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from .cache import cache_key
+from .admission import Overloaded
+from .decoding import PartialResponse
+from .router import should_fail_over
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", ".cache/jobs.sqlite3")
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "8"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "4"))
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE", "2.0"))
+JOB_RETRY_MAX = 300.0
+JOB_POLL_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    total INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    item_id TEXT NOT NULL,
+    request TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    finished_at REAL,
+    PRIMARY KEY (job_id, position)
+);
+CREATE INDEX IF NOT EXISTS job_items_pending ON job_items (status, next_attempt_at);
+"""
+
+
+def job_key(items: list, model_name: str, prompt_version: str) -> str:
+    """Idempotent job id: the same list of ids and requests always maps to the same job."""
+    digest = hashlib.sha256()
+    for item_id, request in items:
+        digest.update(f"{item_id}\t".encode("utf-8"))
+        if isinstance(request, Exception):
+            digest.update(b"invalid")
+        else:
+            digest.update(cache_key(request, model_name, prompt_version).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()[:32]
+
+
+def retryable(exc: BaseException) -> bool:
+    """Worth another attempt later: admission overload, the provider's failures and model output that would not validate."""
+    return isinstance(exc, (Overloaded, PartialResponse)) or should_fail_over(exc)
+
+
+class JobStore:
+    """SQLite-backed job/item state. Every completed item is committed, so a restart loses nothing.
+
+    Calls block on the database; async callers run them with asyncio.to_thread.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: str, items: list) -> bool:
+        """Create the job unless it already exists. Returns True if it was newly created."""
+        now = time.time()
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone():
+                return False
+            self._conn.execute("BEGIN")
+            self._conn.execute("INSERT INTO jobs (id, total, created_at) VALUES (?, ?, ?)", (job_id, len(items), now))
+            for position, (item_id, request) in enumerate(items):
+                if isinstance(request, Exception):
+                    row = (job_id, position, str(item_id), None, "failed", f"Invalid request: {request}", now)
+                else:
+                    row = (job_id, position, str(item_id), request.model_dump_json(), "pending", None, None)
+                self._conn.execute(
+                    "INSERT INTO job_items (job_id, position, item_id, request, status, error, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+            self._conn.execute("COMMIT")
+        self._finish_if_done(job_id)
+        return True
+
+    def requeue_interrupted(self) -> int:
+        """Resume from checkpoint: items left 'running' by a dead worker go back to pending."""
+        with self._lock:
+            return self._conn.execute("UPDATE job_items SET status = 'pending' WHERE status = 'running'").rowcount
+
+    def claim(self, limit: int) -> list:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, position, request, attempts FROM job_items WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            for job_id, position, _, _ in rows:
+                self._conn.execute("UPDATE job_items SET status = 'running', attempts = attempts + 1 WHERE job_id = ? AND position = ?", (job_id, position))
+                self._conn.execute("UPDATE jobs SET started_at = COALESCE(started_at, ?) WHERE id = ?", (now, job_id))
+        return [(job_id, position, request, attempts + 1) for job_id, position, request, attempts in rows]
+
+    def complete(self, job_id: str, position: int, result: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = 'done', result = ?, error = NULL, finished_at = ? WHERE job_id = ? AND position = ?",
+                (result, time.time(), job_id, position),
+            )
+        self._finish_if_done(job_id)
+
+    def fail(self, job_id: str, position: int, error: str, retry_at=None):
+        with self._lock:
+            if retry_at is None:
+                self._conn.execute(
+                    "UPDATE job_items SET status = 'failed', error = ?, finished_at = ? WHERE job_id = ? AND position = ?",
+                    (error, time.time(), job_id, position),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE job_items SET status = 'pending', error = ?, next_attempt_at = ? WHERE job_id = ? AND position = ?",
+                    (error, retry_at, job_id, position),
+                )
+        if retry_at is None:
+            self._finish_if_done(job_id)
+
+    def _finish_if_done(self, job_id: str):
+        with self._lock:
+            open_items = self._conn.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status IN ('pending', 'running')", (job_id,)
+            ).fetchone()[0]
+            if open_items == 0:
+                last = self._conn.execute("SELECT MAX(finished_at) FROM job_items WHERE job_id = ?", (job_id,)).fetchone()[0]
+                self._conn.execute("UPDATE jobs SET finished_at = COALESCE(finished_at, ?) WHERE id = ?", (last or time.time(), job_id))
+
+    def status(self, job_id: str):
+        with self._lock:
+            job = self._conn.execute("SELECT total, created_at, started_at, finished_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)).fetchall())
+            retries = self._conn.execute("SELECT COALESCE(SUM(MAX(attempts - 1, 0)), 0) FROM job_items WHERE job_id = ?", (job_id,)).fetchone()[0]
+        total, created_at, started_at, finished_at = job
+        done = counts.get("done", 0)
+        elapsed = ((finished_at or time.time()) - started_at) if started_at else 0.0
+        return {
+            "job_id": job_id,
+            "status": "finished" if finished_at else ("running" if started_at else "queued"),
+            "total": total,
+            "done": done,
+            "failed": counts.get("failed", 0),
+            "pending": counts.get("pending", 0) + counts.get("running", 0),
+            "retries": retries,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "elapsed_seconds": round(elapsed, 3),
+            "items_per_second": round(done / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+
+    def results(self, job_id: str) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_id, status, attempts, result, error FROM job_items WHERE job_id = ? AND status IN ('done', 'failed') ORDER BY finished_at",
+                (job_id,),
+            ).fetchall()
+        return [
+            {"id": item_id, "status": "ok", "attempts": attempts, "response": json.loads(result)} if status == "done"
+            else {"id": item_id, "status": "error", "attempts": attempts, "error": error}
+            for item_id, status, attempts, result, error in rows
+        ]
+
+
+class JobWorker:
+    """Pulls pending items from the store and runs them with bounded concurrency, retrying retryable failures with backoff."""
+
+    def __init__(self, store: JobStore, generate, request_model, concurrency: int = JOB_CONCURRENCY, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.store = store
+        self.generate = generate
+        self.request_model = request_model
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._wake = asyncio.Event()
+        self._running = set()
+
+    def notify(self):
+        self._wake.set()
+
+    async def run(self):
+        await asyncio.to_thread(self.store.requeue_interrupted)
+        try:
+            while True:
+                free = self.concurrency - len(self._running)
+                claimed = await asyncio.to_thread(self.store.claim, free) if free > 0 else []
+                for job_id, position, request, attempt in claimed:
+                    task = asyncio.create_task(self._run_item(job_id, position, request, attempt))
+                    self._running.add(task)
+                    task.add_done_callback(self._on_done)
+                if not claimed:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), JOB_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            for task in self._running:
+                task.cancel()
+
+    def _on_done(self, task):
+        self._running.discard(task)
+        self._wake.set()
+
+    async def _run_item(self, job_id: str, position: int, request_json: str, attempt: int):
+        try:
+            request = self.request_model.model_validate_json(request_json)
+            response = await self.generate(request)
+            await asyncio.to_thread(self.store.complete, job_id, position, response.model_dump_json())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempt >= self.max_attempts or not retryable(e):
+                await asyncio.to_thread(self.store.fail, job_id, position, str(e))
+            else:
+                delay = min(JOB_RETRY_BASE * 2 ** (attempt - 1), JOB_RETRY_MAX)
+                await asyncio.to_thread(self.store.fail, job_id, position, str(e), time.time() + delay)
@@ -0,0 +1,33 @@
+"""Deferred imports for the serverless entry point.
+
+A cold start of api/index.py pays for every module imported at module level before the first
+byte goes out. The LLM SDK, httpx and NumPy are only needed once a generation runs (NumPy only
+with ranking on), so the modules that use them bind them with lazy_import: the module object
+exists straight away and is executed on its first attribute access. Annotations that name these
+modules are kept as strings (from __future__ import annotations) so defining a function does
+not count as an access.
+
+    python -X importtime -c "import api.index"
+
+and bench/cold_start.py show what importing the entry point costs per package.
+"""
+import sys
+import importlib.util
+
+
+def lazy_import(name: str):
+    """The module called name, executed on first attribute access (importlib.util.LazyLoader).
+
+    An already imported module is returned as is; a missing one raises ImportError here, not on use.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import asyncio
+from types import SimpleNamespace
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from .lazy import lazy_import
+from .metrics import QUEUE_WAIT_SECONDS, Gauge
+from .ratelimit import provider_scheduler
+from .router import Router
+
+# Loaded on the first client or timeout built, so a cold start that only serves the UI skips them
+httpx = lazy_import("httpx")
+groq = lazy_import("groq")
+
+load_dotenv()
+
+# "async" awaits the native AsyncGroq client, "thread" runs the sync client on a bounded executor.
+# Either way the event loop stays free while the completion is in flight.
+LLM_CALL_MODE = os.getenv("LLM_CALL_MODE", "async")
+LLM_THREAD_WORKERS = int(os.getenv("LLM_THREAD_WORKERS", "64"))
+
+# Transport tuning shared by every LLM call in the process
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "100"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "0").lower() in ("1", "true", "yes")
+
+# Providers in preference order until latency stats take over; each is configured by
+# <NAME>_KIND (groq|openai), <NAME>_BASE_URL, <NAME>_API_KEY, <NAME>_MODEL and <NAME>_TIMEOUT.
+LLM_PROVIDERS = [name.strip() for name in os.getenv("LLM_PROVIDERS", "groq").split(",") if name.strip()]
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+_executor = None
+
+
+class ConnectionStats:
+    """Counts requests and new connections via httpcore trace events; the difference is keep-alive reuse."""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def record(self, event: str):
+        if event == "connection.connect_tcp.complete":
+            self.new_connections += 1
+        elif event.endswith("send_request_headers.started"):
+            self.requests += 1
+
+    def trace(self, event: str, info: dict):
+        self.record(event)
+
+    async def atrace(self, event: str, info: dict):
+        self.record(event)
+
+    def on_request(self, request: httpx.Request):
+        request.extensions["trace"] = self.trace
+
+    async def aon_request(self, request: httpx.Request):
+        request.extensions["trace"] = self.atrace
+
+    def _enter(self):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+
+connection_stats = ConnectionStats()
+
+
+class InFlightTransport:
+    """Wraps an httpx transport to count requests awaiting response headers in connection_stats.
+
+    The count is dropped in a finally around the send, so connect errors, timeouts and cancelled
+    requests leave it as well as answered ones; everything else is delegated to the wrapped transport.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        connection_stats._enter()
+        try:
+            return self.transport.handle_request(request)
+        finally:
+            connection_stats.in_flight -= 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        connection_stats._enter()
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            connection_stats.in_flight -= 1
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+Gauge("adgen_llm_in_flight", "LLM HTTP requests currently awaiting response headers", lambda: {(): connection_stats.in_flight})
+Gauge("adgen_llm_http_requests", "LLM HTTP requests sent since start", lambda: {(): connection_stats.requests})
+Gauge("adgen_llm_new_connections", "LLM connections opened since start (requests minus this is keep-alive reuse)", lambda: {(): connection_stats.new_connections})
+
+
+def _transport_settings(timeout: httpx.Timeout, transport_class) -> dict:
+    if LLM_HTTP2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            raise RuntimeError("LLM_HTTP2=1 requires the h2 package (pip install 'httpx[http2]')")
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+    return {
+        "transport": InFlightTransport(transport_class(limits=limits, http2=LLM_HTTP2)),
+        "timeout": timeout,
+    }
+
+
+def llm_timeout(read: float = LLM_READ_TIMEOUT) -> httpx.Timeout:
+    return httpx.Timeout(read, connect=LLM_CONNECT_TIMEOUT, pool=LLM_POOL_TIMEOUT)
+
+
+class ProviderError(Exception):
+    """Non-2xx answer from an OpenAI-compatible endpoint; mirrors the SDK's status_code/response attributes."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"Error code: {response.status_code} - {response.text[:500]}")
+        self.status_code = response.status_code
+        self.response = response
+
+
+def _namespace(value):
+    """Attribute access over decoded JSON, so plain-HTTP completions look like SDK objects to callers."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_namespace(item) for item in value]
+    return value
+
+
+class Provider:
+    """One OpenAI-compatible chat completions endpoint.
+
+    kind "groq" goes through the Groq SDK and honours LLM_CALL_MODE; kind "openai" speaks plain
+    POST {base_url}/chat/completions over httpx, which covers local servers (vLLM, Ollama,
+    llama.cpp) and other hosted APIs. Each provider has its own pool and rate-limit scheduler.
+    """
+
+    def __init__(self, name: str, max_retries: int = LLM_MAX_RETRIES):
+        prefix = name.upper()
+        self.name = name
+        self.kind = os.getenv(f"{prefix}_KIND", "groq" if name == "groq" else "openai")
+        self.base_url = os.getenv(f"{prefix}_BASE_URL")
+        self.api_key = os.getenv(f"{prefix}_API_KEY")
+        self.model = os.getenv(f"{prefix}_MODEL", DEFAULT_MODEL)
+        self.read_timeout = float(os.getenv(f"{prefix}_TIMEOUT", str(LLM_READ_TIMEOUT)))
+        self.max_retries = max_retries
+        self.scheduler = provider_scheduler(name)
+        self._async_client = None
+        self._sync_client = None
+        if self.kind not in ("groq", "openai"):
+            raise ValueError(f"Unknown {prefix}_KIND: {self.kind!r} (expected 'groq' or 'openai')")
+        if self.kind == "openai" and not self.base_url:
+            raise ValueError(f"{prefix}_BASE_URL is required for OpenAI-compatible provider {name!r}")
+
+    @cached_property
+    def timeout(self) -> httpx.Timeout:
+        return llm_timeout(self.read_timeout)
+
+    def _observe(self, response: httpx.Response):
+        self.scheduler.observe(response.status_code, response.headers)
+
+    async def _aobserve(self, response: httpx.Response):
+        self.scheduler.observe(response.status_code, response.headers)
+
+    def async_client(self):
+        if self._async_client is None:
+            http_client = httpx.AsyncClient(
+                event_hooks={"request": [connection_stats.aon_request], "response": [self._aobserve]},
+                **_transport_settings(self.timeout, httpx.AsyncHTTPTransport),
+            )
+            if self.kind == "groq":
+                self._async_client = groq.AsyncGroq(
+                    api_key=self.api_key, base_url=self.base_url, http_client=http_client, timeout=self.timeout, max_retries=self.max_retries
+                )
+            else:
+                http_client.base_url = self.base_url.rstrip("/")
+                if self.api_key:
+                    http_client.headers["Authorization"] = f"Bearer {self.api_key}"
+                self._async_client = http_client
+        return self._async_client
+
+    def sync_client(self) -> groq.Groq:
+        if self._sync_client is None:
+            http_client = httpx.Client(
+                event_hooks={"request": [connection_stats.on_request], "response": [self._observe]},
+                **_transport_settings(self.timeout, httpx.HTTPTransport),
+            )
+            self._sync_client = groq.Groq(api_key=self.api_key, base_url=self.base_url, http_client=http_client, timeout=self.timeout, max_retries=self.max_retries)
+        return self._sync_client
+
+    async def create(self, **kwargs):
+        # The router has already taken this call's budget from self.scheduler
+        kwargs["model"] = self.model
+        return await self._create(**kwargs)
+
+    async def stream(self, **kwargs):
+        kwargs["model"] = self.model
+        async for delta in self._stream(**kwargs):
+            yield delta
+
+    async def _create(self, **kwargs):
+        if self.kind == "openai":
+            response = await self.async_client().post("/chat/completions", json=kwargs)
+            if response.status_code >= 400:
+                raise ProviderError(response)
+            return _namespace(response.json())
+        if LLM_CALL_MODE == "thread":
+            loop = asyncio.get_running_loop()
+            submitted = time.perf_counter()
+
+            def call():
+                # Report the executor queue wait back to the loop thread rather than touching metrics here
+                started = time.perf_counter()
+                return started - submitted, self.sync_client().chat.completions.create(**kwargs)
+
+            waited, completion = await loop.run_in_executor(_get_executor(), call)
+            QUEUE_WAIT_SECONDS.observe(waited, queue="llm_executor")
+            return completion
+        if LLM_CALL_MODE != "async":
+            raise ValueError(f"Unknown LLM_CALL_MODE: {LLM_CALL_MODE!r} (expected 'async' or 'thread')")
+        return await self.async_client().chat.completions.create(**kwargs)
+
+    async def _stream(self, **kwargs):
+        if self.kind == "openai":
+            async with self.async_client().stream("POST", "/chat/completions", json={**kwargs, "stream": True}) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise ProviderError(response)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    yield _delta_text(_namespace(json.loads(data)))
+        elif LLM_CALL_MODE == "thread":
+            loop = asyncio.get_running_loop()
+            queue = asyncio.Queue()
+            finished = object()
+
+            def pump():
+                try:
+                    for chunk in self.sync_client().chat.completions.create(stream=True, **kwargs):
+                        loop.call_soon_threadsafe(queue.put_nowait, _delta_text(chunk))
+                    loop.call_soon_threadsafe(queue.put_nowait, finished)
+                except Exception as e:
+                    loop.call_soon_threadsafe(queue.put_nowait, e)
+
+            loop.run_in_executor(_get_executor(), pump)
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        else:
+            stream = await self.async_client().chat.completions.create(stream=True, **kwargs)
+            async for chunk in stream:
+                yield _delta_text(chunk)
+
+    def pool_state(self) -> dict:
+        pools = {}
+        if self._async_client is not None:
+            pools["async"] = _pool_state(self._async_client)
+        if self._sync_client is not None:
+            pools["sync"] = _pool_state(self._sync_client)
+        return pools
+
+
+# With several providers a failing call moves to the next one instead of retrying in place
+providers = [Provider(name, max_retries=LLM_MAX_RETRIES if len(LLM_PROVIDERS) == 1 else 0) for name in LLM_PROVIDERS]
+router = Router(providers)
+MODEL_NAME = providers[0].model
+
+
+def _pool_state(client) -> dict:
+    # httpcore keeps the pool on the transport; tolerate it being absent (e.g. custom transports)
+    http_client = getattr(client, "_client", client)
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for c in connections if c.is_idle())
+    return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+def llm_stats() -> dict:
+    """Pool utilization, keep-alive reuse, rate-limit budgets and routing stats for the LLM providers."""
+    stats = connection_stats
+    reused = max(stats.requests - stats.new_connections, 0)
+    return {
+        "mode": LLM_CALL_MODE,
+        "http2": LLM_HTTP2,
+        "max_connections": LLM_MAX_CONNECTIONS,
+        "max_keepalive_connections": LLM_MAX_KEEPALIVE,
+        "pools": {p.name: p.pool_state() for p in providers},
+        "in_flight": stats.in_flight,
+        "peak_in_flight": stats.peak_in_flight,
+        "utilization": round(stats.in_flight / LLM_MAX_CONNECTIONS, 4),
+        "requests": stats.requests,
+        "new_connections": stats.new_connections,
+        "reused_connections": reused,
+        "reuse_ratio": round(reused / stats.requests, 4) if stats.requests else 0.0,
+        "rate_limits": {p.name: p.scheduler.stats() for p in providers},
+        "providers": router.snapshot(),
+        "hedging": router.hedge_stats(),
+    }
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=LLM_THREAD_WORKERS, thread_name_prefix="llm")
+    return _executor
+
+
+async def create_chat_completion(parse=None, **kwargs):
+    """Non-blocking chat.completions.create(**kwargs) on the best available provider; the provider picks the model.
+
+    With parse, returns parse(completion) instead, and a hedged duplicate only wins if its output parses.
+    """
+    return await router.call(lambda provider: provider.create(**kwargs), parse, kwargs.get("messages", []), kwargs.get("max_tokens"))
+
+
+def _delta_text(chunk) -> str:
+    return chunk.choices[0].delta.content or "" if chunk.choices else ""
+
+
+async def stream_chat_completion(**kwargs):
+    """Yield content deltas of a streamed completion as they arrive."""
+    async for delta in router.stream(lambda provider: provider.stream(**kwargs), kwargs.get("messages", []), kwargs.get("max_tokens")):
+        yield delta
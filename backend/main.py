@@ -1,9 +1,33 @@
-from fastapi import FastAPI, HTTPException
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .models import AdRequest, AdResponse
-from .generator import generate_ad_copies
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from .engine import AdRequest, engine_for, build_router
+from .batch import parse_batch, cached_generator, jsonl_lines
+from .jobs import JobStore, JobWorker, job_key
+from .llm import MODEL_NAME
+from .metrics import render_metrics
 
-app = FastAPI(title="AI Ad Copy Generator API")
+engine = engine_for(os.getenv("SCHEMA_VERSION", "v2"))
+
+job_store = None
+job_worker = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global job_store, job_worker
+    # Durable job queue: unfinished items from a previous run are picked up again on startup
+    job_store = JobStore()
+    job_worker = JobWorker(job_store, cached_generator(engine.generate, MODEL_NAME, engine.prompt_version, engine.response_model), AdRequest)
+    worker_task = asyncio.create_task(job_worker.run())
+    try:
+        yield
+    finally:
+        worker_task.cancel()
+
+app = FastAPI(title="AI Ad Copy Generator API", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -12,23 +36,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "Retry-After"],
 )
 
 @app.get("/")
 async def root():
     return {"message": "AI Ad Copy Generator API is running"}
 
-@app.post("/generate", response_model=AdResponse)
-async def generate_ad(request: AdRequest):
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+app.include_router(build_router(engine))
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: Request, response: Response):
+    """Queue a durable batch job. Resubmitting the same requests returns the existing job."""
     try:
-        response = await generate_ad_copies(request)
-        return response
+        items = parse_batch((await request.body()).decode("utf-8"), AdRequest)
     except ValueError as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    except Exception as e:
-        import traceback
-        error_detail = f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-        raise HTTPException(status_code=500, detail=error_detail)
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+    job_id = job_key(items, MODEL_NAME, engine.prompt_version)
+    if await asyncio.to_thread(job_store.submit, job_id, items):
+        job_worker.notify()
+    else:
+        response.status_code = 200
+    return await asyncio.to_thread(job_store.status, job_id)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    status = await asyncio.to_thread(job_store.status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str):
+    """JSONL of the items finished so far, in completion order."""
+    if await asyncio.to_thread(job_store.status, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    results = await asyncio.to_thread(job_store.results, job_id)
+    return StreamingResponse(jsonl_lines(_iterate(results)), media_type="application/x-ndjson")
+
+async def _iterate(items):
+    for item in items:
+        yield item
 
 if __name__ == "__main__":
     import uvicorn
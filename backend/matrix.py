@@ -0,0 +1,196 @@
+import os
+import math
+import time
+import asyncio
+import itertools
+from .metrics import collect_usage, QUEUE_WAIT_SECONDS
+from .decoding import build_response
+from .batch import BATCH_CONCURRENCY
+from .ratelimit import estimate_prompt_tokens
+
+# Combinations written per completion, further capped so their output fits MATRIX_MAX_OUTPUT_TOKENS
+MATRIX_COMBINATIONS_PER_CALL = int(os.getenv("MATRIX_COMBINATIONS_PER_CALL", "4"))
+# Output budget of one combination (3 variations, compliance, channel copy); also sets max_tokens
+MATRIX_TOKENS_PER_COMBINATION = int(os.getenv("MATRIX_TOKENS_PER_COMBINATION", "900"))
+MATRIX_MAX_OUTPUT_TOKENS = int(os.getenv("MATRIX_MAX_OUTPUT_TOKENS", "8000"))
+MATRIX_MAX_COMBINATIONS = int(os.getenv("MATRIX_MAX_COMBINATIONS", "200"))
+
+
+def expand(platforms: list, frameworks: list, tones: list) -> list:
+    """Every distinct (platform, framework, tone), grouped by platform."""
+    return list(itertools.product(*(list(dict.fromkeys(values)) for values in (platforms, frameworks, tones))))
+
+
+def check_matrix(platforms: list, frameworks: list, tones: list):
+    """Raise ValueError for an empty axis or more than MATRIX_MAX_COMBINATIONS combinations."""
+    for name, values in (("platforms", platforms), ("frameworks", frameworks), ("tones", tones)):
+        if not values:
+            raise ValueError(f"{name} must not be empty")
+    count = len(expand(platforms, frameworks, tones))
+    if count > MATRIX_MAX_COMBINATIONS:
+        raise ValueError(f"{count} combinations requested, at most {MATRIX_MAX_COMBINATIONS} are allowed")
+
+
+def plan(combinations: list, per_call: int = MATRIX_COMBINATIONS_PER_CALL) -> list:
+    """Chunks of combinations that share one completion; a chunk never mixes platforms, so one policy context applies."""
+    per_call = max(1, min(per_call, MATRIX_MAX_OUTPUT_TOKENS // MATRIX_TOKENS_PER_COMBINATION))
+    chunks = []
+    for _, group in itertools.groupby(combinations, key=lambda combination: combination[0]):
+        group = list(group)
+        chunks.extend(group[i:i + per_call] for i in range(0, len(group), per_call))
+    return chunks
+
+
+def format_combinations(chunk: list) -> str:
+    return "\n".join(
+        f"{number}. Platform: {platform} | Framework: {framework} | Tone: {tone}"
+        for number, (platform, framework, tone) in enumerate(chunk, start=1)
+    )
+
+
+def _campaign_for(campaigns: list, number: int):
+    # Prefer the entry the model numbered, fall back to its position
+    for campaign in campaigns:
+        if isinstance(campaign, dict) and campaign.get("combination") == number:
+            return campaign
+    campaign = campaigns[number - 1] if number <= len(campaigns) else None
+    return campaign if isinstance(campaign, dict) else None
+
+
+def _full_generation_tokens(messages: list, response) -> int:
+    # The full prompt plus the campaign as output, at the scheduler's ~4 characters per token
+    return estimate_prompt_tokens(messages) + len(response.model_dump_json()) // 4
+
+
+async def run_matrix(brief: dict, combinations: list, request_model, response_model, generate, complete_chunk,
+                     full_messages, cached=None, store=None, prepare=None, finish=None,
+                     per_call: int = MATRIX_COMBINATIONS_PER_CALL, concurrency: int = BATCH_CONCURRENCY):
+    """Yield one result dict per combination in completion order, then {"report": ...}.
+
+    The first combination not already in the cache goes through generate(request) and its insights
+    ground every other one. The rest are written per plan() chunk by complete_chunk(brief,
+    insights, chunk), which returns {"campaigns": [...]}; a combination missing from or invalid in
+    that output falls back to generate(request). The coroutines cached(request) and store(request,
+    response) read a stored response and keep each validated batched one; finish(request, data) may
+    rework a batched campaign dict before it is validated.
+
+    The report compares actual tokens and wall-clock with the naive approach of one full
+    generation per combination not in the cache. Its tokens are estimated from each generated
+    combination's full prompt, full_messages(request), and the campaign it got, so they do not
+    depend on what the caches saved; its wall-clock scales the first generation's, and is left
+    out when that one was served from the response cache.
+    """
+    start = time.perf_counter()
+    results = asyncio.Queue()
+    done = object()
+    totals = {"prompt": 0, "completion": 0, "calls": 0}
+    report = {"combinations": len(combinations), "from_cache": 0, "batched": 0, "fallbacks": 0, "errors": 0, "chunks": 0}
+    first_cost = {}
+    naive_tokens = 0
+
+    def request_for(combination):
+        platform, framework, tone = combination
+        return request_model(**brief, platform=platform, framework=framework, tone=tone)
+
+    async def emit(combination, source: str, began: float, response=None, error=None):
+        nonlocal naive_tokens
+        platform, framework, tone = combination
+        result = {"id": f"{platform} / {framework} / {tone}", "platform": platform, "framework": framework, "tone": tone,
+                  "source": source, "seconds": round(time.perf_counter() - began, 3)}
+        if error is None:
+            if source != "cache":
+                naive_tokens += _full_generation_tokens(full_messages(request_for(combination)), response)
+            result.update(status="ok", response=response.model_dump())
+        else:
+            report["errors"] += 1
+            result.update(status="error", error=str(error))
+        await results.put(result)
+
+    async def fallback(combination, began: float):
+        report["fallbacks"] += 1
+        try:
+            await emit(combination, "fallback", began, await generate(request_for(combination)))
+        except Exception as e:
+            await emit(combination, "fallback", began, error=e)
+
+    async def run_chunk(chunk: list, insights: dict, sem: asyncio.Semaphore):
+        async with sem:
+            QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start, queue="matrix")
+            began = time.perf_counter()
+            try:
+                campaigns = (await complete_chunk(brief, insights, chunk)).get("campaigns")
+            except Exception:
+                campaigns = None
+            retry = []
+            for number, combination in enumerate(chunk, start=1):
+                campaign = _campaign_for(campaigns, number) if isinstance(campaigns, list) else None
+                try:
+                    data = {key: value for key, value in (campaign or {}).items() if key in response_model.model_fields}
+                    data["insights"] = insights
+                    if finish is not None:
+                        data = finish(request_for(combination), data)
+                    response = build_response(data, response_model, prepare)
+                except Exception:
+                    retry.append(combination)
+                    continue
+                if store is not None:
+                    await store(request_for(combination), response)
+                report["batched"] += 1
+                await emit(combination, "matrix", began, response)
+        await asyncio.gather(*(fallback(combination, began) for combination in retry))
+
+    async def produce():
+        collect_usage(totals)
+        try:
+            todo = []
+            for combination in combinations:
+                began = time.perf_counter()
+                hit = await cached(request_for(combination)) if cached is not None else None
+                if hit is None:
+                    todo.append(combination)
+                    continue
+                report["from_cache"] += 1
+                await emit(combination, "cache", began, hit)
+            if not todo:
+                return
+
+            began, before = time.perf_counter(), dict(totals)
+            try:
+                response = await generate(request_for(todo[0]))
+            except Exception as e:
+                # Without insights to share there is nothing to batch; report the cause for every combination
+                for combination in todo:
+                    await emit(combination, "full", began, error=e)
+                return
+            # One served from the response cache made no completion and says nothing about a full one's wall-clock
+            if totals["calls"] > before["calls"]:
+                first_cost["seconds"] = time.perf_counter() - began
+            await emit(todo[0], "full", began, response)
+
+            chunks = plan(todo[1:], per_call)
+            report["chunks"] = len(chunks)
+            sem = asyncio.Semaphore(max(1, concurrency))
+            insights = response.insights.model_dump()
+            await asyncio.gather(*(run_chunk(chunk, insights, sem) for chunk in chunks))
+        finally:
+            await results.put(done)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while (result := await results.get()) is not done:
+            yield result
+        await producer
+    finally:
+        producer.cancel()
+
+    pending = report["combinations"] - report["from_cache"]
+    report.update(
+        completions=totals["calls"],
+        tokens={"prompt": totals["prompt"], "completion": totals["completion"], "total": totals["prompt"] + totals["completion"]},
+        seconds=round(time.perf_counter() - start, 3),
+    )
+    if pending:
+        report["naive_estimate"] = {"completions": pending, "tokens": naive_tokens}
+    if first_cost:
+        report["naive_estimate"]["seconds"] = round(first_cost["seconds"] * math.ceil(pending / max(1, concurrency)), 3)
+    yield {"report": report}
@@ -0,0 +1,142 @@
+"""Minimal Prometheus-style metrics (text exposition format 0.0.4), no external dependency.
+
+Recording is a dict lookup and a few additions, so instrumentation stays on the hot path
+even when nothing scrapes /metrics.
+"""
+import time
+import bisect
+import contextvars
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 2)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns {label values tuple: value}."""
+
+    def __init__(self, name: str, help: str, collect, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.labelnames = labelnames
+        _registry.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in self.collect().items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("adgen_stage_seconds", "Time spent in each generation stage", ("stage",))
+GENERATIONS = Counter("adgen_generations_total", "Completed generate calls by outcome", ("status",))
+TOKENS = Counter("adgen_llm_tokens_total", "Tokens reported by the provider", ("kind",))
+QUEUE_WAIT_SECONDS = Histogram("adgen_queue_wait_seconds", "Time spent waiting before work started", ("queue",))
+CACHE_REQUESTS = Counter("adgen_cache_requests_total", "Cache lookups by cache (response, insights, similar_briefs) and outcome", ("cache", "outcome"))
+COALESCING = Counter("adgen_singleflight_total", "Generate calls by single-flight outcome", ("outcome",))
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+_usage_totals = contextvars.ContextVar("adgen_usage_totals", default=None)
+
+
+def collect_usage(totals: dict):
+    """Also add the tokens of every completion parsed in the current task, and tasks it starts, to totals."""
+    _usage_totals.set(totals)
+
+
+def record_usage(completion):
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    TOKENS.inc(prompt, kind="prompt")
+    TOKENS.inc(completion_tokens, kind="completion")
+    totals = _usage_totals.get()
+    if totals is not None:
+        totals["prompt"] = totals.get("prompt", 0) + prompt
+        totals["completion"] = totals.get("completion", 0) + completion_tokens
+        totals["calls"] = totals.get("calls", 0) + 1
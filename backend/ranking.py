@@ -0,0 +1,207 @@
+"""Local ranking of over-generated ad variations.
+
+With RANK_CANDIDATES_PER_ANGLE > 0 the model writes that many candidate variations per angle,
+without scoring them, and this module picks the best RANK_TOP_K per angle. Scores come from
+features computed for all candidates at once with NumPy: headline and body length against the
+platform's sweet spot, an action-verb CTA, Flesch readability, coverage of the insights'
+keywords and phrases the compliance rule screen flags. Candidates are taken in score order and
+one whose MinHash signature estimates a word-shingle Jaccard similarity of at least
+RANK_DUPLICATE_THRESHOLD with an already chosen one is skipped as a near-duplicate.
+"""
+from __future__ import annotations
+
+import os
+import zlib
+from functools import lru_cache
+from .lazy import lazy_import
+from .compliance import rule_screen
+
+# Only needed once something is ranked, which cold starts with ranking off never do
+np = lazy_import("numpy")
+
+RANK_CANDIDATES_PER_ANGLE = int(os.getenv("RANK_CANDIDATES_PER_ANGLE", "0"))
+RANK_TOP_K = int(os.getenv("RANK_TOP_K", "1"))
+RANK_DUPLICATE_THRESHOLD = float(os.getenv("RANK_DUPLICATE_THRESHOLD", "0.6"))
+RANKING = RANK_CANDIDATES_PER_ANGLE > 0
+
+MINHASH_PERMUTATIONS = 64
+
+# (headline, primary text) character ranges that perform best per platform
+PLATFORM_LENGTHS = {
+    "facebook": ((25, 40), (80, 125)),
+    "instagram": ((20, 40), (80, 150)),
+    "google ads": ((15, 30), (60, 90)),
+    "linkedin": ((40, 70), (100, 150)),
+    "tiktok": ((15, 40), (50, 100)),
+    "twitter": ((20, 50), (70, 200)),
+    "x": ((20, 50), (70, 200)),
+}
+DEFAULT_LENGTHS = ((20, 40), (80, 150))
+
+ACTION_VERBS = {
+    "shop", "buy", "get", "order", "discover", "explore", "try", "book", "sign", "join", "start", "claim",
+    "download", "learn", "grab", "save", "reserve", "subscribe", "register", "call", "visit", "see", "find",
+}
+
+# Weights of FEATURES; the weighted sum is clipped to 0..1 and reported on the 0-10 strength_score scale
+FEATURES = ("headline_fit", "text_fit", "cta", "readability", "keywords", "policy")
+WEIGHTS = (0.15, 0.15, 0.15, 0.2, 0.35, -0.4)
+
+RANKING_VERSION = f"ranking:{RANK_CANDIDATES_PER_ANGLE}:{RANK_TOP_K}:{RANK_DUPLICATE_THRESHOLD}:{list(WEIGHTS)}"
+
+
+@lru_cache(maxsize=None)
+def _tables() -> dict:
+    """NumPy constants, built on first use: weights, byte classes and the MinHash hash family."""
+    rng = np.random.default_rng(20240613)
+    tables = {"weights": np.array(WEIGHTS)}
+    # Byte classes for counting words, syllables (vowel groups) and sentences over all candidates at once
+    for name, members in (("vowels", b"aeiouy"), ("spaces", b" \t\r\n"), ("sentence_ends", b".!?")):
+        tables[name] = np.zeros(256, dtype=bool)
+        tables[name][list(members)] = True
+    # Multiply-shift hash family over 64-bit shingle hashes; odd multipliers, wrapping arithmetic
+    tables["hash_a"] = rng.integers(1, 2 ** 63, MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+    tables["hash_b"] = rng.integers(0, 2 ** 63, MINHASH_PERMUTATIONS, dtype=np.uint64)
+    return tables
+
+
+def _length_fit(lengths: np.ndarray, low: int, high: int) -> np.ndarray:
+    # 1 inside [low, high], falling linearly to 0 at twice as far outside
+    under = np.clip((low - lengths) / low, 0, 1)
+    over = np.clip((lengths - high) / high, 0, 1)
+    return 1 - np.maximum(under, over)
+
+
+def _group_counts(chars: np.ndarray, segments: np.ndarray, table: np.ndarray, n: int) -> np.ndarray:
+    # Runs of characters in table per segment: positions where a run begins, summed by segment index
+    inside = table[chars]
+    begins = inside & ~np.concatenate(([False], inside[:-1]))
+    return np.bincount(segments, weights=begins, minlength=n)
+
+
+def _keyword_hits(joined: str, starts: np.ndarray, keywords: list) -> np.ndarray:
+    # str.find sweeps the joined copy per keyword; each segment counts a keyword once
+    hits = np.zeros(len(starts))
+    for keyword in keywords:
+        positions, position = [], joined.find(keyword)
+        while position >= 0:
+            positions.append(position)
+            position = joined.find(keyword, position + len(keyword))
+        if positions:
+            hits[np.unique(np.searchsorted(starts, positions, side="right") - 1)] += 1
+    return hits
+
+
+def score_candidates(candidates: list, platform: str, keywords: list) -> tuple:
+    """(scores on 0-10, feature matrix with one column per FEATURES entry, Flesch scores) for candidate dicts.
+
+    Text statistics come from one pass over all candidates' copy joined together, as bytes, so
+    the per-candidate Python work is only building that string.
+    """
+    n = len(candidates)
+    tables = _tables()
+    headline_len = np.fromiter((len(c["headline"]) for c in candidates), dtype=np.float64, count=n)
+    text_len = np.fromiter((len(c["primary_text"]) for c in candidates), dtype=np.float64, count=n)
+    cta = np.fromiter(
+        (1.0 if words and words[0].lower().strip(".,!") in ACTION_VERBS else 0.5 if words else 0.0
+         for words in (c["cta"].split(maxsplit=1) for c in candidates)),
+        dtype=np.float64, count=n,
+    )
+
+    # Body text as one byte string; non-ASCII characters become "?" so offsets stay one byte per character
+    chars = np.frombuffer("\n".join(c["primary_text"] for c in candidates).encode("ascii", "replace").lower(), dtype=np.uint8)
+    lengths = np.fromiter((len(c["primary_text"]) + 1 for c in candidates), dtype=np.int64, count=n)
+    # Candidate index of every byte (each body plus its separator), so empty bodies count zero wherever they are
+    segments = np.repeat(np.arange(n), lengths)[:len(chars)]
+    words = _group_counts(chars, segments, ~tables["spaces"], n)
+    syllables = _group_counts(chars, segments, tables["vowels"], n)
+    sentences = _group_counts(chars, segments, tables["sentence_ends"], n)
+
+    # Headline and body per candidate for keywords and the compliance matcher; hits map back by offset
+    copies = [f"{c['headline']}\n{c['primary_text']}".lower() for c in candidates]
+    joined = "\n".join(copies)
+    starts = np.concatenate(([0], np.cumsum([len(copy) + 1 for copy in copies])[:-1]))
+    keywords = [k.lower() for k in keywords if isinstance(k, str) and k.strip()]
+    coverage = _keyword_hits(joined, starts, keywords) / len(keywords) if keywords else np.zeros(n)
+    risk = np.zeros(n)
+    matcher = rule_screen.matcher(platform)
+    for phrase, start in matcher.finditer(joined):
+        risk[np.searchsorted(starts, start, side="right") - 1] += sum(rule.severity for rule in matcher.rules[phrase])
+
+    (headline_range, text_range) = PLATFORM_LENGTHS.get((platform or "").lower(), DEFAULT_LENGTHS)
+    words = np.maximum(words, 1)
+    flesch = 206.835 - 1.015 * words / np.maximum(sentences, 1) - 84.6 * syllables / words
+    features = np.column_stack([
+        _length_fit(headline_len, *headline_range),
+        _length_fit(text_len, *text_range),
+        cta,
+        np.clip(flesch / 80, 0, 1),
+        coverage,
+        np.clip(risk / 50, 0, 1),
+    ])
+    weights = tables["weights"]
+    scores = 10 * np.clip(features @ weights / weights[weights > 0].sum(), 0, 1)
+    return scores, features, flesch
+
+
+def _shingles(text: str) -> np.ndarray:
+    words = text.lower().split()
+    grams = [" ".join(words[i:i + 2]) for i in range(max(1, len(words) - 1))]
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature of text's word bigrams; matching positions estimate Jaccard similarity."""
+    hashes, tables = _shingles(text), _tables()
+    return np.min(tables["hash_a"][:, None] * hashes[None, :] + tables["hash_b"][:, None], axis=1)
+
+
+def _explain(features: np.ndarray, flesch: float, keywords: list, platform: str) -> str:
+    headline_fit, text_fit, cta, _, coverage, policy = features
+    parts = [
+        f"length fit {min(headline_fit, text_fit):.0%} for {platform}",
+        "action CTA" if cta == 1 else "weak CTA" if cta else "no CTA",
+        f"Flesch {flesch:.0f}",
+    ]
+    if keywords:
+        parts.append(f"{round(coverage * len(keywords))}/{len(keywords)} keywords")
+    if policy:
+        parts.append("flagged phrases")
+    return "Ranked locally: " + ", ".join(parts) + "."
+
+
+def rank_variations(candidates: list, platform: str, keywords: list, top_k: int = RANK_TOP_K,
+                    threshold: float = RANK_DUPLICATE_THRESHOLD) -> list:
+    """The best top_k candidates per angle, near-duplicates pruned, with strength_score and score_explanation set.
+
+    Angles keep the order they first appear in. Malformed candidates are ignored; if none is
+    usable the input comes back unchanged so validation fails and the section is generated again.
+    """
+    usable = [
+        c for c in candidates
+        if isinstance(c, dict) and isinstance(c.get("headline"), str) and isinstance(c.get("primary_text"), str)
+        and isinstance(c.get("cta"), str) and isinstance(c.get("angle"), str)
+    ]
+    if not usable:
+        return candidates
+    scores, features, flesch = score_candidates(usable, platform, keywords)
+    angles = list(dict.fromkeys(c["angle"] for c in usable))
+    chosen = {angle: [] for angle in angles}
+    signatures = []
+    for i in np.argsort(-scores, kind="stable"):
+        candidate = usable[i]
+        picked = chosen[candidate["angle"]]
+        if len(picked) >= top_k:
+            continue
+        signature = minhash(f"{candidate['headline']} {candidate['primary_text']}")
+        if any(np.mean(signature == other) >= threshold for other in signatures):
+            continue
+        signatures.append(signature)
+        picked.append(dict(
+            candidate,
+            strength_score=round(float(scores[i]), 1),
+            score_explanation=_explain(features[i], flesch[i], keywords, platform),
+        ))
+        if len(signatures) == top_k * len(angles):
+            break
+    return [variation for angle in angles for variation in chosen[angle]]
@@ -0,0 +1,230 @@
+import os
+import re
+import time
+import asyncio
+import threading
+from .metrics import QUEUE_WAIT_SECONDS, Counter, Gauge
+
+# Pace every LLM call against the provider's request and token budgets
+RATE_LIMIT_SCHEDULER = os.getenv("RATE_LIMIT_SCHEDULER", "1").lower() in ("1", "true", "yes")
+# Fraction of each budget we let ourselves spend; the remainder absorbs token-estimate error
+RATE_LIMIT_HEADROOM = float(os.getenv("RATE_LIMIT_HEADROOM", "0.95"))
+# Completion size assumed before the first response reports real usage
+RATE_LIMIT_COMPLETION_GUESS = int(os.getenv("RATE_LIMIT_COMPLETION_GUESS", "1200"))
+
+THROTTLED = Counter("adgen_provider_throttled_total", "429 responses received from the LLM provider", ("provider",))
+
+_DURATION = re.compile(r"([\d.]+)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value):
+    """Seconds from a rate-limit header value: "7.66s", "2m59.56s", "850ms" or plain "12"."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def estimate_prompt_tokens(messages: list) -> int:
+    """Rough token count before sending: ~4 characters per token plus per-message framing."""
+    return sum(len(m.get("content") or "") for m in messages) // 4 + 4 * len(messages)
+
+
+class TokenBucket:
+    """Continuously refilling budget. `level` may dip below zero when an estimate undershoots."""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period if capacity else 0.0
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.capacity:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float):
+        if self.capacity:
+            self.level -= amount
+
+    def wait_time(self, amount: float, headroom: float) -> float:
+        if not self.capacity:
+            return 0.0
+        # Keep (1 - headroom) of the bucket in reserve; a single oversized call waits for a full bucket
+        reserve = (1 - headroom) * self.capacity
+        missing = min(amount, self.capacity - reserve) + reserve - self.level
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate else 1.0
+
+    def sync(self, limit: float, remaining: float, reset, now: float):
+        """Adopt the provider's view; `reset` is the time until the bucket would be full again."""
+        self.capacity = limit
+        self.level = remaining
+        self.updated = now
+        if reset and remaining < limit:
+            self.rate = (limit - remaining) / reset
+        elif not self.rate:
+            self.rate = limit / 60.0
+
+
+class RateLimitScheduler:
+    """Holds outbound LLM calls until the provider's request and token budgets can take them.
+
+    Budgets start from <PROVIDER>_RPM / <PROVIDER>_TPM and are corrected from the
+    x-ratelimit-* headers on every response; a 429 pauses all dispatch for its Retry-After.
+    Calls are released in arrival order so a large prompt is not starved by small ones.
+    """
+
+    def __init__(self, provider: str, rpm: float, tpm: float, headroom: float = RATE_LIMIT_HEADROOM, enabled: bool = True):
+        self.provider = provider
+        self.enabled = enabled
+        self.headroom = headroom
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self.pending_requests = 0
+        self.pending_tokens = 0
+        self.prompt_ratio = 1.0  # actual / estimated prompt tokens, learned from usage
+        self.completion_tokens = float(RATE_LIMIT_COMPLETION_GUESS)
+        self.header_driven = False
+        self.dispatched = 0
+        self.throttled = 0
+        self._lock = threading.Lock()  # headers arrive on executor threads when LLM_CALL_MODE=thread
+        self._turn = asyncio.Lock()
+
+    def estimate(self, messages: list, max_tokens: int = None) -> tuple:
+        raw = estimate_prompt_tokens(messages)
+        tokens = int(raw * self.prompt_ratio + (max_tokens or self.completion_tokens))
+        return raw, tokens
+
+    async def acquire(self, messages: list, max_tokens: int = None) -> tuple:
+        """Wait for budget and reserve it; pass the returned ticket to settle() afterwards."""
+        ticket = self.estimate(messages, max_tokens)
+        if not self.enabled:
+            return ticket
+        start = time.monotonic()
+        async with self._turn:
+            # Re-check periodically: a response header or a 429 may move the budget meanwhile
+            while (wait := self._take(ticket)) > 0:
+                await asyncio.sleep(min(wait, 1.0))
+        QUEUE_WAIT_SECONDS.observe(time.monotonic() - start, queue="provider_rate_limit")
+        return ticket
+
+    def try_acquire(self, messages: list, max_tokens: int = None):
+        """acquire() without waiting: the ticket if the budget is free now and no call is queued for it, else None."""
+        ticket = self.estimate(messages, max_tokens)
+        if not self.enabled:
+            return ticket
+        if self._turn.locked() or self._take(ticket) > 0:
+            return None
+        return ticket
+
+    def _take(self, ticket: tuple) -> float:
+        # Reserve the ticket's budget and return 0, or return how long until it could be
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            # With no configured or advertised budget, let the first call return (and maybe bring headers) before the rest go
+            unknown = not (self.header_driven or self.requests.capacity or self.tokens.capacity)
+            probing = unknown and self.pending_requests and self.dispatched == self.pending_requests
+            wait = max(
+                0.05 if probing else 0.0,
+                self.blocked_until - now,
+                self.requests.wait_time(1, self.headroom),
+                self.tokens.wait_time(ticket[1], self.headroom),
+            )
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(ticket[1])
+            self.pending_requests += 1
+            self.pending_tokens += ticket[1]
+            self.dispatched += 1
+            return 0.0
+
+    def settle(self, ticket: tuple, usage=None):
+        if not self.enabled:
+            return
+        raw, tokens = ticket
+        with self._lock:
+            self.pending_requests -= 1
+            self.pending_tokens -= tokens
+            if usage is None:
+                return
+            prompt = getattr(usage, "prompt_tokens", 0) or 0
+            completion = getattr(usage, "completion_tokens", 0) or 0
+            if prompt and raw:
+                self.prompt_ratio = 0.8 * self.prompt_ratio + 0.2 * (prompt / raw)
+            if completion:
+                self.completion_tokens = 0.8 * self.completion_tokens + 0.2 * completion
+            if not self.header_driven:
+                # Without provider headers, correct our own books with what the call really cost
+                self.tokens.take(prompt + completion - tokens)
+
+    def observe(self, status_code: int, headers):
+        """Fold a provider response's rate-limit headers into the budgets."""
+        with self._lock:
+            now = time.monotonic()
+            for kind, bucket, pending in (("requests", self.requests, self.pending_requests), ("tokens", self.tokens, self.pending_tokens)):
+                try:
+                    limit = float(headers[f"x-ratelimit-limit-{kind}"])
+                    remaining = float(headers[f"x-ratelimit-remaining-{kind}"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.header_driven = True
+                # The provider has not yet counted calls still on the wire
+                bucket.sync(limit, remaining - pending, parse_duration(headers.get(f"x-ratelimit-reset-{kind}")), now)
+            if status_code == 429:
+                self.throttled += 1
+                THROTTLED.inc(provider=self.provider)
+                self.blocked_until = max(self.blocked_until, now + (parse_duration(headers.get("retry-after")) or 1.0))
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "header_driven": self.header_driven,
+            "requests": {"limit": self.requests.capacity, "available": round(self.requests.level, 2), "per_second": round(self.requests.rate, 4)},
+            "tokens": {"limit": self.tokens.capacity, "available": round(self.tokens.level, 1), "per_second": round(self.tokens.rate, 2)},
+            "pending_requests": self.pending_requests,
+            "pending_tokens": self.pending_tokens,
+            "blocked_for": round(max(self.blocked_until - now, 0.0), 3),
+            "prompt_token_ratio": round(self.prompt_ratio, 3),
+            "completion_tokens_estimate": round(self.completion_tokens),
+            "dispatched": self.dispatched,
+            "throttled": self.throttled,
+        }
+
+
+_schedulers = {}
+
+
+def provider_scheduler(provider: str = "groq") -> RateLimitScheduler:
+    """Process-wide scheduler per provider, seeded from <PROVIDER>_RPM / <PROVIDER>_TPM (0 = unknown until headers arrive).
+
+    Both default to 0: the first call goes out alone and its x-ratelimit-* headers set the pace,
+    so a process is not held to a guessed rate. Set them for providers that send no such headers.
+    """
+    if provider not in _schedulers:
+        rpm = float(os.getenv(f"{provider.upper()}_RPM", "0"))
+        tpm = float(os.getenv(f"{provider.upper()}_TPM", "0"))
+        _schedulers[provider] = RateLimitScheduler(provider, rpm, tpm, enabled=RATE_LIMIT_SCHEDULER)
+    return _schedulers[provider]
+
+
+Gauge(
+    "adgen_provider_budget_available",
+    "Requests/tokens the scheduler believes are left in the provider budget",
+    lambda: {(name, kind): round(getattr(s, kind).level, 2) for name, s in _schedulers.items() for kind in ("requests", "tokens")},
+    ("provider", "kind"),
+)
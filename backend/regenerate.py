@@ -0,0 +1,41 @@
+import json
+from .sections import generate_sections
+from .decoding import replace_section
+
+# Pieces of an AdResponse that can be re-rolled on their own
+TARGETS = ("variation", "compliance", "channel_opt")
+
+
+def check_target(target: str, index, variations: list):
+    """Raise ValueError unless target/index name one piece of a response with these variations."""
+    if target not in TARGETS:
+        raise ValueError(f"target must be one of {', '.join(TARGETS)}")
+    if target == "variation":
+        if index is None or not 0 <= index < len(variations):
+            raise ValueError(f"index must be between 0 and {len(variations) - 1} for target 'variation'")
+    elif index is not None:
+        raise ValueError(f"index only applies to target 'variation', not {target!r}")
+
+
+async def regenerate_piece(sections: dict, request, previous, target: str, index, complete):
+    """previous with only target (one variation, compliance or channel_opt) generated again.
+
+    sections maps each target to a Section whose prompt gets the request fields plus {insights},
+    {variations} and {angle} instead of the full campaign prompt; for a variation, {variations}
+    holds the ones being kept so the new copy does not repeat them. complete is the app's
+    per-section completion, as for generate_sections. Only the new piece is validated.
+    """
+    data = previous.model_dump()
+    context = {**request.model_dump(), "insights": json.dumps(data["insights"], ensure_ascii=False), "angle": ""}
+    variations = data["variations"]
+    if target == "variation":
+        context["angle"] = variations[index].get("angle", "")
+        variations = [v for i, v in enumerate(variations) if i != index]
+    context["variations"] = json.dumps(variations, ensure_ascii=False)
+
+    section = sections[target]
+    # done= satisfies sections that declare depends_on=("variations",), e.g. the campaign's own compliance section
+    value = (await generate_sections([section], context, complete, done={"variations": variations}))[section.key]
+    if target == "variation":
+        return replace_section(previous, "variations", [*previous.variations[:index], value, *previous.variations[index + 1:]])
+    return replace_section(previous, target, value)
@@ -0,0 +1,312 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from .lazy import lazy_import
+from .metrics import Counter, Histogram
+
+httpx = lazy_import("httpx")
+groq = lazy_import("groq")
+
+# Recent calls per provider that routing decisions are based on
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "100"))
+# Share of calls sent to a non-preferred provider so its stats stay current
+ROUTER_EXPLORE_RATE = float(os.getenv("ROUTER_EXPLORE_RATE", "0.05"))
+# A provider failing 25% of calls scores like one twice as slow
+ROUTER_ERROR_PENALTY = 4.0
+# This many failures in a row rank a provider behind every healthy one until a call succeeds
+ROUTER_TRIP_AFTER = int(os.getenv("ROUTER_TRIP_AFTER", "3"))
+
+# Hedging: once an attempt has run longer than this latency percentile of its provider, send a duplicate
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+# Hard cap on duplicates as a share of all calls, so a slow provider cannot double the spend
+LLM_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1"))
+# Adaptive per-attempt deadline: multiplier x this percentile, between LLM_TIMEOUT_MIN and the provider's static timeout
+LLM_TIMEOUT_PERCENTILE = float(os.getenv("LLM_TIMEOUT_PERCENTILE", "0.99"))
+LLM_TIMEOUT_MULTIPLIER = float(os.getenv("LLM_TIMEOUT_MULTIPLIER", "3"))
+LLM_TIMEOUT_MIN = float(os.getenv("LLM_TIMEOUT_MIN", "10"))
+# Successful calls a provider needs before its percentiles drive hedging and deadlines
+LLM_ADAPTIVE_MIN_SAMPLES = int(os.getenv("LLM_ADAPTIVE_MIN_SAMPLES", "20"))
+
+PROVIDER_CALLS = Counter("adgen_provider_calls_total", "LLM calls per provider by outcome", ("provider", "outcome"))
+PROVIDER_SECONDS = Histogram("adgen_provider_call_seconds", "LLM call duration per provider, from dispatch after the rate-limit wait", ("provider",))
+ATTEMPTS = Counter("adgen_llm_attempts_total", "LLM call attempts by role (primary, hedge, failover) and result (won, lost, failed)", ("role", "result"))
+
+
+def should_fail_over(exc: BaseException) -> bool:
+    """Timeouts, connection failures, 5xx and 429 are the provider's problem; other errors are ours."""
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError, groq.APIConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status is not None and (status >= 500 or status == 429)
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+class ProviderStats:
+    def __init__(self, window: int = ROUTER_WINDOW):
+        self.samples = deque(maxlen=window)  # (seconds, ok)
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.failovers_served = 0
+
+    def record(self, seconds: float, ok: bool):
+        self.samples.append((seconds, ok))
+        self.calls += 1
+        if ok:
+            self.consecutive_errors = 0
+        else:
+            self.errors += 1
+            self.consecutive_errors += 1
+
+    @property
+    def tripped(self) -> bool:
+        return self.consecutive_errors >= ROUTER_TRIP_AFTER
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def successes(self) -> int:
+        return sum(1 for _, ok in self.samples if ok)
+
+    def latency(self, q: float):
+        latencies = sorted(seconds for seconds, ok in self.samples if ok) or sorted(seconds for seconds, _ in self.samples)
+        return _percentile(latencies, q) if latencies else None
+
+    def score(self) -> float:
+        """Lower is better; a provider with no recent calls scores 0 so it gets measured."""
+        p95 = self.latency(0.95)
+        if p95 is None:
+            return 0.0
+        return p95 * (1 + ROUTER_ERROR_PENALTY * self.error_rate())
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.latency(0.5), self.latency(0.95)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "failovers_served": self.failovers_served,
+            "tripped": self.tripped,
+            "recent_error_rate": round(self.error_rate(), 4),
+            "p50_ms": round(1000 * p50, 1) if p50 is not None else None,
+            "p95_ms": round(1000 * p95, 1) if p95 is not None else None,
+            "score": round(self.score(), 4),
+        }
+
+
+class Router:
+    """Sends each LLM call to the provider with the best recent p95 latency and error rate,
+    failing over down the ranking on timeouts, connection errors, 5xx and 429s."""
+
+    def __init__(self, providers: list, explore_rate: float = ROUTER_EXPLORE_RATE, hedge: bool = LLM_HEDGE):
+        self.providers = providers
+        self.explore_rate = explore_rate
+        self.hedge = hedge
+        self.stats = {p.name: ProviderStats() for p in providers}
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+
+    def order(self) -> list:
+        now = time.monotonic()
+        # Providers paused by a 429 or failing repeatedly go last whatever their latency;
+        # exploration still sends them the occasional call so recovery is noticed
+        ranked = sorted(
+            self.providers,
+            key=lambda p: (p.scheduler.blocked_until > now or self.stats[p.name].tripped, self.stats[p.name].score()),
+        )
+        if len(ranked) > 1 and random.random() < self.explore_rate:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def _adaptive(self, provider, q: float):
+        stats = self.stats[provider.name]
+        return stats.latency(q) if stats.successes() >= LLM_ADAPTIVE_MIN_SAMPLES else None
+
+    def deadline(self, provider):
+        """Per-attempt timeout from the provider's tail latency; None leaves only the static client timeout."""
+        tail = self._adaptive(provider, LLM_TIMEOUT_PERCENTILE)
+        if tail is None:
+            return None
+        return min(max(tail * LLM_TIMEOUT_MULTIPLIER, LLM_TIMEOUT_MIN), provider.timeout.read or float("inf"))
+
+    def hedge_delay(self, provider):
+        if not self.hedge or self.hedges >= LLM_HEDGE_MAX_RATIO * self.calls:
+            return None
+        return self._adaptive(provider, LLM_HEDGE_PERCENTILE)
+
+    def _failed(self, provider, start: float):
+        seconds = time.perf_counter() - start
+        self.stats[provider.name].record(seconds, False)
+        PROVIDER_SECONDS.observe(seconds, provider=provider.name)
+        PROVIDER_CALLS.inc(provider=provider.name, outcome="error")
+
+    def _succeeded(self, provider, start: float, role: str = "primary"):
+        seconds = time.perf_counter() - start
+        stats = self.stats[provider.name]
+        stats.record(seconds, True)
+        PROVIDER_SECONDS.observe(seconds, provider=provider.name)
+        PROVIDER_CALLS.inc(provider=provider.name, outcome="ok" if role == "primary" else role)
+        if role == "failover":
+            stats.failovers_served += 1
+
+    async def _attempt(self, fn, parse, provider, ticket):
+        deadline = self.deadline(provider)
+        result = None
+        try:
+            result = await (asyncio.wait_for(fn(provider), deadline) if deadline else fn(provider))
+        except asyncio.TimeoutError:
+            if deadline is None:
+                raise
+            raise asyncio.TimeoutError(f"{provider.name} did not answer within {deadline:.1f}s") from None
+        finally:
+            provider.scheduler.settle(ticket, getattr(result, "usage", None))
+        return parse(result) if parse else result
+
+    async def call(self, fn, parse=None, messages: list = (), max_tokens: int = None):
+        """Run fn(provider) on the best provider and return it, or parse(result) when parse is given.
+
+        Each attempt first takes the provider's rate-limit budget for messages/max_tokens; its
+        deadline, hedge timer and latency sample only start once it has. Provider-side failures
+        (see should_fail_over) move to the next provider. If the primary is still out after its
+        provider's hedge delay, a duplicate goes to the next provider (or the same one when there
+        is only one), unless that provider has no budget free right now; the first attempt whose
+        result parses wins and the other is cancelled. A parse error only fails the call once no
+        other attempt is running, and it is what the call raises even if the other attempt then
+        fails at the provider.
+        """
+        self.calls += 1
+        ranked = self.order()
+        untried = list(ranked)
+        attempts = {}  # task -> (provider, role, start)
+        last_error = None
+        answered = None  # an attempt whose provider answered but whose output did not parse
+        hedged = False
+
+        def launch(provider, role: str, ticket):
+            task = asyncio.ensure_future(self._attempt(fn, parse, provider, ticket))
+            attempts[task] = (provider, role, time.perf_counter())
+
+        async def queue(provider, role: str):
+            launch(provider, role, await provider.scheduler.acquire(messages, max_tokens))
+
+        await queue(untried.pop(0), "primary")
+        try:
+            while attempts:
+                timeout = None
+                if not hedged and len(attempts) == 1:
+                    provider, _, start = next(iter(attempts.values()))
+                    delay = self.hedge_delay(provider)
+                    if delay is not None:
+                        timeout = max(start + delay - time.perf_counter(), 0.0)
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    provider = untried[0] if untried else ranked[0]
+                    # A hedge that would queue behind the primary for budget cannot overtake it
+                    ticket = provider.scheduler.try_acquire(messages, max_tokens)
+                    if ticket is None:
+                        self.hedges_skipped += 1
+                        continue
+                    self.hedges += 1
+                    if untried:
+                        untried.pop(0)
+                    launch(provider, "hedge", ticket)
+                    continue
+                for task in done:
+                    provider, role, start = attempts.pop(task)
+                    try:
+                        value = task.result()
+                    except Exception as e:
+                        ATTEMPTS.inc(role=role, result="failed")
+                        last_error = e
+                        if not should_fail_over(e):
+                            # The provider answered; the output (or our request) was the problem
+                            self._succeeded(provider, start, role)
+                            if not attempts:
+                                raise
+                            answered = e
+                            continue
+                        self._failed(provider, start)
+                        if not attempts and untried and answered is None:
+                            await queue(untried.pop(0), "failover")
+                        continue
+                    self._succeeded(provider, start, role)
+                    ATTEMPTS.inc(role=role, result="won")
+                    if role == "hedge":
+                        self.hedge_wins += 1
+                    return value
+            raise answered or last_error
+        finally:
+            for task, (provider, role, start) in attempts.items():
+                task.cancel()
+                ATTEMPTS.inc(role=role, result="lost")
+                # Censored sample: the loser took at least this long, which keeps slow tails visible
+                self.stats[provider.name].record(time.perf_counter() - start, True)
+
+    async def stream(self, fn, messages: list = (), max_tokens: int = None):
+        """Like call() for an async iterator; failover is only possible until the first item arrives."""
+        last_error = None
+        for attempt, provider in enumerate(self.order()):
+            ticket = await provider.scheduler.acquire(messages, max_tokens)
+            try:
+                start = time.perf_counter()
+                items = fn(provider)
+                try:
+                    first = await items.__anext__()
+                except StopAsyncIteration:
+                    self._succeeded(provider, start, "failover" if attempt else "primary")
+                    return
+                except Exception as e:
+                    await items.aclose()
+                    if not should_fail_over(e):
+                        raise
+                    self._failed(provider, start)
+                    last_error = e
+                    continue
+                yield first
+                try:
+                    async for item in items:
+                        yield item
+                except Exception:
+                    self._failed(provider, start)
+                    raise
+                self._succeeded(provider, start, "failover" if attempt else "primary")
+                return
+            finally:
+                provider.scheduler.settle(ticket)
+        raise last_error
+
+    def snapshot(self) -> dict:
+        providers = {}
+        for p in self.providers:
+            delay, deadline = self._adaptive(p, LLM_HEDGE_PERCENTILE), self.deadline(p)
+            providers[p.name] = {
+                "kind": p.kind,
+                "model": p.model,
+                "base_url": p.base_url,
+                **self.stats[p.name].snapshot(),
+                "hedge_delay_ms": round(1000 * delay, 1) if delay is not None else None,
+                "deadline_s": round(deadline, 2) if deadline is not None else None,
+            }
+        return providers
+
+    def hedge_stats(self) -> dict:
+        return {
+            "enabled": self.hedge,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+            "max_ratio": LLM_HEDGE_MAX_RATIO,
+            "percentile": LLM_HEDGE_PERCENTILE,
+        }
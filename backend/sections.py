@@ -0,0 +1,62 @@
+import json
+import asyncio
+
+
+class Section:
+    """One independently generated part of an AdResponse.
+
+    prompt is formatted with the request fields plus, for each name in depends_on,
+    the JSON of that already-generated section (e.g. {variations} for compliance).
+    The completion must return {"<key>": ...}. finish(value, fields, dependencies), when set,
+    reworks that value (e.g. ranks candidates) before anything depending on the section sees it;
+    dependencies maps each name in depends_on to its value.
+    """
+
+    def __init__(self, key: str, prompt: str, depends_on: tuple = (), finish=None):
+        self.key = key
+        self.prompt = prompt
+        self.depends_on = depends_on
+        self.finish = finish
+
+
+def with_context(section: Section, name: str, block: str, after: str) -> Section:
+    """Copy of section that also depends on name, with block (which uses {name}) inserted after `after` in its prompt."""
+    return Section(section.key, section.prompt.replace(after, after + block, 1), section.depends_on + (name,), section.finish)
+
+
+async def generate_sections(sections: list, fields: dict, complete, done: dict = None, on_section=None) -> dict:
+    """Run one completion per section concurrently; a section starts as soon as its dependencies finish.
+
+    complete(prompt) must return the parsed JSON object of the completion. End-to-end latency is
+    the slowest dependency chain rather than the sum of all sections. done holds sections that
+    already exist: they satisfy depends_on and are returned alongside the generated ones.
+    on_section(key, value), when set, is called as each generated section finishes (e.g. to stream it).
+    """
+    done = done or {}
+    tasks = {}
+
+    async def run(section: Section):
+        context = dict(fields)
+        dependencies = {}
+        for name in section.depends_on:
+            dependencies[name] = done[name] if name in done else await tasks[name]
+            context[name] = json.dumps(dependencies[name], ensure_ascii=False)
+        data = await complete(section.prompt.format(**context))
+        if section.key not in data:
+            raise ValueError(f"Section '{section.key}' missing from model output (got keys: {list(data)})")
+        value = data[section.key]
+        if section.finish is not None:
+            value = section.finish(value, fields, dependencies)
+        if on_section is not None:
+            on_section(section.key, value)
+        return value
+
+    for section in sections:
+        tasks[section.key] = asyncio.ensure_future(run(section))
+    try:
+        values = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    return {**done, **dict(zip(tasks.keys(), values))}
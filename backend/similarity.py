@@ -0,0 +1,263 @@
+"""Near-duplicate lookup of briefs, so reworded briefs reuse cached insights.
+
+The insight cache is keyed on the normalized product, description and audience, so "Women aged
+25-45, wedding shoppers" and "women 25–45 shopping for weddings" miss each other. BriefIndex
+embeds those fields with hashed word and character-trigram features, one slice of the vector
+per field weighted by SIMILAR_BRIEF_WEIGHTS, so the cosine of two briefs is the weighted mean
+of their per-field cosines. A brief whose exact key misses reuses the insights of the most
+similar indexed brief at or above SIMILAR_BRIEF_THRESHOLD.
+
+Lookups scan a 128-bit SimHash sketch per brief (random hyperplanes, so the Hamming distance
+estimates the angle) for rows that can plausibly reach the threshold, then score only those
+with the exact cosine; both arrays are NumPy, so this stays under a millisecond at 100k briefs.
+With SIMILAR_BRIEFS=mmap the vectors and sketches live in memory-mapped .npy files under
+SIMILAR_BRIEFS_PATH and survive restarts; rows.jsonl records which insight key each row holds.
+One process should own a path; workers that share one each need their own.
+
+    python -m bench.similar_briefs
+
+measures lookup time by index size and how many generations reuse insights.
+"""
+from __future__ import annotations
+
+import os
+import re
+import json
+import math
+import zlib
+import threading
+import unicodedata
+from functools import lru_cache
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# off, memory or mmap; off unless enabled, since a near-duplicate's insights stand in for the brief's own
+SIMILAR_BRIEFS = os.getenv("SIMILAR_BRIEFS", "off").lower()
+SIMILAR_BRIEFS_PATH = os.getenv("SIMILAR_BRIEFS_PATH", ".cache/briefs")
+SIMILAR_BRIEF_THRESHOLD = float(os.getenv("SIMILAR_BRIEF_THRESHOLD", "0.85"))
+# Share of the similarity per field; a different product name alone keeps two briefs apart
+SIMILAR_BRIEF_WEIGHTS = {"product_name": 0.4, "description": 0.3, "target_audience": 0.3}
+
+# Hashed feature slots per field, in SIMILAR_BRIEF_WEIGHTS order
+FIELD_DIMENSIONS = {"product_name": 64, "description": 128, "target_audience": 128}
+SKETCH_BITS = 128
+# Words that reword a brief without changing who or what it is about
+STOP_WORDS = {"a", "an", "and", "the", "of", "for", "to", "in", "on", "with", "who", "that", "aged", "age", "ages", "years", "year", "old"}
+
+# Part of the file names, so an index built with other features or weights is not read back
+INDEX_VERSION = "v1-" + zlib.crc32(json.dumps([SIMILAR_BRIEF_WEIGHTS, FIELD_DIMENSIONS, SKETCH_BITS, sorted(STOP_WORDS)]).encode()).to_bytes(4, "big").hex()
+
+WORD = re.compile(r"\w+")
+NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def features(text: str) -> list:
+    """Word and padded character-trigram features of text, after NFKC, casefolding and stop words."""
+    words = [word for word in WORD.findall(unicodedata.normalize("NFKC", str(text)).casefold()) if word not in STOP_WORDS]
+    grams = []
+    for word in words:
+        # A trailing s is the most common rewording (shopper/shoppers), so words are compared without it
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        grams.append(word)
+        padded = f"<{word}>"
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def scope(namespace: str, fields: dict) -> str:
+    """namespace plus the numbers in the brief: ages, prices and sizes have to match exactly,
+    however similar the wording around them is."""
+    text = unicodedata.normalize("NFKC", " ".join(str(fields.get(field, "")) for field in SIMILAR_BRIEF_WEIGHTS))
+    return f"{namespace}|{','.join(sorted(set(NUMBER.findall(text))))}"
+
+
+@lru_cache(maxsize=None)
+def _tables() -> dict:
+    """Slot offsets per field and the random hyperplanes of the sketch, built on first use."""
+    offsets, start = {}, 0
+    for field, dimensions in FIELD_DIMENSIONS.items():
+        offsets[field] = (start, dimensions)
+        start += dimensions
+    rng = np.random.default_rng(20240927)
+    return {
+        "offsets": offsets,
+        "dimensions": start,
+        "hyperplanes": rng.standard_normal((start, SKETCH_BITS)).astype(np.float32),
+        "words": SKETCH_BITS // 64,
+        "bit_values": (np.uint64(1) << np.arange(64, dtype=np.uint64)),
+    }
+
+
+def embed(fields: dict):
+    """Unit float32 vector of the brief fields; the dot product of two is their weighted similarity."""
+    tables = _tables()
+    vector = np.zeros(tables["dimensions"], dtype=np.float32)
+    for field, weight in SIMILAR_BRIEF_WEIGHTS.items():
+        start, dimensions = tables["offsets"][field]
+        hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in features(fields.get(field, ""))), dtype=np.uint32)
+        if not len(hashes):
+            continue
+        # The top bit signs the feature so collisions cancel out on average instead of adding up
+        signs = np.where(hashes >> 31, -1.0, 1.0)
+        part = np.bincount(hashes % dimensions, weights=signs, minlength=dimensions)
+        norm = np.linalg.norm(part)
+        if norm:
+            vector[start:start + dimensions] = part * (math.sqrt(weight) / norm)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def sketch(vector):
+    """SKETCH_BITS sign bits of vector against the hyperplanes, packed into uint64 words."""
+    tables = _tables()
+    bits = (vector @ tables["hyperplanes"]) > 0
+    return (bits.reshape(tables["words"], 64) * tables["bit_values"]).sum(axis=1, dtype=np.uint64)
+
+
+def max_distance(threshold: float) -> int:
+    """Hamming distance below which a row can still be at threshold: the expected distance at that
+    cosine plus four standard deviations, so a true match is practically never filtered out."""
+    p = math.acos(max(-1.0, min(1.0, threshold))) / math.pi
+    return math.ceil(SKETCH_BITS * p + 4 * math.sqrt(SKETCH_BITS * p * (1 - p)))
+
+
+def _scope_id(row_scope: str) -> int:
+    return zlib.crc32(row_scope.encode("utf-8"))
+
+
+def _popcount(values):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    # NumPy < 2.0: count the bits of each byte and sum them per word
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return table[values.view(np.uint8)].reshape(len(values), 8).sum(axis=1, dtype=np.uint8)
+
+
+class BriefIndex:
+    """Vectors and sketches of indexed briefs with the (scope, key) each one stands for.
+
+    namespace separates briefs whose keys are not interchangeable (another model or insight
+    prompt); a lookup only returns rows of its own scope (namespace plus the brief's numbers).
+    With path set, the arrays are memory-mapped .npy files that double in size when full.
+    """
+
+    def __init__(self, path: str = None, threshold: float = SIMILAR_BRIEF_THRESHOLD, capacity: int = 1024):
+        # Vectors are stored as float16, which is plenty for a cosine compared against a threshold
+        self.path = path
+        self.threshold = threshold
+        self.max_distance = max_distance(threshold)
+        self.rows = []  # (scope, key) per row
+        self._row_of = {}
+        # crc32 of each row's scope, rebuilt from rows on open, to drop other scopes before scoring
+        self._scope_ids = np.zeros(capacity, dtype=np.uint32)
+        self._lock = threading.Lock()
+        tables = _tables()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._rows_file = os.path.join(path, f"{INDEX_VERSION}.rows.jsonl")
+            if os.path.exists(self._rows_file):
+                with open(self._rows_file, encoding="utf-8") as f:
+                    for line in f:
+                        if line.endswith("\n"):
+                            self._append_row(*json.loads(line))
+            self._vectors = self._open("vectors", (max(capacity, len(self.rows)), tables["dimensions"]), np.float16)
+            self._sketches = self._open("sketches", (tables["words"], max(capacity, len(self.rows))), np.uint64)
+            if len(self._vectors) < len(self.rows) or self._sketches.shape[1] < len(self.rows):
+                raise ValueError(f"Similar-brief index at {path} is missing rows; remove it to start over")
+        else:
+            self._vectors = np.zeros((capacity, tables["dimensions"]), dtype=np.float16)
+            self._sketches = np.zeros((tables["words"], capacity), dtype=np.uint64)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{INDEX_VERSION}.{name}.npy")
+
+    def _open(self, name: str, shape: tuple, dtype):
+        if os.path.exists(self._file(name)):
+            return np.load(self._file(name), mmap_mode="r+")
+        return np.lib.format.open_memmap(self._file(name), mode="w+", dtype=dtype, shape=shape)
+
+    def _append_row(self, row_scope: str, key: str):
+        row = len(self.rows)
+        if row == len(self._scope_ids):
+            self._scope_ids = np.concatenate([self._scope_ids, np.zeros_like(self._scope_ids)])
+        self._scope_ids[row] = _scope_id(row_scope)
+        self._row_of[(row_scope, key)] = row
+        self.rows.append((row_scope, key))
+
+    def _grow(self):
+        self._vectors = self._resized("vectors", self._vectors, (2 * len(self._vectors), self._vectors.shape[1]))
+        self._sketches = self._resized("sketches", self._sketches, (self._sketches.shape[0], 2 * self._sketches.shape[1]))
+
+    def _resized(self, name: str, old, shape: tuple):
+        """A zeroed array of shape starting with old's contents."""
+        if not self.path:
+            new = np.zeros(shape, dtype=old.dtype)
+            new[tuple(slice(0, n) for n in old.shape)] = old
+            return new
+        # Written beside the old file and renamed over it, so a crash leaves one or the other
+        temporary = self._file(name) + ".tmp"
+        new = np.lib.format.open_memmap(temporary, mode="w+", dtype=old.dtype, shape=shape)
+        new[tuple(slice(0, n) for n in old.shape)] = old
+        new.flush()
+        os.replace(temporary, self._file(name))
+        return new
+
+    def add(self, namespace: str, key: str, fields: dict):
+        """Index the brief fields as key; adding a key again is a no-op."""
+        row_scope, vector = scope(namespace, fields), embed(fields)
+        with self._lock:
+            if (row_scope, key) in self._row_of:
+                return
+            row = len(self.rows)
+            if row == len(self._vectors):
+                self._grow()
+            self._vectors[row] = vector
+            self._sketches[:, row] = sketch(vector)
+            # The row is only counted once its line is written, after its vector
+            if self.path:
+                with open(self._rows_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps([row_scope, key]) + "\n")
+            self._append_row(row_scope, key)
+
+    def search(self, row_scope: str, vector, k: int = 3) -> list:
+        """Up to k (similarity, key) of row_scope at or above the threshold, most similar first."""
+        with self._lock:
+            size = len(self.rows)
+            if not size:
+                return []
+            query = sketch(vector)
+            distance = _popcount(self._sketches[0, :size] ^ query[0])
+            for word in range(1, len(query)):
+                distance += _popcount(self._sketches[word, :size] ^ query[word])
+            candidates = np.flatnonzero((distance <= self.max_distance) & (self._scope_ids[:size] == _scope_id(row_scope)))
+            if not len(candidates):
+                return []
+            # float16 matmul has no fast path in NumPy, so the few candidate rows are widened first
+            scores = self._vectors[candidates].astype(np.float32) @ vector
+            matches = []
+            for i in np.argsort(-scores):
+                if scores[i] < self.threshold or len(matches) == k:
+                    break
+                candidate_scope, key = self.rows[candidates[i]]
+                if candidate_scope == row_scope:
+                    matches.append((float(scores[i]), key))
+            return matches
+
+    def neighbors(self, namespace: str, fields: dict, k: int = 3) -> list:
+        """Keys of up to k indexed briefs similar enough to the brief fields, most similar first."""
+        return [key for _, key in self.search(scope(namespace, fields), embed(fields), k)]
+
+    def stats(self) -> dict:
+        return {"briefs": len(self.rows), "threshold": self.threshold}
+
+
+def build_brief_index():
+    if SIMILAR_BRIEFS in ("", "off", "none", "0"):
+        return None
+    if SIMILAR_BRIEFS == "memory":
+        return BriefIndex()
+    if SIMILAR_BRIEFS == "mmap":
+        return BriefIndex(path=SIMILAR_BRIEFS_PATH)
+    raise ValueError(f"Unknown SIMILAR_BRIEFS mode: {SIMILAR_BRIEFS!r} (expected 'memory', 'mmap' or 'off')")
@@ -0,0 +1,129 @@
+"""Compressed delivery of the inline UI and of large JSON bodies.
+
+StaticAsset holds one document (the HTML of the Vercel UI) with its gzip and, when the brotli
+package is installed, brotli encodings, each compressed once per process at maximum level by
+prepare() in the app's startup hook, before the first client asks for it. Every encoding has its own strong ETag, so a revisit with
+If-None-Match gets an empty 304, and Cache-Control lets browsers and the CDN keep it.
+
+json_response compresses an already serialized JSON body when it is larger than
+JSON_COMPRESSION_MIN_BYTES and the client accepts it, at a level cheap enough to run per request.
+"""
+import os
+import gzip
+import hashlib
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Browsers revalidate after an hour (an ETag match costs a 304); the CDN keeps it for a year,
+# which is safe because a deployment replaces the CDN cache
+STATIC_CACHE_CONTROL = os.getenv(
+    "STATIC_CACHE_CONTROL", "public, max-age=3600, s-maxage=31536000, stale-while-revalidate=86400"
+)
+JSON_COMPRESSION = os.getenv("JSON_COMPRESSION", "1") == "1"
+# Below about one packet, compressing saves no round trip
+JSON_COMPRESSION_MIN_BYTES = int(os.getenv("JSON_COMPRESSION_MIN_BYTES", "1400"))
+
+# Server preference when the client rates several encodings equally
+PREFERENCE = ("br", "gzip", "identity")
+
+
+def accepted_encodings(header: str) -> dict:
+    """{coding: q} from an Accept-Encoding header; identity is acceptable unless refused."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    if "identity" not in accepted:
+        accepted["identity"] = accepted.get("*", 1.0) or 0.001
+    return accepted
+
+
+def choose_encoding(header: str, available) -> str:
+    """The available coding the client rates highest (server preference on ties), identity if none is acceptable."""
+    accepted = accepted_encodings(header)
+    candidates = [coding for coding in PREFERENCE if coding in available and accepted.get(coding, accepted.get("*", 0)) > 0]
+    if not candidates:
+        return "identity"
+    return max(candidates, key=lambda coding: accepted.get(coding, accepted.get("*", 0)))
+
+
+def _compress(body: bytes, coding: str, static: bool) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=11 if static else 5, mode=brotli.MODE_TEXT)
+    if coding == "gzip":
+        # mtime=0 keeps the bytes, and so the ETag, identical across processes
+        return gzip.compress(body, compresslevel=9 if static else 6, mtime=0)
+    return body
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+class StaticAsset:
+    def __init__(self, body, media_type: str, cache_control: str = STATIC_CACHE_CONTROL):
+        self.body = body.encode("utf-8") if isinstance(body, str) else body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.codings = ("br", "gzip", "identity") if brotli is not None else ("gzip", "identity")
+        self._variants = {"identity": self.body}
+
+    def prepare(self):
+        """Build every encoding now, so no request waits on brotli's top quality level."""
+        for coding in self.codings:
+            self.variant(coding)
+
+    def variant(self, coding: str) -> bytes:
+        # Normally built by prepare() at startup; an app that skipped it builds each on first use
+        if coding not in self._variants:
+            self._variants[coding] = _compress(self.body, coding, static=True)
+        return self._variants[coding]
+
+    def etag(self, coding: str) -> str:
+        # Each encoding is a different representation, so it needs its own strong validator
+        return f'"{self.digest}"' if coding == "identity" else f'"{self.digest}-{coding}"'
+
+    def response(self, request: Request) -> Response:
+        coding = choose_encoding(request.headers.get("accept-encoding"), self.codings)
+        headers = {"ETag": self.etag(coding), "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if _etag_matches(request.headers.get("if-none-match"), self.etag(coding)):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(self.variant(coding), media_type=self.media_type, headers=headers)
+
+    def stats(self) -> dict:
+        return {coding: len(self.variant(coding)) for coding in self.codings}
+
+
+def json_response(request: Request, body: bytes, headers: dict = None, status_code: int = 200) -> Response:
+    """Response for serialized JSON, brotli or gzip encoded when it is large enough and the client accepts it."""
+    headers = dict(headers or {})
+    if JSON_COMPRESSION and len(body) >= JSON_COMPRESSION_MIN_BYTES:
+        coding = choose_encoding(request.headers.get("accept-encoding"), ("br", "gzip", "identity") if brotli is not None else ("gzip", "identity"))
+        headers["Vary"] = "Accept-Encoding"
+        if coding != "identity":
+            body = _compress(body, coding, static=False)
+            headers["Content-Encoding"] = coding
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,170 @@
+import json
+from .decoding import build_response, PartialResponse
+from .metrics import stage
+
+
+class SectionParser:
+    """Incrementally scans a streamed JSON object and reports each top-level section as soon as it closes.
+
+    Elements of a top-level array (e.g. "variations") are reported one by one as (key, index, value);
+    object sections are reported as (key, None, value). Anything before the first "{" (code fences,
+    preamble) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.start = None
+        self.end = None
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_string = None
+        self.key = None
+        self.value_start = None
+        self.value_is_array = False
+        self.element_start = None
+        self.element_index = 0
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        buf = self.buffer
+        completed = []
+        for i in range(self.pos, len(buf)):
+            c = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self.last_string = json.loads(buf[self.string_start:i + 1])
+                continue
+            if self.start is None:
+                if c == "{":
+                    self.start = i
+                    self.depth = 1
+                continue
+            if self.end is not None:
+                break
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c in "{[":
+                self.depth += 1
+                if self.depth == 2:
+                    self.value_start = i
+                    self.value_is_array = c == "["
+                    self.element_index = 0
+                elif self.depth == 3 and self.value_is_array:
+                    self.element_start = i
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 2 and self.element_start is not None:
+                    completed.append((self.key, self.element_index, json.loads(buf[self.element_start:i + 1])))
+                    self.element_index += 1
+                    self.element_start = None
+                elif self.depth == 1 and self.value_start is not None:
+                    if not self.value_is_array:
+                        completed.append((self.key, None, json.loads(buf[self.value_start:i + 1])))
+                    self.value_start = None
+                elif self.depth == 0:
+                    self.end = i
+            elif c == ":" and self.depth == 1:
+                self.key = self.last_string
+        self.pos = len(buf)
+        return completed
+
+    def result(self) -> dict:
+        if self.start is None or self.end is None:
+            raise ValueError("Model stream ended before the JSON object was complete")
+        return json.loads(self.buffer[self.start:self.end + 1])
+
+
+def section_event(key: str, index, value, section_models: dict):
+    """(event, payload) for a section, or one element (index) of an array section; None if it does not validate.
+
+    section_models maps top-level keys to pydantic models; for array sections the model applies to
+    each element and the event is the singular key ("variations" -> "variation").
+    """
+    model = section_models.get(key)
+    if model is None:
+        return None
+    try:
+        section = model.model_validate(value)
+    except Exception:
+        # The final full validation reports the error; keep streaming other sections.
+        return None
+    if index is None:
+        return key, section.model_dump()
+    return key.rstrip("s"), {"index": index, key.rstrip("s"): section.model_dump()}
+
+
+def section_events(key: str, value, section_models: dict) -> list:
+    """The events of a complete section, one per element for an array section."""
+    parts = enumerate(value) if isinstance(value, list) else [(None, value)]
+    return [event for event in (section_event(key, index, part, section_models) for index, part in parts) if event is not None]
+
+
+async def stream_sections(deltas, section_models: dict, response_model, prepare=None, done: dict = None):
+    """Yield (event, payload) pairs for every section that validates (see section_event), then ("done", full response).
+
+    prepare(key, value) may patch a section before validation (e.g. insight fallbacks). done holds
+    sections produced elsewhere, as for decode_campaign: they are not streamed and take precedence
+    over the model's. Raises PartialResponse with the sections that validated when the rest do not.
+    """
+    done = done or {}
+    parser = SectionParser()
+    async for text in deltas:
+        for key, index, value in parser.feed(text):
+            if key in done:
+                continue
+            if prepare is not None:
+                value = prepare(key, value)
+            event = section_event(key, index, value, section_models)
+            if event is not None:
+                yield event
+
+    try:
+        data = {**parser.result(), **done}
+    except ValueError:
+        raise PartialResponse(dict(done), [key for key in response_model.model_fields if key not in done])
+    with stage("validation"):
+        response = build_response(data, response_model, prepare)
+    yield "done", response
+
+
+def response_events(response):
+    """Replay a complete response (e.g. from cache) as the same events a live stream produces."""
+    data = response.model_dump()
+    for key, value in data.items():
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                yield key.rstrip("s"), {"index": index, key.rstrip("s"): item}
+        else:
+            yield key, value
+
+
+def sse_event(event: str, data) -> str:
+    if hasattr(data, "model_dump"):
+        data = data.model_dump()
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def sse_stream(key: str, cached, live, cache):
+    """Server-sent events for one generation: replays a cache hit, or relays the live stream and caches its result."""
+    if cached is not None:
+        for event, payload in response_events(cached):
+            yield sse_event(event, payload)
+        yield sse_event("done", cached)
+        return
+    try:
+        async for event, payload in live:
+            if event == "done":
+                await cache.aset(key, payload)
+            yield sse_event(event, payload)
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
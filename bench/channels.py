@@ -0,0 +1,73 @@
+"""SMS parts and throughput of the local channel adapter on one core.
+
+    python -m bench.channels
+    python -m bench.channels --messages 1000000 --unicode 0.05
+
+Builds model-style channel copy from the fake server's canned response: curly quotes, dashes,
+emoji, hashtags and bodies of varying length, with a share written in Hindi (which has to stay
+UCS-2). Reports the SMS parts the copy costs as written and after adapt_channels in fit mode
+(the model's copy, transliterated and fitted) and local mode (derived from the best variation),
+and the time per campaign of each.
+"""
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+from .fake_groq import CANNED_AD_RESPONSE
+
+DECORATIONS = ("", " 💍✨", " 🎉", " — don’t miss it!!", " “Limited” stock…", " #WeddingSeason #Silk")
+EXTRAS = (
+    "Hand-woven by master weavers in Varanasi, each saree takes three weeks.",
+    "Pure mulberry silk with real zari borders and free shipping across India.",
+    "Easy 30-day returns and cash on delivery available.",
+)
+HINDI = "शादी के लिए हाथ से बुनी रेशमी साड़ियाँ 💍 इस सीज़न सिर्फ 12 बचीं। अभी खरीदें: silk.ly/w"
+
+
+def build_campaigns(count: int, unicode_share: float, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    sms = CANNED_AD_RESPONSE["channel_opt"]["sms"]
+    campaigns = []
+    for i in range(count):
+        if rng.random() < unicode_share:
+            text = HINDI
+        else:
+            extras = " ".join(rng.sample(EXTRAS, rng.randrange(len(EXTRAS) + 1)))
+            text = f"{sms.replace(': ', ' — ', 1)}{rng.choice(DECORATIONS)} {extras}".strip()
+        variations = [dict(v, primary_text=f"{v['primary_text']} {rng.choice(EXTRAS)}{rng.choice(DECORATIONS)}")
+                      for v in CANNED_AD_RESPONSE["variations"]]
+        whatsapp = f"{CANNED_AD_RESPONSE['channel_opt']['whatsapp']} Ref {i} 💍"
+        campaigns.append({"variations": variations, "channel_opt": {"whatsapp": whatsapp, "sms": text}})
+    return campaigns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--unicode", type=float, default=0.05, help="share of SMS copy in a script GSM-7 cannot spell")
+    args = parser.parse_args()
+
+    from backend.channels import adapt_channels, sms_segments
+
+    campaigns = build_campaigns(args.messages, args.unicode)
+    start = time.perf_counter()
+    written = Counter(sms_segments(c["channel_opt"]["sms"]) for c in campaigns)
+    counting = time.perf_counter() - start
+    print(f"{len(campaigns)} campaigns; sms_segments {1e6 * counting / len(campaigns):.2f}us per message")
+    print(f"  {'copy':>10} {'us/campaign':>12} {'parts':>7}  encodings and parts")
+    for label, mode in (("as written", None), ("fit", "fit"), ("local", "local")):
+        if mode is None:
+            parts, elapsed = written, counting
+        else:
+            start = time.perf_counter()
+            adapted = [adapt_channels(c, mode)["channel_opt"]["sms"] for c in campaigns]
+            elapsed = time.perf_counter() - start
+            parts = Counter(sms_segments(sms) for sms in adapted)
+        total = sum(count * n for (_, count), n in parts.items())
+        detail = ", ".join(f"{encoding} x{count}: {n}" for (encoding, count), n in sorted(parts.items()))
+        print(f"  {label:>10} {1e6 * elapsed / len(campaigns):>12.2f} {total / len(campaigns):>7.2f}  {detail}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Cold start of the Vercel entry point: import cost per package and time to first byte.
+
+    python -m bench.cold_start
+    python -m bench.cold_start --runs 10 --budget 500 --module api.index
+
+The import report runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+sums each module's own import time by top-level package (backend.* and api.* per module), then
+checks the total against --budget milliseconds; the exit status is 1 when it is over.
+
+The first-byte runs spawn a fresh uvicorn process per request, the way a cold serverless
+instance imports the app on its first invocation, and time from spawning it to the first byte
+of GET / and of POST /api/generate against bench/fake_groq. "eager" runs import NumPy, the Groq
+SDK and httpx before the app, which is what every cold start paid before they were deferred.
+Readiness includes compressing the UI in every encoding, which the app's startup hook does
+before the port accepts connections.
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+from collections import Counter
+import httpx
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+
+DEFERRED = ("numpy", "groq", "httpx")
+
+
+def import_costs(module: str, env: dict) -> Counter:
+    """Own import time in ms per package for `import module` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    costs = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        parts = name.split(".")
+        package = name if parts[0] in ("backend", "api") else parts[0]
+        costs[package] += int(own) / 1000
+    return costs
+
+
+def import_report(module: str, env: dict, budget: float, top: int) -> bool:
+    costs = import_costs(module, env)
+    total = sum(costs.values())
+    print(f"import {module}: {total:.0f}ms of own import time (budget {budget:.0f}ms)")
+    for package, ms in costs.most_common(top):
+        print(f"  {package:<28} {ms:>8.1f}ms {100 * ms / total:>5.1f}%")
+    loaded = [package for package in DEFERRED if package in costs]
+    print(f"  deferred packages imported anyway: {', '.join(loaded) or 'none'}")
+    print(f"  {'OVER' if total > budget else 'within'} budget")
+    return total <= budget
+
+
+def first_byte(args: list, env: dict, method: str, path: str, **kwargs) -> tuple:
+    """(seconds until the port accepts, seconds from spawn to the response's first byte) of a fresh server."""
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, *args, "--port", str(port)], env=env)
+    try:
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                break
+            except OSError:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"server exited with {proc.returncode}")
+                time.sleep(0.002)
+        ready = time.perf_counter() - start
+        with httpx.Client(timeout=60) as client:
+            with client.stream(method, f"http://127.0.0.1:{port}{path}", **kwargs) as response:
+                next(response.iter_raw(), None)
+                response.raise_for_status()
+        return ready, time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="api.index")
+    parser.add_argument("--budget", type=float, default=550, help="ms of import time the entry point may take")
+    parser.add_argument("--top", type=int, default=15, help="packages listed in the import report")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per path and mode")
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    env = dict(os.environ)
+    env.update({"GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}", "GROQ_API_KEY": "fake", "GROQ_RPM": "0"})
+    within = import_report(args.module, env, args.budget, args.top)
+
+    fake = start_server(["-m", "bench.fake_groq", "--port", str(fake_port), "--latency", "0"], env, fake_port)
+    app = f"{args.module}:app"
+    server = {
+        "lazy": ["-m", "uvicorn", app, "--log-level", "warning"],
+        "eager": ["-c", f"import {', '.join(DEFERRED)}, uvicorn; uvicorn.main()", app, "--log-level", "warning"],
+    }
+    requests = {"GET /": ("GET", "/", {}), "POST /api/generate": ("POST", "/api/generate", {"json": SAMPLE_REQUEST})}
+    try:
+        print(f"\nfresh process per request, median of {args.runs}")
+        print(f"{'':<20} {'mode':>6} {'ready ms':>9} {'first byte ms':>14}")
+        for label, (method, path, kwargs) in requests.items():
+            for mode, command in server.items():
+                runs = [first_byte(command, env, method, path, **kwargs) for _ in range(args.runs)]
+                ready = statistics.median(r[0] for r in runs)
+                ttfb = statistics.median(r[1] for r in runs)
+                print(f"{label:<20} {mode:>6} {1000 * ready:>9.0f} {1000 * ttfb:>14.0f}")
+    finally:
+        fake.terminate()
+        fake.wait()
+    return 0 if within else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Compare two bench/run.py result files.
+
+    python -m bench.compare baseline.json current.json --threshold 0.10
+
+Exits with status 1 if any p95 latency or requests/sec moved more than the threshold in the wrong direction.
+"""
+import sys
+import json
+import argparse
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    return report["meta"], {(r["app"], r["concurrency"]): r for r in report["results"]}
+
+
+def change(old: float, new: float) -> float:
+    return (new - old) / old if old else 0.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    old_meta, old = load(args.baseline)
+    new_meta, new = load(args.current)
+    print(f"{old_meta['commit']} -> {new_meta['commit']}")
+    print(f"{'app':>8} {'conc':>5} {'rps':>18} {'p95 ms':>22} {'p99 ms':>22}")
+
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        rps = change(a["rps"], b["rps"])
+        p95 = change(a["latency_ms"]["p95"], b["latency_ms"]["p95"])
+        p99 = change(a["latency_ms"]["p99"], b["latency_ms"]["p99"])
+        flag = ""
+        if rps < -args.threshold or p95 > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key[0]:>8} {key[1]:>5} {b['rps']:>9.2f} ({rps:+6.1%}) {b['latency_ms']['p95']:>12.1f} ({p95:+6.1%}) "
+              f"{b['latency_ms']['p99']:>12.1f} ({p99:+6.1%}){flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
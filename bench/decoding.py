@@ -0,0 +1,99 @@
+"""How many full regenerations tolerant decoding saves on a corpus of malformed model outputs.
+
+    python -m bench.decoding
+    python -m bench.decoding --corpus recorded.jsonl   # one {"content": "<raw completion>"} per line
+
+Without --corpus the outputs are built from the fake server's canned response with the defects
+seen in practice: code fences and preamble, trailing commas, smart quotes, raw newlines in
+strings, truncation at several points, and sections that are missing or have the wrong shape.
+Before, any of these failed json.loads or AdResponse and cost a full retry; now each output is
+either used as-is, repaired, or only its broken sections are generated again.
+"""
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from .fake_groq import CANNED_AD_RESPONSE
+
+
+def synthetic_corpus() -> dict:
+    clean = json.dumps(CANNED_AD_RESPONSE, indent=2, ensure_ascii=False)
+    compact = json.dumps(CANNED_AD_RESPONSE, ensure_ascii=False)
+    missing = {key: value for key, value in CANNED_AD_RESPONSE.items() if key != "compliance"}
+    bad_variation = dict(CANNED_AD_RESPONSE, variations=[{"headline": "Wear Your Heritage"}] + CANNED_AD_RESPONSE["variations"][1:])
+    bad_channel = dict(CANNED_AD_RESPONSE, channel_opt="WhatsApp: Hi! / SMS: Silk Aura")
+    trailing = clean.replace('"\n  ]', '",\n  ]').replace("}\n}", "},\n}")
+    smart = clean.replace('": "', "”: “").replace('",\n', "”,\n").replace('\n    "', "\n    “")
+    corpus = {
+        "clean": clean,
+        "code_fence": f"```json\n{clean}\n```",
+        "preamble": f"Here is your campaign:\n\n{clean}\n\nLet me know if you need changes!",
+        "trailing_commas": trailing,
+        "smart_quotes": smart,
+        "raw_newlines": compact.replace("Every thread tells", "Every thread\ntells"),
+        "fence_and_trailing_commas": f"```json\n{trailing}\n```",
+        "missing_section": json.dumps(missing, indent=2),
+        "variation_missing_fields": json.dumps(bad_variation, indent=2),
+        "section_wrong_type": json.dumps(bad_channel, indent=2),
+        "refusal": "I'm sorry, but I can't help with that request.",
+    }
+    for share in (0.3, 0.6, 0.8, 0.9, 0.97):
+        corpus[f"truncated_{int(share * 100)}pct"] = clean[:int(len(clean) * share)]
+    corpus["smart_quotes_truncated"] = smart[:int(len(smart) * 0.85)]
+    return corpus
+
+
+def load_corpus(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return {f"line_{i + 1}": json.loads(line)["content"] for i, line in enumerate(f) if line.strip()}
+
+
+def baseline_ok(text: str, response_model) -> bool:
+    try:
+        response_model(**json.loads(text))
+        return True
+    except Exception:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="JSONL of recorded completions ({\"content\": ...} per line)")
+    parser.add_argument("--verbose", action="store_true", help="print the outcome of every output")
+    args = parser.parse_args()
+
+    from backend.engine.v2 import AdResponse
+    from backend.decoding import decode_campaign, PartialResponse
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    sections = len(AdResponse.model_fields)
+    outcomes = Counter()
+    full_retries_before = full_retries_after = regenerated = 0
+    start = time.perf_counter()
+    for name, text in corpus.items():
+        if not baseline_ok(text, AdResponse):
+            full_retries_before += 1
+        try:
+            decode_campaign(text, AdResponse)
+            outcome = "used"
+        except PartialResponse as partial:
+            regenerated += len(partial.broken)
+            if len(partial.broken) == sections:
+                full_retries_after += 1
+                outcome = "all sections regenerated"
+            else:
+                outcome = f"regenerated {', '.join(partial.broken)}"
+        outcomes[outcome if outcome == "used" or outcome.startswith("all") else "partial"] += 1
+        if args.verbose:
+            print(f"  {name:>28}: {outcome}")
+    elapsed = time.perf_counter() - start
+
+    print(f"outputs: {len(corpus)}  decode time: {1000 * elapsed / len(corpus):.2f}ms each")
+    print(f"full retries before: {full_retries_before}  after: {full_retries_after}  saved: {full_retries_before - full_retries_after}")
+    print(f"outcomes: {dict(outcomes)}")
+    print(f"sections regenerated: {regenerated} (vs {full_retries_before * sections} section-equivalents for full retries)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
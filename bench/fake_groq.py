@@ -0,0 +1,252 @@
+"""Local stand-in for the Groq chat completions API.
+
+Run with:  python -m bench.fake_groq --port 9100 --latency 0.3 --token-latency 0.004
+Then point the app at it with GROQ_BASE_URL=http://127.0.0.1:9100 GROQ_API_KEY=fake
+
+Response time is latency + completion_tokens * token_latency, so smaller (per-section)
+completions come back proportionally faster. With --stall-rate a share of calls takes
+--stall-latency instead, which gives the latency distribution a long tail.
+
+With --rpm / --tpm it enforces request and token budgets over --window seconds the way Groq
+does: every response carries x-ratelimit-* headers and calls over budget get a 429 with
+Retry-After. GET /_fake/stats reports how many calls were accepted and throttled.
+"""
+import os
+import math
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse, JSONResponse
+
+# Superset of both schemas (backend/engine/v2.py and v3.py) so either app validates it.
+CANNED_AD_RESPONSE = {
+    "insights": {
+        "pain_points": ["Finding authentic silk", "Last-minute outfit stress", "Overpriced boutiques"],
+        "emotional_triggers": ["Belonging", "Pride", "Tradition"],
+        "objections": ["Price", "Authenticity", "Delivery time"],
+        "competitive_angle": "Hand-woven by artisan families with verified provenance, unlike mass-produced alternatives.",
+        "key_selling_points": ["Authentic hand-woven silk", "Wedding-ready designs", "Free express delivery"],
+        "recommended_keywords": ["silk saree", "wedding saree", "handloom silk", "bridal saree"],
+        "demographics": "25-45, Female, Urban areas",
+        "targeting_interests": ["Wedding planning", "Handloom", "Ethnic wear", "Luxury fashion", "Online shopping"],
+        "behaviors": ["Frequent online shoppers", "Engages with fashion content", "Purchases luxury items"],
+        "audience_match_score": 73,
+        "match_score_explanation": "Strong need around wedding season with moderate competition.",
+    },
+    "variations": [
+        {"headline": "Wear Your Heritage", "primary_text": "Every thread tells your family's story.", "cta": "Shop the Collection", "angle": "Emotional", "strength_score": 7.8, "score_explanation": "Warm and clear."},
+        {"headline": "100% Pure Mulberry Silk", "primary_text": "Certified handloom, priced direct from weavers.", "cta": "Compare Now", "angle": "Logical", "strength_score": 8.1, "score_explanation": "Concrete proof points."},
+        {"headline": "Only 12 Left This Season", "primary_text": "Wedding season stock is almost gone.", "cta": "Reserve Yours", "angle": "Scarcity", "strength_score": 8.6, "score_explanation": "Clear urgency."},
+    ],
+    "compliance": {
+        "risk_level": "Low",
+        "risk_score": 12,
+        "risk_score_explanation": "No health or financial claims.",
+        "issues": ["Scarcity claim must reflect real stock"],
+        "suggestions": ["Back the stock count with inventory data"],
+    },
+    "channel_opt": {
+        "whatsapp": "Hi! Our wedding silk edit just dropped. Tap to see it before it's gone.",
+        "sms": "Silk Aura: wedding sarees, hand-woven. Only 12 left. Shop now: silk.ly/w",
+    },
+}
+
+LATENCY = float(os.getenv("FAKE_GROQ_LATENCY", "2.0"))
+TOKEN_LATENCY = float(os.getenv("FAKE_GROQ_TOKEN_LATENCY", "0"))
+ERROR_RATE = float(os.getenv("FAKE_GROQ_ERROR_RATE", "0"))
+STALL_RATE = float(os.getenv("FAKE_GROQ_STALL_RATE", "0"))
+STALL_LATENCY = float(os.getenv("FAKE_GROQ_STALL_LATENCY", "10"))
+STREAM_CHUNK_CHARS = 24
+
+app = FastAPI(title="Fake Groq")
+
+
+class Budget:
+    """Provider-side bucket that refills to `limit` over `window` seconds."""
+
+    def __init__(self, limit: float, window: float):
+        self.limit = limit
+        self.window = window
+        self.level = limit
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.limit, self.level + (now - self.updated) * self.limit / self.window)
+        self.updated = now
+
+    def reset_seconds(self) -> float:
+        return (self.limit - self.level) * self.window / self.limit
+
+    def wait_for(self, amount: float) -> float:
+        return max(amount - self.level, 0.0) * self.window / self.limit
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(max(seconds, 0.0), 60)
+    return f"{int(minutes)}m{seconds:.2f}s" if minutes else f"{seconds:.2f}s"
+
+
+budgets = {}
+stats = {"accepted": 0, "throttled": 0, "stalled": 0}
+
+
+def rate_limit_headers() -> dict:
+    headers = {}
+    for kind, budget in budgets.items():
+        headers[f"x-ratelimit-limit-{kind}"] = str(int(budget.limit))
+        headers[f"x-ratelimit-remaining-{kind}"] = str(max(int(budget.level), 0))
+        headers[f"x-ratelimit-reset-{kind}"] = format_duration(budget.reset_seconds())
+    return headers
+
+
+def charge(cost: dict):
+    """Take `cost` from every budget, or return the seconds until it would fit."""
+    for budget in budgets.values():
+        budget.refill()
+    wait = max((budget.wait_for(cost[kind]) for kind, budget in budgets.items()), default=0.0)
+    if wait > 0:
+        return wait
+    for kind, budget in budgets.items():
+        budget.level -= cost[kind]
+    return 0.0
+
+
+@app.get("/_fake/stats")
+async def fake_stats():
+    return {**stats, **{kind: {"limit": b.limit, "remaining": round(b.level, 1)} for kind, b in budgets.items()}}
+
+
+@app.post("/_fake/reset")
+async def fake_reset():
+    for budget in budgets.values():
+        budget.level, budget.updated = budget.limit, time.monotonic()
+    stats.update(accepted=0, throttled=0, stalled=0)
+    return {"ok": True}
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    content = json.dumps(canned_content(body))
+    wait = charge({"requests": 1, "tokens": prompt_tokens(body) + completion_tokens(content)})
+    if wait:
+        stats["throttled"] += 1
+        headers = {**rate_limit_headers(), "retry-after": str(math.ceil(wait))}
+        return JSONResponse({"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}}, status_code=429, headers=headers)
+    stats["accepted"] += 1
+    headers = rate_limit_headers()
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        await asyncio.sleep(LATENCY)
+        return JSONResponse({"error": {"message": "Injected failure", "type": "internal_server_error"}}, status_code=503, headers=headers)
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(body, content), media_type="text/event-stream", headers=headers)
+    latency = LATENCY
+    if STALL_RATE and random.random() < STALL_RATE:
+        stats["stalled"] += 1
+        latency = STALL_LATENCY
+    await asyncio.sleep(latency + completion_tokens(content) * TOKEN_LATENCY)
+    return JSONResponse(headers=headers, content={
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": prompt_tokens(body), "completion_tokens": completion_tokens(content), "total_tokens": prompt_tokens(body) + completion_tokens(content)},
+    })
+
+
+def canned_content(body: dict) -> dict:
+    """Only the sections whose keys the prompt asks for, so per-section prompts get per-section output."""
+    prompt = body["messages"][-1]["content"] if body.get("messages") else ""
+    if '"campaigns":' in prompt:
+        # Matrix prompts list their combinations as numbered "N. Platform: ..." lines
+        campaign = {key: CANNED_AD_RESPONSE[key] for key in ("variations", "compliance", "channel_opt")}
+        count = len(re.findall(r"^\d+\. Platform:", prompt, flags=re.M))
+        return {"campaigns": [dict(campaign, combination=n) for n in range(1, count + 1)]}
+    requested = {key: value for key, value in CANNED_AD_RESPONSE.items() if f'"{key}":' in prompt}
+    candidates = re.search(r"(?:write|Create) (\d+) candidate", prompt)
+    if candidates:
+        requested["variations"] = candidate_variations(int(candidates.group(1)))
+    if '"variation":' in prompt:
+        requested["variation"] = CANNED_AD_RESPONSE["variations"][-1]
+    return requested or CANNED_AD_RESPONSE
+
+
+CANDIDATE_ENDINGS = (
+    "", "Limited stock this season.", "Free shipping on your first order.", "Loved by over 10,000 brides.",
+    "Handwoven in Kanchipuram by master weavers.", "Each piece comes with a certificate of authenticity.",
+)
+
+
+def candidate_variations(per_angle: int) -> list:
+    """per_angle variations per canned angle: reworded ones plus a near-duplicate of the first, as models produce."""
+    candidates = []
+    for variation in CANNED_AD_RESPONSE["variations"]:
+        for i in range(per_angle):
+            ending = CANDIDATE_ENDINGS[i % len(CANDIDATE_ENDINGS)] if i != 1 else ""
+            headline = variation["headline"] if i < 2 else f"{variation['headline']} #{i}"
+            text = f"{variation['primary_text']} {ending}".strip() if i != 1 else variation["primary_text"].replace(".", "!", 1)
+            candidates.append(dict(variation, headline=headline, primary_text=text))
+    return candidates
+
+
+def completion_tokens(content: str) -> int:
+    return len(content) // 4
+
+
+def prompt_tokens(body: dict) -> int:
+    return sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+
+
+async def stream_chunks(body: dict, content: str):
+    """Time-to-first-token LATENCY, then TOKEN_LATENCY per token (OpenAI stream format)."""
+    pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+    await asyncio.sleep(LATENCY)
+    for i, piece in enumerate(pieces):
+        await asyncio.sleep(completion_tokens(piece) * TOKEN_LATENCY)
+        chunk = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": "stop" if i == len(pieces) - 1 else None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=TOKEN_LATENCY, help="seconds per completion token")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="fraction of calls answered with a 503")
+    parser.add_argument("--stall-rate", type=float, default=STALL_RATE, help="fraction of calls that take --stall-latency instead")
+    parser.add_argument("--stall-latency", type=float, default=STALL_LATENCY, help="seconds before a stalled call answers")
+    parser.add_argument("--rpm", type=float, default=0, help="requests allowed per window (0 = unlimited)")
+    parser.add_argument("--tpm", type=float, default=0, help="tokens allowed per window (0 = unlimited)")
+    parser.add_argument("--window", type=float, default=60.0, help="rate-limit window in seconds")
+    args = parser.parse_args()
+    LATENCY = args.latency
+    TOKEN_LATENCY = args.token_latency
+    ERROR_RATE = args.error_rate
+    STALL_RATE = args.stall_rate
+    STALL_LATENCY = args.stall_latency
+    if args.rpm:
+        budgets["requests"] = Budget(args.rpm, args.window)
+    if args.tpm:
+        budgets["tokens"] = Budget(args.tpm, args.window)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
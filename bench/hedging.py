@@ -0,0 +1,98 @@
+"""Tail latency with and without hedged requests against a fake provider that sometimes stalls.
+
+    python -m bench.hedging --latency 0.2 --stall-rate 0.02 --stall-latency 3 --requests 200
+
+Both phases run the same load through the v2 engine with a warmed-up router; only
+router.hedge differs. With hedging on, p99 should fall to roughly the hedge delay plus one
+normal call while the hedge rate stays near the stall rate (and under LLM_HEDGE_MAX_RATIO).
+The stall rate has to stay below 1 - LLM_HEDGE_PERCENTILE, otherwise the hedge delay itself
+lands in the stalled tail.
+"""
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def run_phase(generate, request_model, label: str, total: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            request = request_model(**dict(SAMPLE_REQUEST, product_name=f"{SAMPLE_REQUEST['product_name']} {label} #{i}"))
+            start = time.perf_counter()
+            try:
+                await generate(request)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return {
+        "ok": len(latencies),
+        "errors": errors,
+        "p50_ms": round(1000 * percentile(latencies, 0.5), 1) if latencies else None,
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 1) if latencies else None,
+        "max_ms": round(1000 * max(latencies), 1) if latencies else None,
+    }
+
+
+async def main_async(args):
+    from backend.engine import AdRequest, engine_for
+    from backend.llm import router, llm_stats
+
+    generate = engine_for("v2").generate
+    router.hedge = False
+    print(f"warm-up: {await run_phase(generate, AdRequest, 'warm', args.warmup, args.concurrency)}")
+    print(f"hedging off: {await run_phase(generate, AdRequest, 'off', args.requests, args.concurrency)}")
+
+    router.hedge = True
+    router.calls = router.hedges = router.hedge_wins = router.hedges_skipped = 0
+    print(f"hedging on:  {await run_phase(generate, AdRequest, 'on', args.requests, args.concurrency)}")
+    stats = llm_stats()
+    print(f"  {stats['hedging']}")
+    if args.json:
+        print(json.dumps(stats["providers"], indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--stall-rate", type=float, default=0.02)
+    parser.add_argument("--stall-latency", type=float, default=3.0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=40, help="calls before measuring, so the router has latency percentiles")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--json", action="store_true", help="also dump the full provider stats")
+    args = parser.parse_args()
+
+    port = free_port()
+    os.environ.update({
+        "GROQ_BASE_URL": f"http://127.0.0.1:{port}", "GROQ_API_KEY": "fake", "GROQ_RPM": "0",
+        "GENERATION_MODE": "single",
+        # Keep the deadline above the injected stall so phase 1 shows the raw tail
+        "LLM_TIMEOUT_MIN": str(args.stall_latency * 2),
+    })
+    fake = start_server(["-m", "bench.fake_groq", "--port", str(port), "--latency", str(args.latency),
+                         "--stall-rate", str(args.stall_rate), "--stall-latency", str(args.stall_latency)], dict(os.environ), port)
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Matrix run for one product (platforms x frameworks x tones) with and without the insight cache.
+
+    python -m bench.insight_cache --token-latency 0.004
+    python -m bench.insight_cache --app api --concurrency 16
+
+Without the cache every combination asks for the full campaign, audience analysis included. With
+it the first combination does, and every other one only generates the copy sections on top of
+the cached (or concurrently generated) insights.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import itertools
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+from .regenerate import token_totals
+
+PLATFORMS = ("Instagram", "Facebook", "Google Ads", "LinkedIn", "TikTok")
+FRAMEWORKS = ("AIDA", "PAS", "Problem-Solution", "Urgency-Scarcity")
+TONES = ("Emotional", "Professional", "Playful")
+
+
+async def run_matrix(generate, requests: list, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one(request):
+        nonlocal errors
+        async with sem:
+            try:
+                await generate(request)
+            except Exception:
+                errors += 1
+
+    before = token_totals()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(request) for request in requests))
+    elapsed = time.perf_counter() - start
+    after = token_totals()
+    tokens = sum(after.get(kind, 0) - before.get(kind, 0) for kind in ("prompt", "completion"))
+    return {"seconds": elapsed, "tokens": tokens, "errors": errors}
+
+
+async def main_async(args):
+    if args.app == "api":
+        from api.index import engine
+    else:
+        from backend.main import engine
+    from backend.engine import AdRequest
+    from backend.cache import insight_cache
+    uncached, cached = engine._campaign, engine._stages
+
+    def matrix(label: str) -> list:
+        # A distinct product per phase so the second phase starts with a cold insight cache
+        product = f"{SAMPLE_REQUEST['product_name']} {label}"
+        return [
+            AdRequest(**dict(SAMPLE_REQUEST, product_name=product, platform=platform, framework=framework, tone=tone))
+            for platform, framework, tone in itertools.product(PLATFORMS, FRAMEWORKS, TONES)
+        ]
+
+    print(f"{args.app}: {len(PLATFORMS)} platforms x {len(FRAMEWORKS)} frameworks x {len(TONES)} tones, "
+          f"concurrency={args.concurrency}, mode={args.mode}")
+    off = await run_matrix(lambda r: uncached(r, args.mode), matrix("off"), args.concurrency)
+    print(f"  insight cache off: {off['seconds']:.2f}s  {off['tokens']:.0f} tokens  errors={off['errors']}")
+    on = await run_matrix(lambda r: cached(r, args.mode), matrix("on"), args.concurrency)
+    print(f"  insight cache on:  {on['seconds']:.2f}s  {on['tokens']:.0f} tokens  errors={on['errors']}")
+    print(f"  {off['seconds'] / on['seconds']:.2f}x faster, {off['tokens'] / on['tokens']:.2f}x fewer tokens; {insight_cache.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", default="backend", choices=["backend", "api"])
+    parser.add_argument("--mode", default="single", choices=["single", "parallel"])
+    parser.add_argument("--latency", type=float, default=0.3, help="fake time-to-first-token")
+    parser.add_argument("--token-latency", type=float, default=0.004, help="fake seconds per output token")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    port = free_port()
+    os.environ.update({"GROQ_BASE_URL": f"http://127.0.0.1:{port}", "GROQ_API_KEY": "fake", "GROQ_RPM": "0"})
+    fake = start_server(
+        ["-m", "bench.fake_groq", "--port", str(port), "--latency", str(args.latency), "--token-latency", str(args.token_latency)],
+        dict(os.environ),
+        port,
+    )
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
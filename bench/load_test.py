@@ -0,0 +1,109 @@
+"""Concurrency load test against a single uvicorn worker backed by bench/fake_groq.py.
+
+    python -m bench.load_test --app backend.main:app --path /generate
+    python -m bench.load_test --app api.index:app --path /api/generate --mode thread
+
+With a non-blocking LLM path, requests/sec should scale with concurrency
+(roughly concurrency / fake latency) even though only one worker is running.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import httpx
+
+SAMPLE_REQUEST = {
+    "product_name": "Silk Aura",
+    "description": "Hand-woven silk sarees for weddings",
+    "target_audience": "Women aged 25-45, wedding shoppers",
+    "platform": "Instagram",
+    "campaign_goal": "Sales",
+    "tone": "Emotional",
+    "framework": "AIDA",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def start_server(args: list, env: dict, port: int) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, *args], env=env)
+    wait_for_port(port)
+    return proc
+
+
+async def run_level(url: str, concurrency: int, total: int, payload: dict = SAMPLE_REQUEST) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=300, limits=limits) as http:
+        async def one():
+            nonlocal errors
+            async with sem:
+                r = await http.post(url, json=payload)
+                if r.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return {"concurrency": concurrency, "requests": total, "errors": errors, "seconds": elapsed, "rps": total / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", default="backend.main:app")
+    parser.add_argument("--path", default="/generate")
+    parser.add_argument("--mode", default="async", choices=["async", "thread"])
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--levels", default="1,8,32,64")
+    parser.add_argument("--rounds", type=int, default=2, help="requests per level = concurrency * rounds")
+    args = parser.parse_args()
+
+    fake_port, app_port = free_port(), free_port()
+    env = dict(os.environ)
+    env.update({
+        "GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "GROQ_API_KEY": "fake",
+        "LLM_CALL_MODE": args.mode,
+        # The fake is unthrottled, so there is no provider budget to pace against
+        "GROQ_RPM": "0",
+    })
+
+    fake = start_server(["-m", "bench.fake_groq", "--port", str(fake_port), "--latency", str(args.latency)], env, fake_port)
+    app = start_server(["-m", "uvicorn", args.app, "--port", str(app_port), "--workers", "1", "--log-level", "warning"], env, app_port)
+    try:
+        url = f"http://127.0.0.1:{app_port}{args.path}"
+        print(f"{args.app} mode={args.mode} fake_latency={args.latency}s workers=1")
+        print(f"{'conc':>6} {'reqs':>6} {'errors':>6} {'secs':>8} {'req/s':>8}")
+        for level in [int(x) for x in args.levels.split(",")]:
+            r = asyncio.run(run_level(url, level, level * args.rounds))
+            print(f"{r['concurrency']:>6} {r['requests']:>6} {r['errors']:>6} {r['seconds']:>8.2f} {r['rps']:>8.2f}")
+    finally:
+        app.terminate()
+        fake.terminate()
+        app.wait()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Campaign matrix (platforms x frameworks x tones) in one planned pass versus one generation per combination.
+
+    python -m bench.matrix --token-latency 0.004
+    python -m bench.matrix --app api --per-call 6
+
+The naive run generates every combination as its own full campaign, audience analysis included.
+The matrix run generates the first one in full and writes the rest several per completion on its
+insights, streaming each combination back as soon as its chunk is done.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import itertools
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+from .regenerate import token_totals
+
+PLATFORMS = ("Instagram", "Facebook", "Google Ads", "LinkedIn")
+FRAMEWORKS = ("AIDA", "PAS", "Problem-Solution", "Urgency-Scarcity")
+TONES = ("Emotional", "Professional", "Playful")
+
+
+async def naive(generate, requests: list, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one(request):
+        nonlocal errors
+        async with sem:
+            try:
+                await generate(request)
+            except Exception:
+                errors += 1
+
+    before = token_totals()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(request) for request in requests))
+    elapsed = time.perf_counter() - start
+    after = token_totals()
+    tokens = sum(after.get(kind, 0) - before.get(kind, 0) for kind in ("prompt", "completion"))
+    return {"seconds": elapsed, "tokens": tokens, "errors": errors}
+
+
+async def main_async(args):
+    if args.app == "api":
+        from api.index import engine
+    else:
+        from backend.main import engine
+    from backend.engine import AdRequest, MatrixRequest
+    campaign, matrix = engine._campaign, engine.matrix
+    generate = lambda request: engine.generate(request, priority="batch")
+
+    brief = {key: value for key, value in SAMPLE_REQUEST.items() if key not in ("platform", "framework", "tone")}
+    combinations = list(itertools.product(PLATFORMS, FRAMEWORKS, TONES))
+    print(f"{args.app}: {len(PLATFORMS)} platforms x {len(FRAMEWORKS)} frameworks x {len(TONES)} tones = "
+          f"{len(combinations)} combinations, concurrency={args.concurrency}")
+
+    requests = [
+        AdRequest(**brief, platform=platform, framework=framework, tone=tone)
+        for platform, framework, tone in combinations
+    ]
+    before = await naive(lambda r: campaign(r, "single"), requests, args.concurrency)
+    print(f"  one call per combination: {before['seconds']:.2f}s  {before['tokens']:.0f} tokens  errors={before['errors']}")
+
+    # A different product so the matrix does not reuse insights cached by the naive run
+    body = MatrixRequest(**dict(brief, product_name=f"{brief['product_name']} matrix"), platforms=list(PLATFORMS),
+                         frameworks=list(FRAMEWORKS), tones=list(TONES), combinations_per_call=args.per_call)
+    first = None
+    start = time.perf_counter()
+    async for line in matrix(body, generate):
+        if "report" in line:
+            report = line["report"]
+        elif first is None:
+            first = time.perf_counter() - start
+    print(f"  matrix:                   {report['seconds']:.2f}s  {report['tokens']['total']:.0f} tokens  "
+          f"errors={report['errors']}  first result after {first:.2f}s")
+    print(f"  {report['completions']} completions in {report['chunks']} chunks, {report['batched']} batched, "
+          f"{report['fallbacks']} fallbacks; report's naive estimate: {report['naive_estimate']}")
+    print(f"  {before['seconds'] / report['seconds']:.2f}x faster, {before['tokens'] / report['tokens']['total']:.2f}x fewer tokens")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", default="backend", choices=["backend", "api"])
+    parser.add_argument("--latency", type=float, default=0.3, help="fake time-to-first-token")
+    parser.add_argument("--token-latency", type=float, default=0.004, help="fake seconds per output token")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-call", type=int, default=4, help="combinations per matrix completion")
+    args = parser.parse_args()
+
+    port = free_port()
+    os.environ.update({
+        "GROQ_BASE_URL": f"http://127.0.0.1:{port}", "GROQ_API_KEY": "fake", "GROQ_RPM": "0",
+        "BATCH_CONCURRENCY": str(args.concurrency),
+    })
+    fake = start_server(
+        ["-m", "bench.fake_groq", "--port", str(port), "--latency", str(args.latency), "--token-latency", str(args.token_latency)],
+        dict(os.environ),
+        port,
+    )
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
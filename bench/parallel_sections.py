@@ -0,0 +1,66 @@
+"""Compare single-completion and parallel-sections generation against bench/fake_groq.py.
+
+    python -m bench.parallel_sections --token-latency 0.004 --runs 5
+    python -m bench.parallel_sections --app api
+
+The fake charges a fixed time-to-first-token plus a per-token cost, so the single mode pays for the
+whole campaign's output while the parallel mode pays roughly for its slowest dependency chain
+(variations -> compliance).
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+
+
+async def measure(generate, request, mode: str, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await generate(request, mode=mode)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", default="backend", choices=["backend", "api"])
+    parser.add_argument("--latency", type=float, default=0.3, help="fake time-to-first-token")
+    parser.add_argument("--token-latency", type=float, default=0.004, help="fake seconds per output token")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    port = free_port()
+    os.environ.update({"GROQ_BASE_URL": f"http://127.0.0.1:{port}", "GROQ_API_KEY": "fake", "GROQ_RPM": "0"})
+    fake = start_server(
+        ["-m", "bench.fake_groq", "--port", str(port), "--latency", str(args.latency), "--token-latency", str(args.token_latency)],
+        dict(os.environ),
+        port,
+    )
+    try:
+        if args.app == "api":
+            from api.index import engine
+        else:
+            from backend.main import engine
+        from backend.engine import AdRequest
+        generate = engine.generate
+        request = AdRequest(**SAMPLE_REQUEST)
+
+        print(f"{args.app}: ttft={args.latency}s per_token={args.token_latency}s runs={args.runs}")
+        print(f"{'mode':>10} {'mean':>8} {'p50':>8} {'min':>8}")
+        results = {}
+        for mode in ("single", "parallel"):
+            timings = asyncio.run(measure(generate, request, mode, args.runs))
+            results[mode] = statistics.mean(timings)
+            print(f"{mode:>10} {results[mode]:>8.3f} {statistics.median(timings):>8.3f} {min(timings):>8.3f}")
+        print(f"speedup: {results['single'] / results['parallel']:.2f}x")
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
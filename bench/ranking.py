@@ -0,0 +1,69 @@
+"""Latency of the local variation ranker (scoring, near-duplicate pruning, top-k) by candidate count.
+
+    python -m bench.ranking
+    python -m bench.ranking --candidates 500 2000 10000 --duplicates 0.3
+
+Candidates are built from the fake server's canned variations with varied endings, lengths
+and CTAs; --duplicates of them are light rewordings of another candidate, which the MinHash
+pruning should keep out of the top-k.
+"""
+import sys
+import time
+import random
+import argparse
+from .fake_groq import CANNED_AD_RESPONSE, CANDIDATE_ENDINGS
+
+CTAS = ("Shop Now", "Discover the collection", "Learn more", "", "Order today", "Click")
+KEYWORDS = ["silk saree", "kanchipuram", "wedding", "handwoven", "heritage", "bridal", "pure silk", "gift"]
+
+
+def build_candidates(count: int, duplicates: float, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    base = CANNED_AD_RESPONSE["variations"]
+    candidates = []
+    for i in range(count):
+        if candidates and rng.random() < duplicates:
+            original = rng.choice(candidates)
+            candidates.append(dict(original, primary_text=original["primary_text"].replace(".", "!", 1)))
+            continue
+        variation = base[i % len(base)]
+        sentences = rng.sample(CANDIDATE_ENDINGS[1:], rng.randint(0, 3)) + rng.sample(KEYWORDS, rng.randint(0, 2))
+        candidates.append(dict(
+            variation,
+            headline=f"{variation['headline']} {i}"[:rng.randint(18, 60)],
+            primary_text=" ".join([variation["primary_text"], *sentences]),
+            cta=rng.choice(CTAS),
+        ))
+    return candidates
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, nargs="+", default=[12, 100, 1000, 5000])
+    parser.add_argument("--duplicates", type=float, default=0.2, help="share of candidates that reword another one")
+    parser.add_argument("--top-k", type=int, default=3, help="variations kept per angle")
+    parser.add_argument("--platform", default="Instagram")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from backend.ranking import rank_variations, minhash
+
+    rank_variations(build_candidates(12, 0), args.platform, KEYWORDS)  # compile the platform's matcher first
+    print(f"{'candidates':>10} {'ms':>8} {'us/cand':>8}  kept")
+    for count in args.candidates:
+        candidates = build_candidates(count, args.duplicates)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            kept = rank_variations(candidates, args.platform, KEYWORDS, top_k=args.top_k)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{count:>10} {1000 * elapsed:>8.2f} {1e6 * elapsed / count:>8.2f}  "
+              + ", ".join(f"{v['angle']} {v['strength_score']}" for v in kept))
+
+    pair = build_candidates(1, 0)[0]
+    reworded = dict(pair, primary_text=pair["primary_text"].replace(".", "!", 1))
+    a, b = (minhash(f"{v['headline']} {v['primary_text']}") for v in (pair, reworded))
+    print(f"estimated similarity of a candidate and its rewording: {(a == b).mean():.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
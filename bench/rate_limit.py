@@ -0,0 +1,71 @@
+"""Batch throughput against a rate-limited fake Groq, with and without the rate-limit scheduler.
+
+    python -m bench.rate_limit --items 40 --rpm 20 --tpm 40000 --window 10
+
+The fake enforces --rpm/--tpm per --window seconds and answers overflow with 429 + Retry-After.
+For each setting it reports generations/sec, failed items and how many 429s the fake sent.
+Without the scheduler the batch bursts into the limit and leans on SDK retries; with it,
+dispatch is paced from the x-ratelimit-* headers and the fake should see (almost) no 429s.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import httpx
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+
+
+def run_batch(base_url: str, items: int, concurrency: int) -> dict:
+    body = "\n".join(json.dumps(dict(SAMPLE_REQUEST, id=i, product_name=f"{SAMPLE_REQUEST['product_name']} #{i}")) for i in range(items))
+    start = time.perf_counter()
+    with httpx.Client(base_url=base_url, timeout=None) as http:
+        r = http.post("/generate/batch", params={"concurrency": concurrency}, content=body)
+        results = [json.loads(line) for line in r.text.splitlines() if line.strip()]
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for result in results if result["status"] == "ok")
+    return {"seconds": round(elapsed, 2), "ok": ok, "failed": len(results) - ok, "per_second": round(ok / elapsed, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rpm", type=float, default=20, help="fake requests per window")
+    parser.add_argument("--tpm", type=float, default=40000, help="fake tokens per window")
+    parser.add_argument("--window", type=float, default=10.0, help="fake rate-limit window in seconds")
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    env = dict(os.environ)
+    # Budgets are unknown up front (RPM/TPM 0) so the scheduler has to learn them from headers
+    env.update({"GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}", "GROQ_API_KEY": "fake", "RESPONSE_CACHE": "off", "GROQ_RPM": "0", "GROQ_TPM": "0"})
+    fake = start_server(
+        ["-m", "bench.fake_groq", "--port", str(fake_port), "--latency", str(args.latency),
+         "--rpm", str(args.rpm), "--tpm", str(args.tpm), "--window", str(args.window)],
+        env,
+        fake_port,
+    )
+    try:
+        for scheduler in ("0", "1"):
+            port = free_port()
+            server = start_server(["-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+                                  dict(env, RATE_LIMIT_SCHEDULER=scheduler), port)
+            try:
+                httpx.post(f"http://127.0.0.1:{fake_port}/_fake/reset")
+                result = run_batch(f"http://127.0.0.1:{port}", args.items, args.concurrency)
+                fake_stats = httpx.get(f"http://127.0.0.1:{fake_port}/_fake/stats").json()
+            finally:
+                server.terminate()
+                server.wait()
+            label = "scheduler" if scheduler == "1" else "no scheduler"
+            print(f"{label:>12}: {result['ok']}/{args.items} ok in {result['seconds']}s ({result['per_second']}/s), "
+                  f"{result['failed']} failed, fake accepted={fake_stats['accepted']} throttled={fake_stats['throttled']}")
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
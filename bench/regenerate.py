@@ -0,0 +1,78 @@
+"""Cost of re-rolling one piece of a campaign versus generating the whole campaign again.
+
+    python -m bench.regenerate --token-latency 0.004
+    python -m bench.regenerate --app api
+
+Prompt and completion tokens come from the fake's usage numbers (roughly chars / 4), latency
+from its time-to-first-token plus per-token cost, so both scale with what is actually sent.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+
+
+def token_totals() -> dict:
+    from backend.metrics import TOKENS
+    return {key[0]: value for key, value in TOKENS.values.items()}
+
+
+async def measure(call) -> tuple:
+    before = token_totals()
+    start = time.perf_counter()
+    result = await call()
+    elapsed = time.perf_counter() - start
+    after = token_totals()
+    used = {kind: after.get(kind, 0) - before.get(kind, 0) for kind in ("prompt", "completion")}
+    return result, elapsed, used
+
+
+async def main_async(args):
+    if args.app == "api":
+        from api.index import engine
+    else:
+        from backend.main import engine
+    from backend.engine import AdRequest
+    generate, regenerate, RegenerateRequest = engine.generate, engine.regenerate, engine.schema.regenerate_model
+    request = AdRequest(**SAMPLE_REQUEST)
+
+    print(f"{args.app}: ttft={args.latency}s per_token={args.token_latency}s")
+    print(f"{'call':>14} {'seconds':>8} {'prompt_tok':>11} {'compl_tok':>10}")
+    previous, seconds, used = await measure(lambda: generate(request, mode="single"))
+    print(f"{'full generate':>14} {seconds:>8.3f} {used['prompt']:>11.0f} {used['completion']:>10.0f}")
+    full = seconds, used["prompt"] + used["completion"]
+    for target, index in (("variation", 2), ("compliance", None), ("channel_opt", None)):
+        body = RegenerateRequest(request=request, previous=previous, target=target, index=index)
+        _, seconds, used = await measure(lambda: regenerate(body))
+        total = used["prompt"] + used["completion"]
+        # With COMPLIANCE_MODE=local (CHANNEL_MODE=local) a compliance (channel_opt) re-roll makes no LLM call
+        saved = f"{full[1] / total:.1f}x fewer tokens" if total else "no LLM call"
+        print(f"{target:>14} {seconds:>8.3f} {used['prompt']:>11.0f} {used['completion']:>10.0f}"
+              f"   ({full[0] / seconds:.1f}x faster, {saved})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", default="backend", choices=["backend", "api"])
+    parser.add_argument("--latency", type=float, default=0.3, help="fake time-to-first-token")
+    parser.add_argument("--token-latency", type=float, default=0.004, help="fake seconds per output token")
+    args = parser.parse_args()
+
+    port = free_port()
+    os.environ.update({"GROQ_BASE_URL": f"http://127.0.0.1:{port}", "GROQ_API_KEY": "fake", "GROQ_RPM": "0"})
+    fake = start_server(
+        ["-m", "bench.fake_groq", "--port", str(port), "--latency", str(args.latency), "--token-latency", str(args.token_latency)],
+        dict(os.environ),
+        port,
+    )
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Latency-aware routing and failover across two fake providers of different speeds.
+
+    python -m bench.router --fast-latency 0.1 --slow-latency 0.6 --requests 40
+
+"fast" is reached through the Groq SDK and "slow" as a plain OpenAI-compatible endpoint, so both
+provider kinds are exercised. Phase 1 should send nearly everything to "fast" (a few exploration
+calls go to "slow"); phase 2 stops "fast" and every request should still succeed via failover.
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+
+
+async def run_phase(generate, request_model, label: str, total: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    outcomes = {"ok": 0, "error": 0}
+
+    async def one(i: int):
+        async with sem:
+            request = request_model(**dict(SAMPLE_REQUEST, product_name=f"{SAMPLE_REQUEST['product_name']} {label} #{i}"))
+            try:
+                await generate(request)
+                outcomes["ok"] += 1
+            except Exception:
+                outcomes["error"] += 1
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return outcomes
+
+
+def print_providers(stats: dict):
+    for name, s in stats["providers"].items():
+        print(f"  {name:>5} ({s['kind']}): calls={s['calls']} errors={s['errors']} failovers_served={s['failovers_served']} "
+              f"p50={s['p50_ms']}ms p95={s['p95_ms']}ms")
+
+
+async def main_async(args, fake):
+    from backend.engine import AdRequest, engine_for
+    generate = engine_for("v2").generate
+    from backend.llm import llm_stats
+
+    print(f"phase 1: both providers up (fast={args.fast_latency}s, slow={args.slow_latency}s)")
+    print(f"  requests: {await run_phase(generate, AdRequest, 'up', args.requests, args.concurrency)}")
+    print_providers(llm_stats())
+
+    fake.terminate()
+    fake.wait()
+    print("phase 2: fast provider stopped")
+    print(f"  requests: {await run_phase(generate, AdRequest, 'down', args.requests, args.concurrency)}")
+    stats = llm_stats()
+    print_providers(stats)
+    if args.json:
+        print(json.dumps(stats["providers"], indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fast-latency", type=float, default=0.1)
+    parser.add_argument("--slow-latency", type=float, default=0.6)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="also dump the full provider stats")
+    args = parser.parse_args()
+
+    fast_port, slow_port = free_port(), free_port()
+    os.environ.update({
+        "LLM_PROVIDERS": "fast,slow",
+        "FAST_KIND": "groq", "FAST_BASE_URL": f"http://127.0.0.1:{fast_port}", "FAST_API_KEY": "fake", "FAST_RPM": "0",
+        "SLOW_KIND": "openai", "SLOW_BASE_URL": f"http://127.0.0.1:{slow_port}/openai/v1", "SLOW_API_KEY": "fake", "SLOW_RPM": "0",
+        "GENERATION_MODE": "single",
+    })
+    fake = start_server(["-m", "bench.fake_groq", "--port", str(fast_port), "--latency", str(args.fast_latency)], dict(os.environ), fast_port)
+    slow = start_server(["-m", "bench.fake_groq", "--port", str(slow_port), "--latency", str(args.slow_latency)], dict(os.environ), slow_port)
+    try:
+        asyncio.run(main_async(args, fake))
+    finally:
+        for proc in (fake, slow):
+            if proc.poll() is None:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Benchmark harness: drives backend/main.py:app and api/index.py:app against bench/fake_groq.py.
+
+    python -m bench.run --levels 1,8,32 --requests 64 --output bench_results.json
+    python -m bench.compare old.json bench_results.json
+
+For every app and concurrency level it records p50/p95/p99 latency, requests/sec, error count,
+server event-loop lag and server RSS, and writes them to a JSON file tagged with the git commit.
+The response cache is disabled and every request uses a distinct product name, so each request
+reaches the (fake) provider.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import httpx
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+
+TARGETS = {
+    "backend": ("backend.main:app", "/generate"),
+    "api": ("api.index:app", "/api/generate"),
+}
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_level(base_url: str, path: str, concurrency: int, total: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as http:
+        await http.post("/_bench/reset")
+
+        async def one(i: int):
+            nonlocal errors
+            payload = dict(SAMPLE_REQUEST, product_name=f"{SAMPLE_REQUEST['product_name']} #{i}")
+            async with sem:
+                start = time.perf_counter()
+                r = await http.post(path, json=payload)
+                latencies.append(time.perf_counter() - start)
+                if r.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+        server = (await http.get("/_bench/stats")).json()
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "rps": round(total / elapsed, 3),
+        "latency_ms": {
+            "mean": round(1000 * sum(latencies) / len(latencies), 2),
+            "p50": round(1000 * percentile(latencies, 0.50), 2),
+            "p95": round(1000 * percentile(latencies, 0.95), 2),
+            "p99": round(1000 * percentile(latencies, 0.99), 2),
+        },
+        "loop_lag_ms": server["loop_lag"],
+        "rss_mb": round(server["rss_bytes"] / 2 ** 20, 2),
+        "peak_rss_mb": round(server["peak_rss_bytes"] / 2 ** 20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apps", default="backend,api")
+    parser.add_argument("--levels", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=64, help="requests per level (at least the concurrency)")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake time-to-first-token")
+    parser.add_argument("--token-latency", type=float, default=0.001, help="fake seconds per output token")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    env = dict(os.environ)
+    env.update({"GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}", "GROQ_API_KEY": "fake", "RESPONSE_CACHE": "off", "GROQ_RPM": "0"})
+    fake = start_server(
+        ["-m", "bench.fake_groq", "--port", str(fake_port), "--latency", str(args.latency),
+         "--token-latency", str(args.token_latency), "--error-rate", str(args.error_rate)],
+        env,
+        fake_port,
+    )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "fake": {"latency": args.latency, "token_latency": args.token_latency, "error_rate": args.error_rate},
+            "env": {k: v for k, v in os.environ.items() if k.startswith(("LLM_", "GENERATION_", "BATCH_"))},
+        },
+        "results": [],
+    }
+    try:
+        for name in args.apps.split(","):
+            app_path, route = TARGETS[name]
+            port = free_port()
+            server = start_server(["-m", "bench.serve", app_path, "--port", str(port)], env, port)
+            try:
+                # Warm-up: lazy client construction and first-import costs are not part of any level
+                asyncio.run(run_level(f"http://127.0.0.1:{port}", route, 1, 1))
+                for level in [int(x) for x in args.levels.split(",")]:
+                    result = asyncio.run(run_level(f"http://127.0.0.1:{port}", route, level, max(args.requests, level)))
+                    result["app"] = name
+                    report["results"].append(result)
+                    lat = result["latency_ms"]
+                    print(f"{name:>8} c={level:<4} rps={result['rps']:<8} p50={lat['p50']:<8} p95={lat['p95']:<8} p99={lat['p99']:<8} "
+                          f"errors={result['errors']:<4} lag_max={result['loop_lag_ms']['max_ms']}ms rss={result['rss_mb']}MB")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Serve an app with benchmark probes attached.
+
+    python -m bench.serve backend.main:app --port 9200
+
+Adds GET /_bench/stats (event-loop lag and RSS) and POST /_bench/reset to the app
+before handing it to uvicorn, so the harness can sample the server process itself.
+"""
+import time
+import asyncio
+import argparse
+import importlib
+import resource
+
+LAG_INTERVAL = 0.01
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic sleep wakes up; anything blocking the loop shows up as lag."""
+
+    def __init__(self, interval: float = LAG_INTERVAL):
+        self.interval = interval
+        self.samples = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - start - self.interval, 0.0))
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(samples),
+            "mean_ms": round(1000 * sum(samples) / len(samples), 3),
+            "p99_ms": round(1000 * samples[min(int(len(samples) * 0.99), len(samples) - 1)], 3),
+            "max_ms": round(1000 * samples[-1], 3),
+        }
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def instrument(app):
+    monitor = LoopLagMonitor()
+    peak = {"rss": rss_bytes()}
+
+    @app.get("/_bench/stats", include_in_schema=False)
+    async def bench_stats():
+        rss = rss_bytes()
+        peak["rss"] = max(peak["rss"], rss)
+        return {"loop_lag": monitor.summary(), "rss_bytes": rss, "peak_rss_bytes": peak["rss"], "time": time.time()}
+
+    @app.post("/_bench/reset", include_in_schema=False)
+    async def bench_reset():
+        monitor.samples.clear()
+        peak["rss"] = rss_bytes()
+        if not getattr(app.state, "bench_monitor_started", False):
+            app.state.bench_monitor_started = True
+            app.state.bench_monitor = asyncio.create_task(monitor.run())
+        return {"ok": True}
+
+    return app
+
+
+def load_app(path: str):
+    module_name, attr = path.split(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("app", help="module:attribute, e.g. backend.main:app")
+    parser.add_argument("--port", type=int, default=9200)
+    args = parser.parse_args()
+    uvicorn.run(instrument(load_app(args.app)), host="127.0.0.1", port=args.port, log_level="warning")
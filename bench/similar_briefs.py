@@ -0,0 +1,176 @@
+"""Near-duplicate brief lookup: what matches, how fast at scale, and what it saves.
+
+    python -m bench.similar_briefs
+    python -m bench.similar_briefs --sizes 1000 100000 --path /tmp/briefs --skip-generation
+
+Three parts:
+  1. similarity of reworded and of different briefs to SAMPLE_REQUEST, and whether they match
+     at SIMILAR_BRIEF_THRESHOLD (numbers have to be identical to match at all);
+  2. lookup time (embedding plus index search) against indexes of synthetic briefs, for
+     rewordings of indexed briefs and for unrelated ones; with --path the index is memory-mapped
+     there, and reopening it is timed too;
+  3. reworded briefs through the backend engine against bench/fake_groq, once with only the
+     exact insight cache and once with the near-duplicate fallback, counting tokens.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+from .regenerate import token_totals
+
+BRIEF = {key: SAMPLE_REQUEST[key] for key in ("product_name", "description", "target_audience")}
+PAIRS = {
+    "audience reworded": dict(BRIEF, target_audience="women 25–45 shopping for weddings"),
+    "description reworded": dict(BRIEF, description="Hand woven silk sarees, made for weddings"),
+    "both reworded": dict(BRIEF, description="Handwoven silk saris for wedding season",
+                          target_audience="women aged 25-45 shopping for weddings"),
+    "product line": dict(BRIEF, product_name=f"{BRIEF['product_name']} Pro"),
+    "other product": dict(BRIEF, product_name="Loom & Thread"),
+    "other audience": dict(BRIEF, target_audience="Brides to be"),
+    "other ages": dict(BRIEF, target_audience="Women aged 45-65, wedding shoppers"),
+}
+REWORDINGS = [
+    {"target_audience": "women 25–45 shopping for weddings"},
+    {"target_audience": "Wedding shoppers: women, 25-45"},
+    {"target_audience": "women between 25 and 45 who shop for weddings"},
+    {"description": "Hand woven silk sarees, made for weddings"},
+    {"description": "Handwoven silk saris for wedding season", "target_audience": "women aged 25-45 shopping for weddings"},
+    {"description": "Hand-woven silk sarees for weddings."},
+]
+
+ADJECTIVES = "organic smart handmade vegan compact premium eco wireless portable artisan classic modern".split()
+NOUNS = "tea tracker saree sneakers lamp backpack candle speaker bottle journal blender mattress serum".split()
+QUALITIES = "sustainable durable lightweight refillable ergonomic noise-cancelling waterproof hypoallergenic".split()
+GROUPS = "women men parents students gamers runners nurses freelancers retirees founders teachers".split()
+INTERESTS = "fitness travel cooking fashion wellness outdoor music gaming parenting productivity".split()
+
+
+def synthetic_brief(rng: random.Random) -> dict:
+    low = rng.randrange(18, 56)
+    return {
+        "product_name": f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} {rng.randrange(1000)}",
+        "description": f"{rng.choice(QUALITIES).title()} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} for "
+                       f"{rng.choice(INTERESTS)} and {rng.choice(INTERESTS)}",
+        "target_audience": f"{rng.choice(GROUPS).title()} aged {low}-{low + rng.randrange(5, 20)}, into {rng.choice(INTERESTS)}",
+    }
+
+
+def reworded(brief: dict) -> dict:
+    words = brief["target_audience"].replace(",", "").split()
+    return dict(brief, target_audience=" ".join(words[-2:] + [word.lower() for word in words[:-2]]))
+
+
+def similarities():
+    from backend.similarity import embed, scope, SIMILAR_BRIEF_THRESHOLD
+
+    print(f"1. similarity to the sample brief (threshold {SIMILAR_BRIEF_THRESHOLD})")
+    base, base_scope = embed(BRIEF), scope("", BRIEF)
+    for label, brief in PAIRS.items():
+        similarity = float(embed(brief) @ base)
+        same_numbers = scope("", brief) == base_scope
+        match = same_numbers and similarity >= SIMILAR_BRIEF_THRESHOLD
+        print(f"  {label:<22} {similarity:>6.3f}  numbers {'same' if same_numbers else 'differ':<6}  "
+              f"{'match' if match else 'no match'}")
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def lookups(sizes: list, queries: int, path: str):
+    from backend.similarity import BriefIndex
+
+    print(f"\n2. lookup time, {queries} queries per row (embedding included)")
+    print(f"  {'briefs':>8} {'build s':>8} {'reopen ms':>9} {'query':>10} {'p50 us':>8} {'p99 us':>8} {'found':>6}")
+    for size in sizes:
+        rng = random.Random(size)
+        briefs = [synthetic_brief(rng) for _ in range(size)]
+        directory = tempfile.mkdtemp(dir=path) if path else None
+        start = time.perf_counter()
+        index = BriefIndex(path=directory)
+        for i, brief in enumerate(briefs):
+            index.add("bench", f"key{i}", brief)
+        build = time.perf_counter() - start
+        reopen = ""
+        if directory:
+            start = time.perf_counter()
+            index = BriefIndex(path=directory)
+            reopen = f"{1000 * (time.perf_counter() - start):.0f}"
+        picks = [rng.randrange(size) for _ in range(queries)]
+        kinds = {
+            "reworded": [(reworded(briefs[i]), f"key{i}") for i in picks],
+            "unrelated": [(synthetic_brief(random.Random(-i - 1)), None) for i in range(queries)],
+        }
+        for kind, probes in kinds.items():
+            timings, found = [], 0
+            for brief, key in probes:
+                start = time.perf_counter()
+                keys = index.neighbors("bench", brief)
+                timings.append(1e6 * (time.perf_counter() - start))
+                found += key is not None and key in keys
+            hit_rate = f"{found / len(probes):.0%}" if kind == "reworded" else "-"
+            print(f"  {size:>8} {build:>8.1f} {reopen:>9} {kind:>10} {statistics.median(timings):>8.0f} "
+                  f"{percentile(timings, 0.99):>8.0f} {hit_rate:>6}")
+
+
+async def generations(latency: float, token_latency: float):
+    from backend.cache import insight_cache, ResponseCache, MemoryCache
+    from backend.similarity import BriefIndex
+    from backend.engine import AdRequest, engine_for
+
+    engine = engine_for("v2")
+    requests = [AdRequest(**dict(SAMPLE_REQUEST, **change)) for change in [{}] + REWORDINGS]
+    print(f"\n3. {len(requests)} reworded briefs through the v2 engine (ttft={latency}s per_token={token_latency}s)")
+    for label, similar in (("exact insight cache", None), ("near-duplicate fallback", BriefIndex())):
+        insight_cache.cache = ResponseCache(MemoryCache(), name="insights")
+        insight_cache.similar = similar
+        insight_cache.hits = insight_cache.similar_hits = insight_cache.misses = 0
+        before = token_totals()
+        start = time.perf_counter()
+        for request in requests:
+            await engine.generate(request)
+        elapsed = time.perf_counter() - start
+        after = token_totals()
+        tokens = sum(after.get(kind, 0) - before.get(kind, 0) for kind in ("prompt", "completion"))
+        stats = insight_cache.stats()
+        print(f"  {label:<24} {elapsed:>6.2f}s {tokens:>7.0f} tokens  full campaigns={stats['misses']} "
+              f"similar hits={stats['similar_hits']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--path", help="directory for memory-mapped indexes (default: in memory)")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake time-to-first-token")
+    parser.add_argument("--token-latency", type=float, default=0.004, help="fake seconds per output token")
+    parser.add_argument("--skip-generation", action="store_true")
+    args = parser.parse_args()
+
+    similarities()
+    lookups(args.sizes, args.queries, args.path)
+    if args.skip_generation:
+        return
+
+    port = free_port()
+    os.environ.update({"GROQ_BASE_URL": f"http://127.0.0.1:{port}", "GROQ_API_KEY": "fake", "GROQ_RPM": "0"})
+    fake = start_server(
+        ["-m", "bench.fake_groq", "--port", str(port), "--latency", str(args.latency), "--token-latency", str(args.token_latency)],
+        dict(os.environ),
+        port,
+    )
+    try:
+        asyncio.run(generations(args.latency, args.token_latency))
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Bytes on the wire and response time of the Vercel app's UI and /api/generate by Accept-Encoding.
+
+    python -m bench.static
+    python -m bench.static --requests 200 --bandwidth 5
+
+Runs api.index under uvicorn against bench/fake_groq and fetches the UI as identity, gzip and
+brotli, then again with If-None-Match set to the ETag it got (a 304 revalidation). /api/generate
+is fetched once to fill the response cache, then timed on cache hits per encoding. The transfer
+column estimates the time to receive the body at --bandwidth Mbit/s on top of the local latency.
+"""
+import os
+import sys
+import time
+import argparse
+import httpx
+from .load_test import free_port, start_server, SAMPLE_REQUEST
+
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def measure(client: httpx.Client, method: str, url: str, headers: dict, count: int, **kwargs) -> dict:
+    wire = status = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        with client.stream(method, url, headers=headers, **kwargs) as response:
+            response.read()
+            wire, status = response.num_bytes_downloaded, response.status_code
+            etag, encoding = response.headers.get("etag"), response.headers.get("content-encoding", "identity")
+    return {
+        "ms": 1000 * (time.perf_counter() - start) / count, "bytes": wire, "status": status,
+        "etag": etag, "encoding": encoding,
+    }
+
+
+def report(label: str, result: dict, bandwidth: float):
+    transfer = 1000 * result["bytes"] * 8 / (bandwidth * 1e6)
+    print(f"  {label:<22} {result['status']:>4} {result['encoding']:>9} {result['bytes']:>8} "
+          f"{result['ms']:>8.2f} {transfer:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100, help="requests timed per row")
+    parser.add_argument("--bandwidth", type=float, default=10.0, help="Mbit/s for the transfer estimate")
+    args = parser.parse_args()
+
+    fake_port, app_port = free_port(), free_port()
+    env = dict(os.environ)
+    env.update({
+        "GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "GROQ_API_KEY": "fake",
+        "GROQ_RPM": "0",
+    })
+    fake = start_server(["-m", "bench.fake_groq", "--port", str(fake_port), "--latency", "0"], env, fake_port)
+    app = start_server(["-m", "uvicorn", "api.index:app", "--port", str(app_port), "--workers", "1", "--log-level", "warning"], env, app_port)
+    base = f"http://127.0.0.1:{app_port}"
+    try:
+        with httpx.Client(timeout=60) as client:
+            print(f"{'':<24} {'code':>4} {'encoding':>9} {'wire B':>8} {'ms':>8} {'xfer ms':>10}")
+            print(f"GET / ({args.bandwidth:g} Mbit/s)")
+            for encoding in ENCODINGS:
+                full = measure(client, "GET", f"{base}/", {"Accept-Encoding": encoding}, args.requests)
+                report(encoding, full, args.bandwidth)
+                revalidated = measure(client, "GET", f"{base}/", {"Accept-Encoding": encoding, "If-None-Match": full["etag"]}, args.requests)
+                report(f"{encoding} revalidated", revalidated, args.bandwidth)
+
+            print("POST /api/generate (cache hits)")
+            client.post(f"{base}/api/generate", json=SAMPLE_REQUEST).raise_for_status()
+            for encoding in ENCODINGS:
+                result = measure(client, "POST", f"{base}/api/generate", {"Accept-Encoding": encoding}, args.requests, json=SAMPLE_REQUEST)
+                report(encoding, result, args.bandwidth)
+    finally:
+        app.terminate()
+        fake.terminate()
+        app.wait()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
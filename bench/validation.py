@@ -0,0 +1,110 @@
+"""Validation cost per response, per schema version, of the old and the engine's call sequence.
+
+    python -m bench.validation
+    python -m bench.validation --runs 20000
+
+Every generation validates the campaign, revalidates it after the compliance screen, and every
+re-roll revalidates the previous response with the new piece in it. The old code checked each
+section with a TypeAdapter, then built AdResponse(**data) from the same dicts (so everything was
+validated twice), patched missing v2 insight fields on the dict first, and rebuilt the whole
+response from model_dump() for the screen and for a re-roll. The engine validates each section
+once (build_response), runs the v2 fallbacks inside AudienceInsight's validator, and
+revalidates only the section that changed (replace_section).
+
+Input is bench/fake_groq's canned response; the rule screen itself is run once up front and is
+not part of either column.
+"""
+import sys
+import time
+import argparse
+from .fake_groq import CANNED_AD_RESPONSE
+
+
+def per_call(fn, runs: int) -> float:
+    """Best of 5 mean microseconds per fn() call."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        best = min(best, (time.perf_counter() - start) / runs)
+    return 1e6 * best
+
+
+def old_paths(schema, adapters: dict, data: dict, compliance: dict, variation: dict) -> dict:
+    from backend.engine.v2 import INSIGHT_FALLBACKS
+
+    model = schema.response_model
+
+    def patch(key, value):
+        # apply_insight_fallbacks, applied to v2 insights only
+        if schema.version == "v2" and key == "insights":
+            value = dict(value)
+            for field, fallback in INSIGHT_FALLBACKS.items():
+                if not value.get(field):
+                    value[field] = fallback
+        return value
+
+    def campaign():
+        valid = {}
+        for key, adapter in adapters.items():
+            value = patch(key, data[key])
+            adapter.validate_python(value)
+            valid[key] = value
+        return model(**valid)
+
+    response = campaign()
+    return {
+        "campaign": campaign,
+        "screen": lambda: model(**{**response.model_dump(), "compliance": compliance}),
+        "regenerate": lambda: model(**_with_variation(response.model_dump(), variation)),
+    }
+
+
+def _with_variation(data: dict, variation: dict) -> dict:
+    data["variations"][1] = variation
+    return data
+
+
+def new_paths(schema, data: dict, compliance: dict, variation: dict) -> dict:
+    from backend.decoding import build_response, replace_section
+
+    model = schema.response_model
+    response = build_response(data, model)
+    return {
+        "campaign": lambda: build_response(data, model),
+        "screen": lambda: replace_section(response, "compliance", compliance),
+        "regenerate": lambda: replace_section(
+            response, "variations", [*response.variations[:1], variation, *response.variations[2:]]
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5000, help="calls per timing")
+    args = parser.parse_args()
+
+    from backend.decoding import _field_adapters
+    from backend.compliance import rule_screen
+    from backend.engine import SCHEMAS
+
+    print(f"{'schema':>6} {'step':>12} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    for version, schema in SCHEMAS.items():
+        model = schema.response_model
+        data = {key: CANNED_AD_RESPONSE[key] for key in model.model_fields}
+        compliance = rule_screen.check(CANNED_AD_RESPONSE, "Instagram")
+        variation = dict(CANNED_AD_RESPONSE["variations"][1], headline="A new headline")
+        before = old_paths(schema, _field_adapters(model), dict(data), compliance, variation)
+        after = new_paths(schema, dict(data), compliance, variation)
+        totals = [0.0, 0.0]
+        for step in before:
+            old, new = per_call(before[step], args.runs), per_call(after[step], args.runs)
+            totals[0] += old
+            totals[1] += new
+            print(f"{version:>6} {step:>12} {old:>10.1f} {new:>10.1f} {old / new:>7.2f}x")
+        print(f"{version:>6} {'total':>12} {totals[0]:>10.1f} {totals[1]:>10.1f} {totals[0] / totals[1]:>7.2f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
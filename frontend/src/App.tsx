@@ -1,5 +1,23 @@
 import { useState } from 'react'
-import { generateAds, type AdRequest, type AdResponse } from './api'
+import { generateAdsStream, applySection, type AdRequest, type AdResponse } from './api'
+
+// Placeholder shown for sections that have not streamed in yet
+const PENDING_RESPONSE: AdResponse = {
+    insights: {
+        pain_points: [],
+        emotional_triggers: [],
+        objections: [],
+        competitive_angle: '',
+        key_selling_points: [],
+        recommended_keywords: [],
+        demographics: '',
+        targeting_interests: [],
+        behaviors: []
+    },
+    variations: [],
+    compliance: { risk_level: 'Pending', issues: [], suggestions: [] },
+    channel_opt: { whatsapp: 'Generating...', sms: 'Generating...' }
+}
 
 function App() {
     const [loading, setLoading] = useState(false)
@@ -24,7 +42,9 @@ function App() {
         setData(null) // Clear previous data
         try {
             console.log('Submitting form with data:', formData)
-            const resp = await generateAds(formData)
+            const resp = await generateAdsStream(formData, (section) => {
+                setData(prev => ({ ...PENDING_RESPONSE, ...applySection(prev, section) }))
+            })
             console.log('Received response:', resp)
             // Validate response has required fields
             if (!resp || !resp.insights || !resp.variations || !resp.compliance || !resp.channel_opt) {
@@ -44,6 +64,7 @@ function App() {
         } catch (err: any) {
             console.error('Error generating ads:', err)
             const errorMessage = err.message || 'Failed to generate ad copies. Please check your connection and try again.'
+            setData(null)
             setError(errorMessage)
         } finally {
             setLoading(false)
@@ -215,13 +236,13 @@ function App() {
                         </div>
                     )}
 
-                    {loading && (
+                    {loading && !data && (
                         <div className="dream-state">
                             <h2 style={{ marginTop: '2rem', letterSpacing: '0.2em' }}>GENERATING COPIES...</h2>
                         </div>
                     )}
 
-                    {data && !loading && (
+                    {data && (
                         <>
                             {/* HEADER */}
                             <div className="campaign-header fade-in-blur" style={{ gridColumn: 'span 2', marginBottom: '2rem' }}>
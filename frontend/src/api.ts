@@ -77,3 +77,68 @@ export async function generateAds(data: AdRequest): Promise<AdResponse> {
     throw new Error('Network error: Please check your connection and try again.');
   }
 }
+
+export type AdSection =
+  | { event: 'insights'; data: AudienceInsight }
+  | { event: 'variation'; data: { index: number; variation: AdVariation } }
+  | { event: 'compliance'; data: ComplianceCheck }
+  | { event: 'channel_opt'; data: ChannelOptimization };
+
+// Merge a streamed section into the partial response rendered so far.
+export function applySection(prev: Partial<AdResponse> | null, section: AdSection): Partial<AdResponse> {
+  const next: Partial<AdResponse> = { ...prev };
+  if (section.event === 'variation') {
+    const variations = [...(next.variations || [])];
+    variations[section.data.index] = section.data.variation;
+    next.variations = variations;
+  } else if (section.event === 'insights') {
+    next.insights = section.data;
+  } else if (section.event === 'compliance') {
+    next.compliance = section.data;
+  } else {
+    next.channel_opt = section.data;
+  }
+  return next;
+}
+
+// Like generateAds, but calls onSection for each section as soon as the server has validated it.
+export async function generateAdsStream(data: AdRequest, onSection: (section: AdSection) => void): Promise<AdResponse> {
+  const response = await fetch(`${API_URL}/generate/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(data),
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`Server error: ${response.status} ${response.statusText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary: number;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      let payload = '';
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) payload += line.slice(6);
+      }
+      const parsed = JSON.parse(payload);
+      if (event === 'done') return parsed as AdResponse;
+      if (event === 'error') throw new Error(parsed.detail || 'Failed to generate ads');
+      onSection({ event, data: parsed } as AdSection);
+    }
+  }
+  throw new Error('Stream ended before the campaign was complete');
+}